@@ -0,0 +1,70 @@
+"""Donut caching: page is cached once for all users, and user specific parts
+of it ("holes") are filled in after the cache lookup.
+
+Holes are marked at templates by `{% hole %}...{% endhole %}` tag (see
+`core.templatetags.donut`). While the page is rendered for the cache
+(`request.donut` is set), the tag outputs a placeholder with the hole id and
+its arguments. `fill_holes` renders every placeholder for the current request
+by the same template nodes, so the hole content lives in templates as usual.
+"""
+import base64
+import json
+import re
+from typing import Any, Dict
+
+from django.core.handlers.wsgi import WSGIRequest
+from django.http import HttpResponse
+from django.template import RequestContext, Template
+from django.template.base import NodeList
+from django.template.loader import get_template
+from django.utils.safestring import SafeData, mark_safe
+
+PLACEHOLDER = re.compile(r'<!--hole:([\w=-]+)-->')
+
+holes: Dict[str, NodeList] = {}
+"""Nodes of every compiled hole by its id (template name and line)."""
+
+
+def dump_hole(hole_id: str, template_name: str, values: Dict[str, Any]):
+    """Make placeholder for a hole. Values are kept as JSON, strings keep
+    their safety (like rendered form fields).
+    """
+    payload = {
+        'id': hole_id,
+        'template': template_name,
+        'values': {
+            name: (
+                [value, False]
+                if value is None or isinstance(value, (bool, int, float))
+                else [str(value), isinstance(value, SafeData)]
+            )
+            for name, value in values.items()
+        },
+    }
+    raw: bytes = json.dumps(payload).encode()
+    return f'<!--hole:{base64.urlsafe_b64encode(raw).decode()}-->'
+
+
+def render_hole(request: WSGIRequest, raw: str) -> str:
+    payload: Dict[str, Any] = json.loads(base64.urlsafe_b64decode(raw))
+    if payload['id'] not in holes:
+        # hole is registered while template is compiled
+        get_template(payload['template'])
+    values = {
+        name: mark_safe(value) if safe else value
+        for name, (value, safe) in payload['values'].items()
+    }
+    template = Template('')
+    template.nodelist = holes[payload['id']]
+    return template.render(RequestContext(request, values))
+
+
+def fill_holes(request: WSGIRequest, response: HttpResponse) -> HttpResponse:
+    """Render all holes of cached response for the current request."""
+    if response.streaming or b'<!--hole:' not in response.content:
+        return response
+    content: str = response.content.decode(response.charset)
+    response.content = PLACEHOLDER.sub(
+        lambda match: render_hole(request, match.group(1)), content
+    )
+    return response
@@ -1,6 +1,9 @@
+import heapq
+import threading
+from collections import OrderedDict
 from typing import (
-    Any, Dict, Generator, Iterable, Iterator, Optional, Sequence, Tuple,
-    TypeVar
+    Any, Callable, Dict, Generator, Iterable, Iterator, List, Optional,
+    Sequence, Tuple, TypeVar
 )
 
 from django.urls import reverse
@@ -32,6 +35,101 @@ def lastloop(iterable: Iterable[_T]) -> Generator[Tuple[_T, bool], None, None]:
     yield last, True
 
 
+_NOT_STARTED = object()
+
+
+class _Descending:
+    """Key wrapper which turns heap order upside down."""
+
+    __slots__ = ('value',)
+
+    def __init__(self, value: Any) -> None:
+        self.value = value
+
+    def __lt__(self, other: '_Descending') -> bool:
+        return other.value < self.value
+
+
+def kmerge(
+    streams: Iterable[Tuple[Any, Iterable[_T]]],
+    key: Callable[[_T], Any],
+    reverse: bool = False,
+) -> Generator[_T, None, None]:
+    """Lazy k-way merge of already sorted streams. Every stream is given with
+    its `head` -- a key which does not go after the key of stream's first
+    item. Stream is not started until its head comes up to the top of the
+    heap, so only streams which really contribute values are pulled.
+
+    >>> list(kmerge([('b', 'bdf'), ('a', 'ace'), ('x', 'xyz')], key=str))[:5]
+    ['a', 'b', 'c', 'd', 'e']
+    >>> list(kmerge([(3, [3, 1]), (2, [2, 2])], key=int, reverse=True))
+    [3, 2, 2, 1]
+
+    """
+    order: Callable = _Descending if reverse else (lambda value: value)
+    heap: List[Tuple[Any, int, Any, Iterator]] = [
+        (order(head), i, _NOT_STARTED, stream)
+        for i, (head, stream) in enumerate(streams)
+    ]
+    heapq.heapify(heap)
+    while heap:
+        _, i, item, stream = heap[0]
+        if item is _NOT_STARTED:
+            stream = iter(stream)
+        else:
+            yield item
+        try:
+            item = next(stream)
+        except StopIteration:
+            heapq.heappop(heap)
+        else:
+            heapq.heapreplace(heap, (order(key(item)), i, item, stream))
+
+
+class LRUDict:
+    """Thread safe mapping which keeps only `size` most recently used items.
+
+    >>> lru = LRUDict(2)
+    >>> lru.set('a', 1); lru.set('b', 2); lru.get('a'); lru.set('c', 3)
+    1
+    >>> lru.get('b'), lru.get('a'), len(lru)
+    (None, 1, 2)
+
+    """
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.items: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        with self.lock:
+            try:
+                self.items.move_to_end(key)
+            except KeyError:
+                return default
+            return self.items[key]
+
+    def set(self, key: Any, value: Any) -> None:
+        with self.lock:
+            self.items[key] = value
+            self.items.move_to_end(key)
+            while len(self.items) > self.size:
+                self.items.popitem(last=False)
+
+    def delete(self, *keys: Any) -> None:
+        with self.lock:
+            for key in keys:
+                self.items.pop(key, None)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.items.clear()
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+
 def reverse_next(
         viewname: str,
         next_url: str,
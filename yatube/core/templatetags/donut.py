@@ -0,0 +1,48 @@
+from django import template
+from django.template.base import Parser, Token, token_kwargs
+
+from core.donut import dump_hole, holes
+
+register = template.Library()
+
+
+class HoleNode(template.Node):
+    def __init__(self, nodelist, kwargs, hole_id: str, template_name: str):
+        self.nodelist = nodelist
+        self.kwargs = kwargs
+        self.hole_id = hole_id
+        self.template_name = template_name
+
+    def render(self, context: template.Context) -> str:
+        values = {
+            name: value.resolve(context) for name, value in self.kwargs.items()
+        }
+        if getattr(context.get('request'), 'donut', False):
+            return dump_hole(self.hole_id, self.template_name, values)
+        with context.push(**values):
+            return self.nodelist.render(context)
+
+
+@register.tag
+def hole(parser: Parser, token: Token) -> HoleNode:
+    """User specific part of a page which is cached for everyone. Content of
+    the hole sees only request context (`user`, `request`, `csrf_token`...)
+    and given arguments, which are resolved while rendering the page.
+
+    {% hole author=post.author.get_username %}
+      {% if user.get_username == author %}...{% endif %}
+    {% endhole %}
+    """
+    bits = token.split_contents()[1:]
+    kwargs = token_kwargs(bits, parser)
+    if bits:
+        raise template.TemplateSyntaxError(
+            "'hole' tag accepts only keyword arguments"
+        )
+    nodelist = parser.parse(('endhole',))
+    parser.delete_first_token()
+
+    template_name: str = parser.origin.template_name
+    hole_id = f'{template_name}:{token.lineno}'
+    holes[hole_id] = nodelist
+    return HoleNode(nodelist, kwargs, hole_id, template_name)
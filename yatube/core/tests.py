@@ -1,6 +1,10 @@
+from itertools import islice
+
 from django.test import TestCase, Client
 from django.contrib import auth
 
+from core.functools.utils import LRUDict, kmerge
+
 
 User = auth.get_user_model()
 app_name = 'core'
@@ -25,3 +29,39 @@ class URLTests(TestCase):
             with self.subTest(url=url, template=template):
                 response = self.client.get(url)
                 self.assertTemplateUsed(response, app_name + template)
+
+
+class KMergeTests(TestCase):
+    def test_streams_are_pulled_lazily(self):
+        pulled = []
+
+        def stream(name, values):
+            for value in values:
+                pulled.append(name)
+                yield value
+
+        merged = kmerge(
+            [
+                ((9,), stream('a', [9, 7, 1])),
+                ((8,), stream('b', [8, 2])),
+                ((3,), stream('c', [3])),
+            ],
+            key=lambda value: (value,),
+            reverse=True,
+        )
+        self.assertEqual(list(islice(merged, 3)), [9, 8, 7])
+        self.assertNotIn('c', pulled)
+        self.assertEqual(list(merged), [3, 2, 1])
+
+
+class LRUDictTests(TestCase):
+    def test_least_recently_used_item_is_dropped(self):
+        lru = LRUDict(2)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        self.assertEqual(lru.get('a'), 1)
+        lru.set('c', 3)
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual((lru.get('a'), lru.get('c')), (1, 3))
+        lru.delete('a', 'missing')
+        self.assertEqual(len(lru), 1)
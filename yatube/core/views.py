@@ -1,5 +1,8 @@
+from django.conf import settings
 from django.http import HttpResponseForbidden
 from django.shortcuts import render
+from django.views.static import serve
+from sorl.thumbnail.conf import settings as sorl_settings
 
 
 def page_forbidden(request, exception):
@@ -19,3 +22,11 @@ def server_error(request):
 
 def csrf_failure(request, reason=''):
     return HttpResponseForbidden()
+
+
+def serve_media(request, path, document_root=None):
+    """Serving media files while debugging, thumbnails are immutable"""
+    response = serve(request, path, document_root=document_root)
+    if path.startswith(sorl_settings.THUMBNAIL_PREFIX):
+        response['Cache-Control'] = settings.THUMBNAIL_CACHE_CONTROL
+    return response
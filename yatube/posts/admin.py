@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import Group, Post
+from .search import matching
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -13,6 +14,15 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('created',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        """Search posts by the full-text index (see `posts.search`) instead
+        of `LIKE '%...%'` scan of the whole table. All matching posts are
+        found, not only `SEARCH_RESULTS_LIMIT` of the best ones.
+        """
+        if not search_term:
+            return queryset, False
+        return matching(queryset, search_term), False
+
 
 class GroupAdmin(admin.ModelAdmin):
     """Class describing a configuration of `Group` model at admin's site.
@@ -0,0 +1,142 @@
+"""Read models of feed post cards.
+
+`posts/includes/post.html` reads only a few attributes of post, its author
+and group. `as_cards` turns a posts queryset into one which loads plain
+`values_list` rows and wraps them into small `__slots__` objects with the
+same attribute names, instead of building full model instances.
+"""
+from datetime import datetime
+from typing import Iterator, Optional, Tuple
+
+from django.db.models import QuerySet
+from django.db.models.query import ValuesListIterable
+
+
+class AuthorCard:
+    __slots__ = ('pk', 'username', 'first_name', 'last_name')
+
+    def __init__(
+        self, pk: int, username: str, first_name: str, last_name: str
+    ) -> None:
+        self.pk = pk
+        self.username = username
+        self.first_name = first_name
+        self.last_name = last_name
+
+    def get_username(self) -> str:
+        return self.username
+
+    def get_full_name(self) -> str:
+        return f'{self.first_name} {self.last_name}'.strip()
+
+    def __str__(self) -> str:
+        return self.username
+
+
+class GroupCard:
+    __slots__ = ('pk', 'slug')
+
+    def __init__(self, pk: int, slug: str) -> None:
+        self.pk = pk
+        self.slug = slug
+
+
+class PostCard:
+    """Post as it is shown at feed pages. `image` is a name of the file at
+    the default storage (which is what `post_picture` tag takes as well).
+    """
+
+    __slots__ = (
+        'pk',
+        'excerpt',
+        'has_more',
+        'image',
+        'image_width',
+        'image_height',
+        'image_color',
+        'image_preview',
+        'created',
+        'edited',
+        'author',
+        'group',
+    )
+
+    columns: Tuple[str, ...] = (
+        'pk',
+        'excerpt',
+        'has_more',
+        'image',
+        'image_width',
+        'image_height',
+        'image_color',
+        'image_preview',
+        'created',
+        'edited',
+        'author_id',
+        'author__username',
+        'author__first_name',
+        'author__last_name',
+        'group_id',
+        'group__slug',
+    )
+    """Columns loaded for a card, in the order of `from_row` arguments."""
+
+    def __init__(
+        self,
+        pk: int,
+        excerpt: str,
+        has_more: bool,
+        image: str,
+        image_width: Optional[int],
+        image_height: Optional[int],
+        image_color: str,
+        image_preview: str,
+        created: datetime,
+        edited: datetime,
+        author: AuthorCard,
+        group: Optional[GroupCard],
+    ) -> None:
+        self.pk = pk
+        self.excerpt = excerpt
+        self.has_more = has_more
+        self.image = image
+        self.image_width = image_width
+        self.image_height = image_height
+        self.image_color = image_color
+        self.image_preview = image_preview
+        self.created = created
+        self.edited = edited
+        self.author = author
+        self.group = group
+
+    @classmethod
+    def from_row(cls, row: tuple) -> 'PostCard':
+        *post, author_id, username, first_name, last_name, group_id, slug = row
+        author = AuthorCard(author_id, username, first_name, last_name)
+        group = GroupCard(group_id, slug) if group_id is not None else None
+        return cls(*post, author, group)
+
+    @property
+    def author_id(self) -> int:
+        return self.author.pk
+
+    @property
+    def group_id(self) -> Optional[int]:
+        return self.group.pk if self.group else None
+
+
+class PostCardIterable(ValuesListIterable):
+    """Yield `PostCard` for each row of `values_list(*PostCard.columns)`."""
+
+    def __iter__(self) -> Iterator[PostCard]:
+        for row in super().__iter__():
+            yield PostCard.from_row(row)
+
+
+def as_cards(posts: QuerySet) -> QuerySet:
+    """Posts queryset which yields `PostCard` objects. It may be filtered,
+    ordered and sliced further as usual.
+    """
+    cards: QuerySet = posts.values_list(*PostCard.columns)
+    cards._iterable_class = PostCardIterable
+    return cards
@@ -0,0 +1,104 @@
+"""Denormalized counters.
+
+Amounts of comments per post, posts per group and per tag and posts,
+followers and following per user are kept in columns (`Post.comment_count`,
+`Group.post_count`, `Tag.post_count`, `UserCounters`) instead of `COUNT(*)`
+on every page. Signals (see `posts.signals`) shift them with `F()`
+expressions, so concurrent changes are not lost. Bulk operations skip
+signals, counters drifted by them are fixed by `reconcile`
+(`reconcile_counters` command).
+"""
+from typing import Dict, Iterator, List, Optional, Tuple, Type
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, F, Model, QuerySet
+from django.db.models.functions import Greatest
+
+from .models import (
+    Comment, Follow, Group, Post, PostTag, Tag, UserCounters
+)
+
+User = get_user_model()
+
+COUNTERS: Tuple[Tuple[Type[Model], str, Type[Model], str], ...] = (
+    (Post, 'comment_count', Comment, 'post_id'),
+    (Group, 'post_count', Post, 'group_id'),
+    (UserCounters, 'posts', Post, 'author_id'),
+    (UserCounters, 'followers', Follow, 'author_id'),
+    (UserCounters, 'following', Follow, 'user_id'),
+    (Tag, 'post_count', PostTag, 'tag_id'),
+)
+"""Counter column, model it counts and the foreign key of that model."""
+
+
+def shift(queryset: QuerySet, **deltas: int) -> int:
+    """Add `deltas` to counter columns of rows in one `UPDATE`. Drifted
+    counters are not decreased below zero.
+    """
+    return queryset.update(
+        **{
+            field: F(field) + delta if delta > 0 else Greatest(
+                F(field) + delta, 0
+            )
+            for field, delta in deltas.items()
+        }
+    )
+
+
+def shift_user(user_id: int, **deltas: int) -> None:
+    shift(UserCounters.objects.filter(user_id=user_id), **deltas)
+
+
+def shift_group(group_id: Optional[int], delta: int) -> None:
+    if group_id:
+        shift(Group.objects.filter(pk=group_id), post_count=delta)
+
+
+def chunks(queryset: QuerySet, size: int) -> Iterator[List[int]]:
+    """Primary keys of `queryset` by chunks of `size` (keyset order)."""
+    pks: QuerySet = queryset.order_by('pk').values_list('pk', flat=True)
+    chunk: List[int] = list(pks[:size])
+    while chunk:
+        yield chunk
+        chunk = list(pks.filter(pk__gt=chunk[-1])[:size])
+
+
+def create_missing() -> int:
+    """Make counters for users who have not got them."""
+    users = User.objects.filter(counters__isnull=True).values_list(
+        'pk', flat=True
+    )
+    created = UserCounters.objects.bulk_create(
+        [UserCounters(user_id=pk) for pk in users], ignore_conflicts=True
+    )
+    return len(created)
+
+
+def reconcile(chunk_size: int = 1000) -> Dict[str, int]:
+    """Recount all counters chunk by chunk. Return amount of fixed rows for
+    every counter. A counter is fixed by the difference with the actual
+    amount, so changes made meanwhile are kept.
+    """
+    create_missing()
+    fixed: Dict[str, int] = {}
+    for model, field, source, key in COUNTERS:
+        name: str = f'{model.__name__}.{field}'
+        fixed[name] = 0
+        for chunk in chunks(model.objects.all(), chunk_size):
+            with transaction.atomic():
+                actual: Dict[int, int] = dict(
+                    source.objects.filter(**{f'{key}__in': chunk})
+                    .order_by()
+                    .values_list(key)
+                    .annotate(Count('pk'))
+                )
+                stored = model.objects.filter(pk__in=chunk).values_list(
+                    'pk', field
+                )
+                for pk, value in stored:
+                    delta: int = actual.get(pk, 0) - value
+                    if delta:
+                        shift(model.objects.filter(pk=pk), **{field: delta})
+                        fixed[name] += 1
+    return fixed
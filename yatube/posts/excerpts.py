@@ -0,0 +1,34 @@
+"""Excerpts of posts shown at feed pages instead of full texts."""
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.db.models import QuerySet
+from django.utils.text import Truncator
+
+
+def make_excerpt(text: str, length: Optional[int] = None) -> Tuple[str, bool]:
+    """Beginning of `text` and if there is more of it."""
+    length = length or settings.POST_EXCERPT_LENGTH
+    excerpt: str = Truncator(text).chars(length)
+    return excerpt, excerpt != text
+
+
+def backfill(posts: QuerySet, chunk_size: int = 500) -> int:
+    """Make excerpts of `posts` chunk by chunk (in primary keys order).
+    Return amount of processed posts.
+    """
+    amount: int = 0
+    last: int = 0
+    while True:
+        chunk = list(
+            posts.filter(pk__gt=last).order_by('pk').only('pk', 'text')[
+                :chunk_size
+            ]
+        )
+        if not chunk:
+            return amount
+        for post in chunk:
+            post.excerpt, post.has_more = make_excerpt(post.text)
+        posts.model.objects.bulk_update(chunk, ('excerpt', 'has_more'))
+        amount += len(chunk)
+        last = chunk[-1].pk
@@ -0,0 +1,145 @@
+"""Streaming export of posts, comments and follows to JSONL or CSV.
+
+Rows are read by keyset chunks of primary keys and serialized line by line
+by generators, optionally gzip-compressed on the fly, so memory does not
+depend on table size. Post rows have the fields `import_posts` reads, so
+an export may be imported back.
+"""
+import csv
+import json
+import zlib
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from django.db.models import Model, QuerySet
+
+from .models import Comment, Follow, Post
+
+Columns = Tuple[Tuple[str, str], ...]
+
+EXPORTS: Dict[str, Tuple[Model, Columns]] = {
+    'posts': (
+        Post,
+        (
+            ('id', 'pk'),
+            ('author', 'author__username'),
+            ('group', 'group__slug'),
+            ('text', 'text'),
+            ('created', 'created'),
+            ('edited', 'edited'),
+            ('image', 'image'),
+        ),
+    ),
+    'comments': (
+        Comment,
+        (
+            ('id', 'pk'),
+            ('post', 'post_id'),
+            ('author', 'author__username'),
+            ('text', 'text'),
+            ('created', 'created'),
+        ),
+    ),
+    'follows': (
+        Follow,
+        (
+            ('id', 'pk'),
+            ('user', 'user__username'),
+            ('author', 'author__username'),
+        ),
+    ),
+}
+"""Exported tables: model and (name, lookup) of every column."""
+
+FORMATS: Tuple[str, ...] = ('jsonl', 'csv')
+
+CONTENT_TYPES: Dict[str, str] = {
+    'jsonl': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def rows(
+    queryset: QuerySet, lookups: Iterable[str], chunk_size: int = 1000
+) -> Iterator[tuple]:
+    """Rows of `values_list(*lookups)` (primary key first) read by keyset
+    chunks: every query starts after the last primary key of the previous
+    one, so it does not slow down deep into the table as OFFSET does.
+    """
+    queryset = queryset.order_by('pk').values_list(*lookups)
+    last = None
+    while True:
+        chunk: QuerySet = queryset
+        if last is not None:
+            chunk = chunk.filter(pk__gt=last)
+        amount = 0
+        for row in chunk[:chunk_size].iterator():
+            amount += 1
+            last = row[0]
+            yield row
+        if amount < chunk_size:
+            return
+
+
+def plain(value):
+    """JSON and CSV friendly value of a column."""
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if value is not None and not isinstance(value, (int, float, str)):
+        return str(value)
+    return value
+
+
+class Echo:
+    """File-like object for `csv.writer` which returns the written line."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def lines(
+    rows: Iterable[tuple], names: List[str], format: str
+) -> Iterator[str]:
+    if format == 'csv':
+        writer = csv.writer(Echo())
+        yield writer.writerow(names)
+        for row in rows:
+            yield writer.writerow(
+                ['' if value is None else plain(value) for value in row]
+            )
+        return
+    for row in rows:
+        record = {name: plain(value) for name, value in zip(names, row)}
+        yield json.dumps(record, ensure_ascii=False) + '\n'
+
+
+def gzipped(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Compress chunks to a gzip stream as they come."""
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        compressed: bytes = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export(
+    table: str,
+    format: str = 'jsonl',
+    compress: bool = False,
+    chunk_size: int = 1000,
+) -> Iterator[bytes]:
+    """Encoded export of one of `EXPORTS` tables."""
+    model, columns = EXPORTS[table]
+    names: List[str] = [name for name, _ in columns]
+    lookups: List[str] = [lookup for _, lookup in columns]
+    encoded: Iterator[bytes] = (
+        line.encode('utf-8')
+        for line in lines(
+            rows(model.objects.all(), lookups, chunk_size), names, format
+        )
+    )
+    return gzipped(encoded) if compress else encoded
+
+
+def filename(table: str, format: str, compress: bool = False) -> str:
+    return f'{table}.{format}' + ('.gz' if compress else '')
@@ -0,0 +1,350 @@
+"""Cache of rendered feed pages.
+
+Every cached page key contains versions of the feeds the page is made of.
+Signals (see `posts.signals`) replace versions of the feeds touched by
+changed posts, groups or users, so stale pages are never looked up again
+and feed pages may be kept in cache for hours.
+
+Feeds are named as `index`, `group:<slug>`, `author:<username>`,
+`tag:<name>`, `top_tags` (pages showing popular tags), `post:<pk>` (post
+page with its comments), `follow:<user pk>` (follow page of the user and
+follow buttons shown to him) and `celebrities` (posts of authors which are
+not fanned out, see `posts.timeline`). Version
+of `all` feed is a part of every key: it is changed when something shown at
+every feed (like group slug or author name) is edited.
+
+Cards of posts (`posts/includes/post.html`) are cached one by one as well,
+so a feed page rendering makes a single `get_many` call and renders only the
+missing cards (see `render_cards`). Cards showing a placeholder instead of
+a thumbnail which is being made (see `posts.thumbnails`) are not cached.
+
+Pages are the same for every user: user specific parts of them are cut out
+as holes and filled in after the cache lookup (see `core.donut`).
+
+Pages are rendered single-flight: only the request which took a short lock
+renders the page, the others get the previous version of it (stale while
+revalidate) or wait a bit for the fresh one. Hits, misses, stale responses
+and lock waits are counted (see `stats`).
+
+Versions start with the time they were made at, so they are watermarks for
+conditional GET too: `ETag` and `Last-Modified` of a page are taken from
+versions of its feeds and `304 Not Modified` is answered before the view is
+called (see `conditional_feed`).
+"""
+import hashlib
+import time
+from functools import wraps
+from typing import (
+    Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+)
+from uuid import uuid4
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIRequest
+from django.http import HttpRequest, HttpResponse
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from core.donut import fill_holes
+
+FeedsFunc = Callable[..., Sequence[str]]
+
+
+def group_feed(slug: str) -> str:
+    return f'group:{slug}'
+
+
+def author_feed(username: str) -> str:
+    return f'author:{username}'
+
+
+def tag_feed(name: str) -> str:
+    return f'tag:{name}'
+
+
+def post_feed(pk: int) -> str:
+    return f'post:{pk}'
+
+
+def follow_feed(user_id: int) -> str:
+    return f'follow:{user_id}'
+
+
+def post_feeds(post_id: int) -> List[str]:
+    """Post page shows amount of author posts, so it is a part of author
+    feed too. Author of post is kept in cache to avoid database lookups.
+    """
+    key = f'post_author:{post_id}'
+    username: Optional[str] = cache.get(key)
+    if username is None:
+        from .models import Post
+
+        username = (
+            Post.objects.filter(pk=post_id)
+            .values_list('author__username', flat=True)
+            .first()
+        ) or ''
+        cache.set(key, username, settings.FEED_CACHE_TIME)
+    return [post_feed(post_id), author_feed(username)]
+
+
+def version_key(feed: str) -> str:
+    return f'feed_version:{feed}'
+
+
+def new_version() -> str:
+    """Unique version which starts with the current timestamp."""
+    return f'{time.time():.6f}-{uuid4().hex[:12]}'
+
+
+def version_time(version: str) -> float:
+    return float(version.partition('-')[0])
+
+
+def feed_versions(feeds: Iterable[str]) -> List[str]:
+    keys: List[str] = [version_key(feed) for feed in ('all', *feeds)]
+    versions: Dict[str, str] = cache.get_many(keys)
+    missing = {key: new_version() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def invalidate_feeds(*feeds: str) -> None:
+    """Drop all cached pages of the given feeds."""
+    version: str = new_version()
+    cache.set_many({version_key(feed): version for feed in feeds}, None)
+
+
+def page_cache_keys(
+    request: WSGIRequest, feeds: Sequence[str]
+) -> Tuple[str, str]:
+    """Key of the page for current feeds versions and key of the latest
+    version of the page (which is served while fresh one is rendering).
+    """
+    path: str = request.get_full_path()
+    key: str = ':'.join([*feed_versions(feeds), path])
+    stale_key: str = ':'.join([*feeds, path])
+    return (
+        'feed_page:' + hashlib.md5(key.encode()).hexdigest(),
+        'feed_page_stale:' + hashlib.md5(stale_key.encode()).hexdigest(),
+    )
+
+
+STATS = ('hit', 'miss', 'stale', 'lock_wait')
+
+
+def stat_key(event: str) -> str:
+    return f'feed_cache_stats:{event}'
+
+
+def count(event: str) -> None:
+    key: str = stat_key(event)
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            pass
+
+
+def stats() -> Dict[str, int]:
+    values: Dict[str, int] = cache.get_many([stat_key(e) for e in STATS])
+    return {event: values.get(stat_key(event), 0) for event in STATS}
+
+
+def reset_stats() -> None:
+    cache.delete_many([stat_key(event) for event in STATS])
+
+
+def single_flight(
+    key: str, stale_key: str, render: Callable[[], HttpResponse]
+) -> HttpResponse:
+    """Get response from cache or render it holding a lock, so concurrent
+    requests do not render the same page at once.
+    """
+    entry: Dict[str, Any] = cache.get(key)
+    if entry and entry['fresh_until'] > time.time():
+        count('hit')
+        return entry['response']
+
+    lock_key: str = key + ':lock'
+    if not cache.add(lock_key, 1, settings.FEED_CACHE_LOCK_TIME):
+        stale: Dict[str, Any] = entry or cache.get(stale_key)
+        if stale:
+            count('stale')
+            return stale['response']
+        count('lock_wait')
+        deadline: float = time.monotonic() + settings.FEED_CACHE_LOCK_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(settings.FEED_CACHE_LOCK_POLL)
+            entry = cache.get(key)
+            if entry:
+                return entry['response']
+        # lock holder is too slow, render the page by ourselves
+
+    count('miss')
+    try:
+        response: HttpResponse = render()
+        if response.status_code == 200 and not response.streaming:
+            entry = {
+                'response': response,
+                'fresh_until': time.time() + settings.FEED_CACHE_TIME,
+            }
+            cache.set_many(
+                {key: entry, stale_key: entry},
+                settings.FEED_CACHE_TIME + settings.FEED_CACHE_STALE_TIME,
+            )
+    finally:
+        cache.delete(lock_key)
+    return response
+
+
+def cache_feed(feeds: FeedsFunc) -> Callable:
+    """Cache view response until one of its feeds is changed.
+
+    `feeds` is called with view arguments (without request) and returns
+    names of feeds the page is made of.
+    """
+
+    def decorator(view: Callable) -> Callable:
+        @wraps(view)
+        def wrapper(request: WSGIRequest, *args, **kwargs) -> HttpResponse:
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+
+            key, stale_key = page_cache_keys(request, feeds(*args, **kwargs))
+            request.donut = True
+            response: HttpResponse = single_flight(
+                key, stale_key, lambda: view(request, *args, **kwargs)
+            )
+            return fill_holes(request, response)
+
+        return wrapper
+
+    return decorator
+
+
+def page_validators(
+    request: WSGIRequest, feeds: Sequence[str]
+) -> Tuple[str, float]:
+    """`ETag` and `Last-Modified` timestamp of the page made of `feeds`.
+
+    Holes of the page depend on user, his follows and CSRF token, so they
+    are parts of `ETag` as well.
+    """
+    user_id: Optional[int] = request.user.pk
+    if user_id is not None:
+        feeds = [*feeds, follow_feed(user_id)]
+    versions: List[str] = feed_versions(feeds)
+    tag: str = ':'.join(
+        [
+            *versions,
+            str(user_id),
+            request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+            request.get_full_path(),
+        ]
+    )
+    etag: str = '"%s"' % hashlib.md5(tag.encode()).hexdigest()
+    return etag, max(version_time(version) for version in versions)
+
+
+def conditional_feed(feeds: FeedsFunc) -> Callable:
+    """Answer `304 Not Modified` if none of the page feeds was changed
+    since the client got the page. Nothing but versions of feeds is loaded
+    for that. `feeds` is the same as for `cache_feed`.
+    """
+
+    def decorator(view: Callable) -> Callable:
+        @wraps(view)
+        def wrapper(request: WSGIRequest, *args, **kwargs) -> HttpResponse:
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+
+            etag, last_modified = page_validators(
+                request, feeds(*args, **kwargs)
+            )
+            response: Optional[HttpResponse] = get_conditional_response(
+                request, etag=etag, last_modified=int(last_modified)
+            )
+            if response is None:
+                response = view(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                response['ETag'] = etag
+                response['Last-Modified'] = http_date(last_modified)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def feed_page(feeds: FeedsFunc) -> Callable:
+    """`conditional_feed` and `cache_feed` for a shared feed page."""
+
+    def decorator(view: Callable) -> Callable:
+        return conditional_feed(feeds)(cache_feed(feeds)(view))
+
+    return decorator
+
+
+PENDING_MARK = 'data-pending'
+"""Attribute of placeholder images, cards with it are not cached."""
+
+
+def card_cache_key(post, version: str, flags: str) -> str:
+    return f'post_card:{post.pk}:{post.edited.timestamp()}:{version}:{flags}'
+
+
+def render_cards(posts: Iterable, **flags: Any) -> List[str]:
+    """Render post cards for feed page using cached fragments.
+
+    Card is made of post itself (its `edited` time is a part of the key),
+    its author and group (changes of them replace version of `all` feed),
+    and context flags of the feed page (like `profile` or `group`).
+    """
+    posts = list(posts)
+    version: str = feed_versions([])[0]
+    flags_key: str = ','.join(sorted(key for key, on in flags.items() if on))
+    keys: List[str] = [card_cache_key(p, version, flags_key) for p in posts]
+    cards: Dict[str, str] = cache.get_many(keys)
+
+    # thumbnails of all missing cards are looked up by one request
+    from .thumbnails import image_name, prefetch
+
+    prefetch(
+        image_name(post)
+        for post, key in zip(posts, keys)
+        if key not in cards and post.image
+    )
+    missing: Dict[str, str] = {}
+    for post, key in zip(posts, keys):
+        if key not in cards:
+            missing[key] = render_to_string(
+                'posts/includes/post.html', {'post': post, **flags}
+            )
+    if missing:
+        cache.set_many(
+            {
+                key: card
+                for key, card in missing.items()
+                if PENDING_MARK not in card
+            },
+            settings.FEED_CACHE_TIME,
+        )
+        cards.update(missing)
+    return [cards[key] for key in keys]
+
+
+def warm(view: Callable, path: str, *args, **kwargs) -> None:
+    """Render the first page of feed for anonymous user and put it to cache
+    (write-through instead of waiting for the first reader).
+    """
+    request = HttpRequest()
+    request.method = 'GET'
+    request.path = request.path_info = path
+    request.user = AnonymousUser()
+    view(request, *args, **kwargs)
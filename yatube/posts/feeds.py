@@ -0,0 +1,131 @@
+"""RSS and Atom feeds of the index, groups and authors.
+
+Feeds are made of the same querysets as the HTML feed pages (see
+`posts.queries`) and are cached and validated with the versions of the same
+feeds (see `posts.feed_cache`), so a new or edited post refreshes them
+together with the pages.
+"""
+from typing import Iterable, List
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.syndication.views import Feed
+from django.db.models import QuerySet
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+
+from . import feed_cache, queries
+from .models import Group
+
+User = get_user_model()
+
+
+def latest(posts: QuerySet) -> QuerySet:
+    return posts.order_by('-created', '-pk')[:settings.SYNDICATION_ITEMS]
+
+
+class PostsFeed(Feed):
+    """Items are post cards: instances or `PostCard` read models."""
+
+    def item_title(self, post) -> str:
+        return post.excerpt.split('\n', 1)[0][:80]
+
+    def item_description(self, post) -> str:
+        return post.excerpt
+
+    def item_link(self, post) -> str:
+        return reverse('posts:post_detail', args=[post.pk])
+
+    def item_author_name(self, post) -> str:
+        return post.author.get_full_name() or post.author.get_username()
+
+    def item_pubdate(self, post):
+        return post.created
+
+    def item_updateddate(self, post):
+        return post.edited
+
+
+class IndexFeed(PostsFeed):
+    title = 'Yatube: последние обновления'
+    description = 'Последние записи всех пользователей.'
+
+    def link(self) -> str:
+        return reverse('posts:index')
+
+    def items(self) -> Iterable:
+        return latest(queries.index_posts())
+
+
+class GroupFeed(PostsFeed):
+    def get_object(self, request, slug: str) -> Group:
+        return get_object_or_404(Group, slug=slug)
+
+    def title(self, group: Group) -> str:
+        return f'Yatube: {group.title}'
+
+    def description(self, group: Group) -> str:
+        return group.description
+
+    def link(self, group: Group) -> str:
+        return reverse('posts:group_list', args=[group.slug])
+
+    def items(self, group: Group) -> Iterable:
+        return latest(queries.group_posts(group))
+
+
+class AuthorFeed(PostsFeed):
+    def get_object(self, request, username: str) -> User:
+        return get_object_or_404(User, username=username)
+
+    def title(self, author: User) -> str:
+        return f'Yatube: {author.get_full_name() or author.get_username()}'
+
+    def description(self, author: User) -> str:
+        return f'Записи пользователя {author.get_username()}.'
+
+    def link(self, author: User) -> str:
+        return reverse('posts:profile', args=[author.get_username()])
+
+    def items(self, author: User) -> Iterable:
+        return latest(queries.author_posts(author))
+
+
+class AtomMixin:
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj=None) -> str:
+        return self._get_dynamic_attr('description', obj)
+
+
+class IndexAtomFeed(AtomMixin, IndexFeed):
+    pass
+
+
+class GroupAtomFeed(AtomMixin, GroupFeed):
+    pass
+
+
+class AuthorAtomFeed(AtomMixin, AuthorFeed):
+    pass
+
+
+def index_feeds() -> List[str]:
+    return ['index']
+
+
+def group_feeds(slug: str) -> List[str]:
+    return [feed_cache.group_feed(slug)]
+
+
+def author_feeds(username: str) -> List[str]:
+    return [feed_cache.author_feed(username)]
+
+
+index_rss = feed_cache.feed_page(index_feeds)(IndexFeed())
+index_atom = feed_cache.feed_page(index_feeds)(IndexAtomFeed())
+group_rss = feed_cache.feed_page(group_feeds)(GroupFeed())
+group_atom = feed_cache.feed_page(group_feeds)(GroupAtomFeed())
+author_rss = feed_cache.feed_page(author_feeds)(AuthorFeed())
+author_atom = feed_cache.feed_page(author_feeds)(AuthorAtomFeed())
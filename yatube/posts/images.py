@@ -0,0 +1,126 @@
+"""Size, dominant color and preview of post images.
+
+They are taken from the image file once, when a new image of a post is
+normalized (see `posts.uploads`), so pages show sized images with an
+instant placeholder without opening files or asking the thumbnails store.
+The preview (LQIP) is a tiny JPEG at most `IMAGE_PREVIEW_SIZE` pixels
+wide inlined as a data URI, it is shown stretched while the image is
+loading.
+"""
+import logging
+from base64 import b64encode
+from io import BytesIO
+from typing import IO, NamedTuple
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.db.models import QuerySet
+from PIL import Image, ImageOps
+
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+ORIENTATION = 0x0112
+"""EXIF tag of image orientation, values 5-8 mean it is turned sideways."""
+
+PREVIEW_QUALITY = 40
+
+FIELDS = ('image_width', 'image_height', 'image_color', 'image_preview')
+
+
+class ImageInfo(NamedTuple):
+    width: int
+    height: int
+    color: str
+    preview: str
+
+
+def describe(file: IO[bytes]) -> ImageInfo:
+    """Size (as the image is shown, EXIF orientation applied), average
+    color and preview of the image. The file is read from the start and
+    rewound after that.
+    """
+    size: int = settings.IMAGE_PREVIEW_SIZE
+    file.seek(0)
+    with Image.open(file) as image:
+        width, height = image.size
+        if image.getexif().get(ORIENTATION) in (5, 6, 7, 8):
+            width, height = height, width
+        # JPEG is decoded at once at a smaller scale
+        image.draft('RGB', (size, size))
+        small: Image.Image = ImageOps.exif_transpose(image).convert('RGB')
+    file.seek(0)
+
+    small.thumbnail((size, size))
+    red, green, blue = small.resize((1, 1), Image.BOX).getpixel((0, 0))
+    buffer = BytesIO()
+    small.save(buffer, 'JPEG', quality=PREVIEW_QUALITY)
+    preview: str = b64encode(buffer.getvalue()).decode()
+    return ImageInfo(
+        width,
+        height,
+        f'#{red:02x}{green:02x}{blue:02x}',
+        f'data:image/jpeg;base64,{preview}',
+    )
+
+
+def clear(post: Post) -> None:
+    post.image_width = post.image_height = None
+    post.image_color = post.image_preview = ''
+
+
+def fill(post: Post, force: bool = False) -> None:
+    """Describe a new image of post (or the one which was not described,
+    or any one if `force`). Fields are cleared if there is no image and
+    left as they are if the image is broken.
+    """
+    image = post.image
+    if not image:
+        clear(post)
+        return
+    if image._committed and post.image_width is not None and not force:
+        return
+    try:
+        if image._committed:
+            with image.storage.open(image.name) as file:
+                info: ImageInfo = describe(file)
+        else:
+            info = describe(image.file)
+    except (
+        OSError,
+        ValueError,
+        SuspiciousFileOperation,
+        Image.DecompressionBombError,
+    ):
+        logger.warning('Image %s is not described', image.name, exc_info=True)
+        return
+    post.image_width = info.width
+    post.image_height = info.height
+    post.image_color = info.color
+    post.image_preview = info.preview
+
+
+def backfill(
+    posts: QuerySet, chunk_size: int = 100, force: bool = False
+) -> int:
+    """Describe images of `posts` chunk by chunk (in primary keys order).
+    Return amount of described images.
+    """
+    amount: int = 0
+    last: int = 0
+    posts = posts.exclude(image='')
+    while True:
+        chunk = list(
+            posts.filter(pk__gt=last).order_by('pk').only('image', *FIELDS)[
+                :chunk_size
+            ]
+        )
+        if not chunk:
+            return amount
+        for post in chunk:
+            fill(post, force)
+        described = [post for post in chunk if post.image_width is not None]
+        posts.model.objects.bulk_update(described, FIELDS)
+        amount += len(described)
+        last = chunk[-1].pk
@@ -0,0 +1,52 @@
+"""Re-encoding of uploaded post images (see `posts.uploads`).
+
+It runs in worker processes which are started clean (not forked from a
+process with open connections and threads), so this module imports nothing
+but Pillow: the workers do not set Django up.
+"""
+from io import BytesIO
+from typing import Optional, Tuple
+
+from PIL import Image, ImageOps
+
+
+def normalize(
+    data: bytes, max_edge: int, quality: int
+) -> Optional[Tuple[bytes, str]]:
+    """Content and extension of the normalized image, None if it is kept
+    as it is.
+    """
+    with Image.open(BytesIO(data)) as image:
+        if getattr(image, 'n_frames', 1) > 1:
+            return None
+        icc_profile: Optional[bytes] = image.info.get('icc_profile')
+        # JPEG is decoded at once at the smallest scale above the limit
+        image.draft('RGB', (max_edge, max_edge))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_edge, max_edge), Image.LANCZOS)
+        # PNG writer saves EXIF kept at `info` (the rest of it, besides
+        # orientation, is left there by `exif_transpose`)
+        image.info.pop('exif', None)
+        transparent: bool = image.mode in ('RGBA', 'LA') or (
+            image.mode == 'P' and 'transparency' in image.info
+        )
+        buffer = BytesIO()
+        if transparent:
+            image.save(
+                buffer,
+                'PNG',
+                optimize=True,
+                icc_profile=icc_profile,
+                exif=b'',
+            )
+            return buffer.getvalue(), 'png'
+        image.convert('RGB').save(
+            buffer,
+            'JPEG',
+            quality=quality,
+            optimize=True,
+            progressive=True,
+            icc_profile=icc_profile,
+            exif=b'',
+        )
+        return buffer.getvalue(), 'jpg'
@@ -0,0 +1,320 @@
+"""Bulk import of posts from JSONL or CSV files.
+
+Records are read one by one, so files of any size are streamed. Every
+record is a mapping with `author` (username), `group` (slug, optional),
+`text`, `created` (ISO 8601, optional) and `image` (path at media storage,
+optional). Posts are inserted by `bulk_create` batches, each one in its own
+transaction. The checkpoint file is moved forward after every committed
+batch: after a failure the import is resumed from the first not committed
+record. Authors and groups of the committed posts are kept at the
+checkpoint too, so the resumed import refreshes their feeds as well.
+
+`bulk_create` does not send signals, so everything they keep up to date is
+done here: excerpts, image sizes and previews, counters, search index,
+tags, cached feeds, timelines and thumbnails of images.
+"""
+import csv
+import json
+import os
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max, QuerySet
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import counters, images, search, tags, thumbnails, timeline
+from .excerpts import make_excerpt
+from .feed_cache import invalidate_feeds
+from .models import Follow, Group, Post
+from .paginator import feed_count_key
+
+User = get_user_model()
+
+Record = Dict[str, str]
+
+
+class RecordError(ValueError):
+    """Record which can not be imported."""
+
+
+def read_records(path: str, format: Optional[str] = None) -> Iterator[Record]:
+    """Records of JSONL or CSV file (format is taken from file extension if
+    it is not given). Broken JSON lines are yielded as RecordError.
+    """
+    format = format or os.path.splitext(path)[1].lstrip('.').lower()
+    with open(path, newline='', encoding='utf-8') as file:
+        if format == 'csv':
+            yield from csv.DictReader(file)
+            return
+        if format not in ('jsonl', 'json'):
+            raise ValueError(f'Unknown format of posts file: {format}')
+        for line in file:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as error:
+                yield RecordError(f'broken JSON: {error}')
+
+
+class Checkpoint:
+    """
+    Amount of records of a file which are already imported and primary keys
+    of authors and groups of their posts.
+
+    Parameters
+    ----------
+    path: `str`
+        JSON file the state is kept at. It is replaced atomically, so it is
+        never left half written.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def read(self) -> Dict[str, Any]:
+        try:
+            with open(self.path) as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+
+    def load(self) -> int:
+        return self.read().get('position', 0)
+
+    def touched(self) -> Tuple[Set[int], Set[int]]:
+        """Authors and groups of the already imported posts."""
+        state: Dict[str, Any] = self.read()
+        return set(state.get('authors', ())), set(state.get('groups', ()))
+
+    def save(
+        self,
+        position: int,
+        author_ids: Iterable[int] = (),
+        group_ids: Iterable[int] = (),
+    ) -> None:
+        state: Dict[str, Any] = {
+            'position': position,
+            'authors': sorted(author_ids),
+            'groups': sorted(group_ids),
+        }
+        temporary: str = self.path + '.tmp'
+        with open(temporary, 'w') as file:
+            json.dump(state, file)
+        os.replace(temporary, self.path)
+
+    def clear(self) -> None:
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def parse_created(value: Optional[str]) -> datetime:
+    """Date of imported post, the current time if it is not given."""
+    if not value:
+        return timezone.now()
+    try:
+        created: Optional[datetime] = parse_datetime(value)
+    except ValueError:
+        created = None
+    if created is None:
+        raise RecordError(f'wrong date {value!r}')
+    if timezone.is_naive(created):
+        created = timezone.make_aware(created)
+    return created
+
+
+@contextmanager
+def keep_dates() -> Iterator[None]:
+    """Let `bulk_create` save given `created` and `edited` values instead
+    of the current time.
+    """
+    fields = [Post._meta.get_field(name) for name in ('created', 'edited')]
+    flags = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, flags):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def lock_posts() -> None:
+    """Take the write lock of the database for the current transaction.
+    SQLite begins transactions deferred, it is taken by the first write
+    (even one which changes nothing), so posts saved by the site can not
+    get in between reading the last primary key and the insert.
+    """
+    Post.objects.filter(pk=0).update(has_more=False)
+
+
+class PostImporter:
+    """
+    Import posts by batches. Authors and groups are resolved by in-memory
+    maps filled with one query per batch for unknown names only.
+
+    Parameters
+    ----------
+    batch_size: `int`
+        Amount of posts inserted in one transaction.
+    checkpoint: `Checkpoint`
+        Amount of already imported records, they are skipped.
+    """
+
+    def __init__(self, batch_size: int, checkpoint: Checkpoint) -> None:
+        self.batch_size = batch_size
+        self.checkpoint = checkpoint
+        self.authors: Dict[str, int] = {}
+        self.groups: Dict[str, int] = {}
+        self.imported = 0
+        self.errors: List[Tuple[int, str]] = []
+        self.author_ids: Set[int] = set()
+        self.group_ids: Set[int] = set()
+
+    def resolve(self, batch: List[Tuple[int, Record]]) -> None:
+        records = [r for _, r in batch if isinstance(r, dict)]
+        usernames = {r.get('author') for r in records} - set(self.authors)
+        slugs = {r.get('group') for r in records} - set(self.groups)
+        self.authors.update(
+            User.objects.filter(username__in=usernames - {None}).values_list(
+                'username', 'pk'
+            )
+        )
+        self.groups.update(
+            Group.objects.filter(slug__in=slugs - {None, ''}).values_list(
+                'slug', 'pk'
+            )
+        )
+
+    def build(self, record: Record) -> Post:
+        if isinstance(record, RecordError):
+            raise record
+        if not isinstance(record, dict):
+            raise RecordError('record is not an object')
+        text: str = (record.get('text') or '').strip()
+        if not text:
+            raise RecordError('empty text')
+        author_id: Optional[int] = self.authors.get(record.get('author'))
+        if author_id is None:
+            raise RecordError(f'unknown author {record.get("author")!r}')
+        slug: Optional[str] = record.get('group') or None
+        group_id: Optional[int] = self.groups.get(slug)
+        if slug and group_id is None:
+            raise RecordError(f'unknown group {slug!r}')
+
+        created: datetime = parse_created(record.get('created'))
+        excerpt, has_more = make_excerpt(text)
+        post = Post(
+            text=text,
+            author_id=author_id,
+            group_id=group_id,
+            created=created,
+            edited=created,
+            image=record.get('image') or '',
+            excerpt=excerpt,
+            has_more=has_more,
+        )
+        images.fill(post)
+        return post
+
+    def insert(self, batch: List[Tuple[int, Record]]) -> None:
+        self.resolve(batch)
+        posts: List[Post] = []
+        for number, record in batch:
+            try:
+                posts.append(self.build(record))
+            except RecordError as error:
+                self.errors.append((number, str(error)))
+
+        with transaction.atomic(), keep_dates():
+            lock_posts()
+            last: int = Post.objects.aggregate(last=Max('pk'))['last'] or 0
+            Post.objects.bulk_create(posts)
+            self.count(posts)
+            # bulk_create does not return primary keys on every database
+            created: QuerySet = Post.objects.filter(pk__gt=last)
+            search.index_posts(created)
+            tags.sync(created.only('pk', 'text', 'created'))
+            self.fan_out(created)
+            uploaded: List[Tuple[int, str]] = list(
+                created.exclude(image='').values_list('pk', 'image')
+            )
+        self.checkpoint.save(batch[-1][0], self.author_ids, self.group_ids)
+        for pk, image in uploaded:
+            thumbnails.schedule(image, pk)
+        self.imported += len(posts)
+
+    def count(self, posts: List[Post]) -> None:
+        """Shift counters of authors and groups of inserted posts."""
+        authors: Dict[int, int] = {}
+        groups: Dict[int, int] = {}
+        for post in posts:
+            authors[post.author_id] = authors.get(post.author_id, 0) + 1
+            if post.group_id:
+                groups[post.group_id] = groups.get(post.group_id, 0) + 1
+        for author_id, amount in authors.items():
+            counters.shift_user(author_id, posts=amount)
+        for group_id, amount in groups.items():
+            counters.shift_group(group_id, amount)
+        self.author_ids.update(authors)
+        self.group_ids.update(groups)
+
+    def fan_out(self, created: QuerySet) -> None:
+        """Put inserted posts into timelines of followers of their authors,
+        posts of celebrities are merged at read time (as `timeline.fan_out`
+        does for a saved post).
+        """
+        authors: Dict[int, List[Tuple[int, datetime]]] = {}
+        for pk, author_id, posted in created.values_list(
+            'pk', 'author_id', 'created'
+        ):
+            authors.setdefault(author_id, []).append((pk, posted))
+        for author_id, posts in authors.items():
+            if timeline.is_fanout_author(author_id):
+                timeline.write(timeline.followers(author_id), posts)
+
+    def run(self, records: Iterator[Record]) -> Iterator[int]:
+        """Import records batch by batch. Yield amount of imported posts
+        after every batch.
+        """
+        start: int = self.checkpoint.load()
+        author_ids, group_ids = self.checkpoint.touched()
+        self.author_ids.update(author_ids)
+        self.group_ids.update(group_ids)
+        batch: List[Tuple[int, Record]] = []
+        for number, record in enumerate(records, 1):
+            if number <= start:
+                continue
+            batch.append((number, record))
+            if len(batch) >= self.batch_size:
+                self.insert(batch)
+                batch = []
+                yield self.imported
+        if batch:
+            self.insert(batch)
+            yield self.imported
+        self.finish()
+        self.checkpoint.clear()
+
+    def finish(self) -> None:
+        """Drop cached counts and pages which show the new posts."""
+        if not self.author_ids:
+            return
+        followers: QuerySet = Follow.objects.filter(
+            author_id__in=self.author_ids
+        ).values('user_id')
+        cache.delete_many(
+            [feed_count_key('index')]
+            + [feed_count_key('author', pk) for pk in self.author_ids]
+            + [feed_count_key('group', pk) for pk in self.group_ids]
+            + [
+                feed_count_key('follow', row['user_id'])
+                for row in followers
+            ]
+        )
+        invalidate_feeds('all')
@@ -0,0 +1,99 @@
+"""Key value store of sorl-thumbnail used by `posts.thumbnails`.
+
+sorl-thumbnail keeps a record of every made thumbnail (its name and size)
+in a key value store. The default one asks the Django cache and then the
+database for every record, so a feed page with a few cards needs a round
+trip per thumbnail. This store keeps found records in an in-process LRU
+(`THUMBNAIL_LRU_SIZE` of them) in front of the cache and loads records of a
+whole page at once (see `KVStore.prefetch`): by one `get_many` from the
+cache and one query for the ones missing there.
+
+Only found records are kept in the LRU: a thumbnail which is missing now
+may be made by a worker of another process at any moment. Misses are cached
+for `THUMBNAIL_MISS_TIMEOUT` seconds only (sorl-thumbnail caches them as
+long as found records), so the cache of a process which did not make the
+thumbnail forgets them soon. Records of
+deleted thumbnails may live in the LRU of other processes for a while, but
+a thumbnail is made again with the same name and size.
+"""
+from typing import Any, Dict, Iterable, List
+
+from django.conf import settings
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores import cached_db_kvstore
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from core.functools.utils import LRUDict
+
+EMPTY_VALUE = cached_db_kvstore.EMPTY_VALUE
+
+
+class KVStore(cached_db_kvstore.KVStore):
+    def __init__(self) -> None:
+        super().__init__()
+        self.lru = LRUDict(settings.THUMBNAIL_LRU_SIZE)
+
+    def prefetch(self, image_files: Iterable[ImageFile]) -> None:
+        """Load records of image files which are not in the LRU yet."""
+        keys: List[str] = [
+            key
+            for key in dict.fromkeys(add_prefix(f.key) for f in image_files)
+            if self.lru.get(key) is None
+        ]
+        if not keys:
+            return
+        values: Dict[str, Any] = self.cache.get_many(keys)
+        missing: List[str] = [key for key in keys if key not in values]
+        if missing:
+            found: Dict[str, str] = dict(
+                KVStoreModel.objects.filter(key__in=missing).values_list(
+                    'key', 'value'
+                )
+            )
+            self.cache.set_many(found, sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+            # missing records are cached briefly too, as in `_get_raw`
+            absent: Dict[str, Any] = {
+                key: EMPTY_VALUE for key in missing if key not in found
+            }
+            self.cache.set_many(absent, settings.THUMBNAIL_MISS_TIMEOUT)
+            values.update(found)
+        for key, value in values.items():
+            if value != EMPTY_VALUE:
+                self.lru.set(key, value)
+
+    def clear(self, delete_thumbnails: bool = False) -> None:
+        self.lru.clear()
+        super().clear(delete_thumbnails)
+
+    def _get_raw(self, key: str):
+        value = self.lru.get(key)
+        if value is not None:
+            return value
+        value = self.cache.get(key)
+        if value is None:
+            value = (
+                KVStoreModel.objects.filter(key=key)
+                .values_list('value', flat=True)
+                .first()
+            )
+            if value is None:
+                # a missing record is cached briefly: a worker makes it soon
+                self.cache.set(
+                    key, EMPTY_VALUE, settings.THUMBNAIL_MISS_TIMEOUT
+                )
+                return None
+            self.cache.set(key, value, sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+        if value == EMPTY_VALUE:
+            return None
+        self.lru.set(key, value)
+        return value
+
+    def _set_raw(self, key: str, value: str) -> None:
+        super()._set_raw(key, value)
+        self.lru.set(key, value)
+
+    def _delete_raw(self, *keys: str) -> None:
+        super()._delete_raw(*keys)
+        self.lru.delete(*keys)
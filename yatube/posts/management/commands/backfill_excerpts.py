@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from posts.excerpts import backfill
+from posts.feed_cache import invalidate_feeds
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Make excerpts of posts which were saved without them.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            dest='everything',
+            help='Remake excerpts of all posts (e.g. after changing '
+            'POST_EXCERPT_LENGTH).',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Amount of posts updated by one query.',
+        )
+
+    def handle(self, *args, everything=False, chunk_size=500, **options):
+        posts = Post.objects.all()
+        if not everything:
+            posts = posts.filter(excerpt='')
+        amount = backfill(posts, chunk_size)
+        if amount:
+            # cached cards are keyed by `edited`, which is not changed here
+            invalidate_feeds('all')
+        self.stdout.write(
+            self.style.SUCCESS(f'Excerpts are made for {amount} posts.')
+        )
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from posts.feed_cache import invalidate_feeds
+from posts.images import backfill
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Store sizes, colors and previews of images of posts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            dest='everything',
+            help='Describe images of all posts (e.g. after changing '
+            'IMAGE_PREVIEW_SIZE).',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=100,
+            help='Amount of posts updated by one query.',
+        )
+
+    def handle(self, *args, everything=False, chunk_size=100, **options):
+        posts = Post.objects.all()
+        if not everything:
+            posts = posts.filter(image_width__isnull=True)
+        amount = backfill(posts, chunk_size, force=everything)
+        if amount:
+            # cached cards are keyed by `edited`, which is not changed here
+            invalidate_feeds('all')
+        self.stdout.write(
+            self.style.SUCCESS(f'Images of {amount} posts are described.')
+        )
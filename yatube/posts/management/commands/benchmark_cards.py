@@ -0,0 +1,79 @@
+import time
+import tracemalloc
+from typing import Callable, List, Tuple
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import QuerySet
+from django.template.loader import render_to_string
+
+from posts.cards import as_cards
+from posts.models import Post
+from posts.queries import card
+
+
+def measure(load: Callable[[], List], repeat: int) -> Tuple[float, ...]:
+    """Best times of loading a page and of rendering its cards (in
+    milliseconds) and peak memory allocated by loading it (in KiB).
+    """
+    best_load = best_render = float('inf')
+    for _ in range(repeat):
+        start: float = time.perf_counter()
+        page: List = load()
+        loaded: float = time.perf_counter()
+        for post in page:
+            render_to_string('posts/includes/post.html', {'post': post})
+        best_load = min(best_load, loaded - start)
+        best_render = min(best_render, time.perf_counter() - loaded)
+
+    tracemalloc.start()
+    page = load()
+    peak: int = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best_load * 1000, best_render * 1000, peak / 1024
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare loading and rendering a feed page of Post instances with '
+        'PostCard read models.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--per-page',
+            type=int,
+            default=settings.POSTS_PER_PAGE,
+            help='Amount of posts at page.',
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=20, help='Amount of runs.'
+        )
+
+    def handle(self, *args, per_page=10, repeat=20, **options):
+        posts: QuerySet = Post.objects.order_by('-created', '-pk')
+        if not posts.exists():
+            raise CommandError('There are no posts to load.')
+
+        results = {
+            'Post': measure(
+                lambda: list(card.instances(posts)[:per_page]), repeat
+            ),
+            'PostCard': measure(
+                lambda: list(as_cards(posts)[:per_page]), repeat
+            ),
+        }
+        for name, (load, render, peak) in results.items():
+            self.stdout.write(
+                f'{name:>8}: load {load:7.2f} ms, render {render:7.2f} ms, '
+                f'memory {peak:7.1f} KiB'
+            )
+
+        models, cards = results.values()
+        savings = [100 - new * 100 / old for old, new in zip(models, cards)]
+        self.stdout.write(
+            self.style.SUCCESS(
+                'PostCard saves {:.0f}% of load time, {:.0f}% of render time '
+                'and {:.0f}% of memory.'.format(*savings)
+            )
+        )
@@ -0,0 +1,154 @@
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple, Type
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from posts import queries
+from posts.models import Group, Tag
+from posts.paginator import Position, YatubePaginator, keyset_queryset
+from posts.tags import TagPaginator
+from posts.timeline import MergedPaginator, TimelinePaginator
+
+User = get_user_model()
+
+SORT_ALLOWED = ('follow', 'tag')
+"""Feeds whose posts may be sorted by a temporary B-tree: they are found by
+primary keys of limited keyset slices read in index order (a page of
+`Timeline` rows and a page of posts of every followed celebrity for follow
+feed, a page of `PostTag` rows for tag feed), so the sort is bounded by a
+few pages. Only the outer query may be sorted, never the slices.
+"""
+
+
+def page_queries(
+    name: str,
+    posts: QuerySet,
+    position: Position,
+    paginator_class: Type[YatubePaginator] = YatubePaginator,
+    **kwargs,
+) -> Iterator[Tuple[str, QuerySet]]:
+    """Queries which the paginator runs for a feed."""
+    paginator = paginator_class(posts, settings.POSTS_PER_PAGE, **kwargs)
+    yield from paginator_queries(name, paginator, position)
+
+
+def paginator_queries(
+    name: str, paginator: YatubePaginator, position: Position
+) -> Iterator[Tuple[str, QuerySet]]:
+    limit: int = settings.POSTS_PER_PAGE + 1
+    fetch = paginator.fetch_queryset
+    yield name, fetch(None, False, limit)
+    yield f'{name} next', fetch(position, False, limit)
+    yield f'{name} previous', fetch(position, True, limit)
+    yield f'{name} count', paginator.count_queryset()
+
+
+def feed_queries() -> Iterator[Tuple[str, QuerySet]]:
+    """Every feed query of `posts.views` (comments of post page too) for
+    sample (missing) objects.
+    """
+    user: User = User(pk=0)
+    group: Group = Group(pk=0)
+    position: Position = (timezone.make_aware(datetime(2000, 1, 1)), 0)
+    yield from page_queries(
+        'index', queries.index_posts(), position, estimate=True
+    )
+    yield from page_queries('group', queries.group_posts(group), position)
+    yield from page_queries('author', queries.author_posts(user), position)
+    follow = TimelinePaginator(
+        queries.follow_posts(), settings.POSTS_PER_PAGE, user=user
+    )
+    # a sample celebrity, so slices of their posts are checked too
+    follow.celebrities = [0]
+    yield from paginator_queries('follow', follow, position)
+    yield from page_queries('comments', queries.post_comments(0), position)
+    tag: Tag = Tag(pk=0)
+    yield from page_queries(
+        'tag', queries.tag_posts(tag), position, TagPaginator, tag=tag
+    )
+
+    merged = MergedPaginator(
+        queries.follow_posts(),
+        settings.POSTS_PER_PAGE,
+        authors=queries.followed_authors(user),
+    )
+    yield 'merge heads', merged.heads(position, False)
+    stream: QuerySet = merged.posts.filter(author_id=0)
+    yield 'merge stream', keyset_queryset(
+        stream, position, False, settings.POSTS_PER_PAGE + 1
+    )
+
+
+def explain(queryset: QuerySet) -> List[str]:
+    """Steps of query plan, steps of subqueries are indented."""
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+        rows = cursor.fetchall()
+    depth: Dict[int, int] = {0: -1}
+    plan: List[str] = []
+    for step_id, parent, _, step in rows:
+        depth[step_id] = depth.get(parent, -1) + 1
+        plan.append('  ' * depth[step_id] + step)
+    return plan
+
+
+def limit(queryset: QuerySet) -> Optional[int]:
+    return queryset.query.high_mark
+
+
+def problems(
+    name: str, plan: List[str], limited: bool = False
+) -> List[str]:
+    """Full table scans and sorts which are not backed by an index. Index
+    scans are allowed only when they are capped by `LIMIT` (`limited`).
+    """
+    found: List[str] = []
+    for step in plan:
+        outer: bool = not step.startswith(' ')
+        step = step.strip()
+        if step.startswith('SCAN') and (' USING ' not in step or not limited):
+            found.append(step)
+        if 'TEMP B-TREE' in step and not (
+            outer and name.split()[0] in SORT_ALLOWED
+        ):
+            found.append(step)
+    return found
+
+
+class Command(BaseCommand):
+    help = (
+        'Run EXPLAIN QUERY PLAN for every feed query and fail if any of them '
+        'scans a whole table or sorts rows without an index.'
+    )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Only SQLite query plans are checked.')
+
+        failed: Dict[str, List[str]] = {}
+        for name, queryset in feed_queries():
+            plan: List[str] = explain(queryset)
+            capped: Optional[int] = limit(queryset)
+            found: List[str] = problems(name, plan, capped is not None)
+            style = self.style.ERROR if found else self.style.SUCCESS
+            self.stdout.write(style(name))
+            for step in plan:
+                self.stdout.write(f'    {step}')
+            if capped is not None and any(
+                step.strip().startswith('SCAN') for step in plan
+            ):
+                self.stdout.write(f'    (scan is capped by LIMIT {capped})')
+            if found:
+                failed[name] = found
+
+        if failed:
+            raise CommandError(
+                'Feed queries without index: ' + ', '.join(failed)
+            )
+        self.stdout.write(self.style.SUCCESS('All feed queries use indexes.'))
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+
+from posts.exporter import EXPORTS, FORMATS, export, filename
+
+
+class Command(BaseCommand):
+    help = (
+        'Export posts, comments or follows to JSONL or CSV file, reading the '
+        'table by chunks.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('table', choices=list(EXPORTS))
+        parser.add_argument('--format', choices=FORMATS, default='jsonl')
+        parser.add_argument(
+            '--gzip',
+            action='store_true',
+            dest='compress',
+            help='Compress the file with gzip.',
+        )
+        parser.add_argument(
+            '--output',
+            help='Path of the file (<table>.<format>[.gz] by default).',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Amount of rows read by one query.',
+        )
+
+    def handle(
+        self,
+        table,
+        *args,
+        format='jsonl',
+        compress=False,
+        output=None,
+        chunk_size=1000,
+        **options,
+    ):
+        output = output or filename(table, format, compress)
+        size = 0
+        with open(output, 'wb') as file:
+            for chunk in export(table, format, compress, chunk_size):
+                file.write(chunk)
+                size += len(chunk)
+        self.stdout.write(
+            self.style.SUCCESS(f'{table} exported to {output} ({size} bytes).')
+        )
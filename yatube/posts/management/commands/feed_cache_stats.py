@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from posts import feed_cache
+
+
+class Command(BaseCommand):
+    help = (
+        'Show counters of feed pages cache: hits, misses, stale responses '
+        'and lock waits.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset', action='store_true', help='Reset counters to zero.'
+        )
+
+    def handle(self, *args, reset=False, **options):
+        stats = feed_cache.stats()
+        for event, value in stats.items():
+            self.stdout.write(f'{event}: {value}')
+        total = stats['hit'] + stats['miss'] + stats['stale']
+        if total:
+            self.stdout.write(f'hit ratio: {stats["hit"] / total:.2%}')
+        if reset:
+            feed_cache.reset_stats()
+            self.stdout.write(self.style.SUCCESS('Counters are reset.'))
@@ -0,0 +1,37 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Make thumbnails of all post images in parallel.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Amount of threads making thumbnails.',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Delete existing thumbnails and make them again.',
+        )
+
+    def handle(self, *args, workers=1, force=False, **options):
+        start = time.monotonic()
+        amount = 0
+        for image in thumbnails.regenerate(workers, force):
+            amount += 1
+            if options['verbosity'] > 1:
+                self.stdout.write(image)
+        elapsed = time.monotonic() - start
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Thumbnails of {amount} images made in {elapsed:.1f}s.'
+            )
+        )
@@ -0,0 +1,78 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.importer import Checkpoint, PostImporter, read_records
+
+
+class Command(BaseCommand):
+    help = (
+        'Import posts from JSONL or CSV file with author, group, text, '
+        'created and image fields. Interrupted import is resumed from its '
+        'checkpoint.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File with posts.')
+        parser.add_argument(
+            '--format',
+            choices=('jsonl', 'csv'),
+            help='Format of the file (taken from its extension by default).',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Amount of posts inserted in one transaction.',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='File with amount of imported records and their authors '
+            'and groups (<path>.checkpoint by default).',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Ignore the checkpoint and import the whole file.',
+        )
+
+    def handle(
+        self,
+        path,
+        *args,
+        format=None,
+        batch_size=1000,
+        checkpoint=None,
+        restart=False,
+        **options,
+    ):
+        if batch_size < 1:
+            raise CommandError('Batch size must be positive.')
+        checkpoint = Checkpoint(checkpoint or f'{path}.checkpoint')
+        if restart:
+            checkpoint.clear()
+        skipped: int = checkpoint.load()
+        if skipped:
+            self.stdout.write(f'Resuming after {skipped} records.')
+
+        importer = PostImporter(batch_size, checkpoint)
+        start: float = time.perf_counter()
+        try:
+            for imported in importer.run(read_records(path, format)):
+                rate: float = imported / (time.perf_counter() - start)
+                self.stdout.write(
+                    f'{imported} posts imported ({rate:.0f} rows/s)'
+                )
+        except (OSError, ValueError) as error:
+            raise CommandError(error)
+
+        for number, error in importer.errors:
+            self.stderr.write(f'Record {number} is skipped: {error}')
+        elapsed: float = time.perf_counter() - start
+        rate = importer.imported / elapsed if elapsed else 0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{importer.imported} posts imported in {elapsed:.1f} s '
+                f'({rate:.0f} rows/s), {len(importer.errors)} skipped.'
+            )
+        )
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild full-text search index of posts from scratch.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Amount of posts indexed at once.',
+        )
+
+    def handle(self, *args, chunk_size=500, **options):
+        amount = search.rebuild(chunk_size)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{amount} posts indexed by {search.backend().name} backend.'
+            )
+        )
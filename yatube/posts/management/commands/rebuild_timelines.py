@@ -0,0 +1,27 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = 'Rebuild materialized follow timelines from Follow and Post tables.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            action='append',
+            dest='usernames',
+            help='Rebuild only timeline of the given user (may be repeated).',
+        )
+
+    def handle(self, *args, usernames=None, **options):
+        users = User.objects.all()
+        if usernames:
+            users = users.filter(username__in=usernames)
+        amount = timeline.rebuild(users)
+        self.stdout.write(
+            self.style.SUCCESS(f'Timelines rebuilt for {amount} follows.')
+        )
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = 'Fix drifted comment, post and follow counters.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Amount of rows recounted in one transaction.',
+        )
+
+    def handle(self, *args, chunk_size=1000, **options):
+        for name, fixed in counters.reconcile(chunk_size).items():
+            self.stdout.write(f'{name}: {fixed} fixed')
+        self.stdout.write(self.style.SUCCESS('Counters are reconciled.'))
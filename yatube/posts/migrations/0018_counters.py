@@ -0,0 +1,74 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:45
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def amount(model, field):
+    rows = (
+        model.objects.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(amount=Count('pk'))
+        .values('amount')
+    )
+    return Coalesce(Subquery(rows), 0)
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    Post = apps.get_model('posts', 'Post')
+    Group = apps.get_model('posts', 'Group')
+    Comment = apps.get_model('posts', 'Comment')
+    Follow = apps.get_model('posts', 'Follow')
+    UserCounters = apps.get_model('posts', 'UserCounters')
+
+    UserCounters.objects.bulk_create(
+        [UserCounters(user_id=pk) for pk in User.objects.values_list('pk', flat=True)],
+        batch_size=500,
+    )
+    UserCounters.objects.update(
+        posts=amount(Post, 'author'),
+        followers=amount(Follow, 'author'),
+        following=amount(Follow, 'user'),
+    )
+    Group.objects.update(post_count=amount(Post, 'group'))
+    Post.objects.update(comment_count=amount(Comment, 'post'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0017_post_edited'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserCounters',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='counters', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('posts', models.PositiveIntegerField(default=0, verbose_name='Количество постов')),
+                ('followers', models.PositiveIntegerField(default=0, verbose_name='Подписчики')),
+                ('following', models.PositiveIntegerField(default=0, verbose_name='Подписки')),
+            ],
+            options={
+                'verbose_name': 'счётчики пользователя',
+                'verbose_name_plural': 'счётчики пользователей',
+            },
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='post_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество постов'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество комментариев'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
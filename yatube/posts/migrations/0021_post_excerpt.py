@@ -0,0 +1,44 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:54
+
+from django.db import migrations, models
+from django.utils.text import Truncator
+
+# frozen copy of `posts.excerpts`, so the migration does not change with it
+EXCERPT_LENGTH = 500
+CHUNK_SIZE = 500
+
+
+def fill_excerpts(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    posts = Post.objects.order_by('pk').only('pk', 'text')
+    last = 0
+    while True:
+        chunk = list(posts.filter(pk__gt=last)[:CHUNK_SIZE])
+        if not chunk:
+            return
+        for post in chunk:
+            post.excerpt = Truncator(post.text).chars(EXCERPT_LENGTH)
+            post.has_more = post.excerpt != post.text
+        Post.objects.bulk_update(chunk, ('excerpt', 'has_more'))
+        last = chunk[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0020_comment_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.TextField(blank=True, editable=False, verbose_name='Отрывок'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='has_more',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Есть продолжение'),
+        ),
+        migrations.RunPython(fill_excerpts, migrations.RunPython.noop),
+    ]
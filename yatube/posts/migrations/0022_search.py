@@ -0,0 +1,188 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:02
+
+import re
+from collections import Counter
+from typing import List, Optional, Tuple
+
+from django.db import OperationalError, migrations, models
+import django.db.models.deletion
+
+# Frozen copy of `posts.search` stemming, so the migration does not change
+# with it. The index is rebuilt by `rebuild_search_index` command when the
+# stemming is changed.
+FTS_TABLE = 'posts_search'
+TERM_LENGTH = 64
+
+WORD = re.compile(r'\w+')
+CYRILLIC = re.compile(r'[а-я]+')
+VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND = (
+    ('в', 'вши', 'вшись'),
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'),
+)
+ADJECTIVE = (
+    (),
+    (
+        'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+        'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+        'ая', 'яя', 'ою', 'ею',
+    ),
+)
+PARTICIPLE = (('ем', 'нн', 'вш', 'ющ', 'щ'), ('ивш', 'ывш', 'ующ'))
+REFLEXIVE = ((), ('ся', 'сь'))
+VERB = (
+    (
+        'ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет',
+        'ют', 'ны', 'ть', 'ешь', 'нно',
+    ),
+    (
+        'ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй',
+        'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют',
+        'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю',
+    ),
+)
+NOUN = (
+    (),
+    (
+        'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии',
+        'и', 'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам',
+        'ом', 'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия',
+        'ья', 'я',
+    ),
+)
+SUPERLATIVE = ((), ('ейше', 'ейш'))
+DERIVATIONAL = ('ость', 'ост')
+
+Suffixes = Tuple[Tuple[str, ...], Tuple[str, ...]]
+
+
+def strip_ending(rv: str, suffixes: Suffixes) -> Optional[str]:
+    """`rv` without the longest of suffixes, `None` if it has none of them.
+    Suffixes of the first group have to follow "а" or "я".
+    """
+    after_a, plain = suffixes
+    for suffix in sorted(after_a + plain, key=len, reverse=True):
+        if not rv.endswith(suffix):
+            continue
+        rest: str = rv[:-len(suffix)]
+        if suffix in plain or rest.endswith(('а', 'я')):
+            return rest
+    return None
+
+
+def strip_optional(rv: str, suffixes: Suffixes) -> str:
+    stripped: Optional[str] = strip_ending(rv, suffixes)
+    return rv if stripped is None else stripped
+
+
+def region_start(word: str, start: int = 0) -> int:
+    """Start of the region after the first non-vowel following a vowel."""
+    for index in range(start + 1, len(word)):
+        if word[index] not in VOWELS and word[index - 1] in VOWELS:
+            return index + 1
+    return len(word)
+
+
+def strip_inflection(rv: str) -> str:
+    """First step of stemming: gerund, adjective, verb or noun ending."""
+    stripped: Optional[str] = strip_ending(rv, PERFECTIVE_GERUND)
+    if stripped is not None:
+        return stripped
+    rv = strip_optional(rv, REFLEXIVE)
+    stripped = strip_ending(rv, ADJECTIVE)
+    if stripped is not None:
+        return strip_optional(stripped, PARTICIPLE)
+    stripped = strip_ending(rv, VERB)
+    if stripped is not None:
+        return stripped
+    return strip_optional(rv, NOUN)
+
+
+def stem(word: str) -> str:
+    """Snowball stem of a Russian word, other words are left as they are."""
+    if not CYRILLIC.fullmatch(word):
+        return word
+    vowel: Optional[re.Match] = re.search(f'[{VOWELS}]', word)
+    if vowel is None:
+        return word
+    head, rv = word[:vowel.end()], word[vowel.end():]
+    r2: int = region_start(word, region_start(word)) - vowel.end()
+
+    rv = strip_inflection(rv)
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    for suffix in DERIVATIONAL:
+        if rv.endswith(suffix) and len(rv) - len(suffix) >= r2:
+            rv = rv[:-len(suffix)]
+            break
+    rv = strip_optional(rv, SUPERLATIVE)
+    if rv.endswith('нн'):
+        rv = rv[:-1]
+    elif rv.endswith('ь'):
+        rv = rv[:-1]
+    return head + rv
+
+
+def terms(text: str) -> List[str]:
+    """Stems of every word of text (lowercased, "ё" is taken as "е")."""
+    words: List[str] = WORD.findall(text.lower().replace('ё', 'е'))
+    return [stem(word)[:TERM_LENGTH] for word in words]
+
+
+def create_index(apps, schema_editor):
+    """Make FTS5 table when SQLite supports it and fill the index."""
+    connection = schema_editor.connection
+    fts5 = False
+    if connection.vendor == 'sqlite':
+        try:
+            schema_editor.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} '
+                f'USING fts5(body)'
+            )
+            fts5 = True
+        except OperationalError:
+            pass
+
+    Post = apps.get_model('posts', 'Post')
+    PostTerm = apps.get_model('posts', 'PostTerm')
+    for pk, text in Post.objects.values_list('pk', 'text').iterator():
+        if fts5:
+            schema_editor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, body) VALUES (%s, %s)',
+                [pk, ' '.join(terms(text))],
+            )
+        else:
+            PostTerm.objects.bulk_create(
+                PostTerm(post_id=pk, term=term, weight=weight)
+                for term, weight in Counter(terms(text)).items()
+            )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0021_post_excerpt'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='Основа слова')),
+                ('weight', models.PositiveIntegerField(default=1, verbose_name='Вес')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terms', to='posts.Post')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='postterm',
+            constraint=models.UniqueConstraint(fields=('term', 'post'), name='unique_post_term'),
+        ),
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,89 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:05
+
+import re
+from collections import Counter
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# frozen copy of `posts.tags.extract`, so the migration does not change with it
+TAG = re.compile(r'(?<![\w&#/])#(\w*[^\W\d_]\w*)')
+TAG_LENGTH = 64
+
+
+def extract(text):
+    names = (name.lower()[:TAG_LENGTH] for name in TAG.findall(text))
+    return list(dict.fromkeys(names))
+
+
+def fill_tags(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Tag = apps.get_model('posts', 'Tag')
+    PostTag = apps.get_model('posts', 'PostTag')
+    posts = Post.objects.values_list('pk', 'text', 'created')
+    found = [(pk, created, extract(text)) for pk, text, created in posts]
+    amounts = Counter(name for *_, names in found for name in names)
+    Tag.objects.bulk_create(
+        Tag(name=name, post_count=amount) for name, amount in amounts.items()
+    )
+    ids = dict(Tag.objects.values_list('name', 'pk'))
+    PostTag.objects.bulk_create(
+        (
+            PostTag(post_id=pk, tag_id=ids[name], created=created)
+            for pk, created, names in found
+            for name in names
+        ),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0022_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostTag',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(verbose_name='Дата публикации')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64, unique=True, verbose_name='Тег')),
+                ('post_count', models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество постов')),
+            ],
+            options={
+                'verbose_name': 'тег',
+                'verbose_name_plural': 'теги',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['-post_count', 'name'], name='tag_post_count_idx'),
+        ),
+        migrations.AddField(
+            model_name='posttag',
+            name='post',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tag_links', to='posts.Post'),
+        ),
+        migrations.AddField(
+            model_name='posttag',
+            name='tag',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='post_links', to='posts.Tag'),
+        ),
+        migrations.AddIndex(
+            model_name='posttag',
+            index=models.Index(fields=['tag', '-created', '-post'], name='post_tag_feed_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='posttag',
+            constraint=models.UniqueConstraint(fields=('tag', 'post'), name='unique_post_tag'),
+        ),
+        migrations.RunPython(fill_tags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 2.2.16 on 2026-10-18 06:02
+
+from django.db import migrations, models
+
+
+def copy_created(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Timeline = apps.get_model('posts', 'Timeline')
+    Timeline.objects.update(
+        created=models.Subquery(
+            Post.objects.filter(pk=models.OuterRef('post_id')).values(
+                'created'
+            )[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0024_post_image_info'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='timeline',
+            name='created',
+            field=models.DateTimeField(null=True, verbose_name='Дата публикации'),
+        ),
+        migrations.RunPython(copy_created, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='timeline',
+            name='created',
+            field=models.DateTimeField(verbose_name='Дата публикации'),
+        ),
+        migrations.AddIndex(
+            model_name='timeline',
+            index=models.Index(fields=['user', '-created', '-post'], name='timeline_feed_idx'),
+        ),
+    ]
@@ -20,11 +20,16 @@ class Group(models.Model):
     description: `text` `blank=True`
         A text describing the community.
         This text will be displayed on the community page.
+    post_count: `int`
+        Amount of group posts kept by `posts.counters`.
     """
 
     title = models.CharField('Название', max_length=200)
     slug = models.SlugField('slug', unique=True)
     description = models.TextField('Описание', blank=True)
+    post_count = models.PositiveIntegerField(
+        'Количество постов', default=0, editable=False
+    )
 
     class Meta:
         verbose_name = 'группа'
@@ -50,6 +55,22 @@ class Post(CreatedModel):
         Foreign key to a group which this post is belongs to.
         Also Group model contains related keys to all its publications.
             (related_name `posts`)
+    edited: `datetime`
+        Time of the last saving. Used as a version of post for caches.
+    comment_count: `int`
+        Amount of post comments kept by `posts.counters`.
+    excerpt: `text`
+        Beginning of the text shown at feed pages (see `posts.excerpts`).
+    has_more: `bool`
+        If the text is longer than excerpt.
+    image_width: `int`
+        Width of the image as it is shown (see `posts.images`).
+    image_height: `int`
+        Height of the image.
+    image_color: `str`
+        Average color of the image (`#rrggbb`).
+    image_preview: `text`
+        Tiny preview of the image as a data URI, shown while it is loading.
     """
 
     text = models.TextField(
@@ -70,10 +91,40 @@ class Post(CreatedModel):
         verbose_name='Группа',
         help_text='Группа, к которой будет относиться пост',
     )
+    edited = models.DateTimeField('Дата изменения', auto_now=True)
+    comment_count = models.PositiveIntegerField(
+        'Количество комментариев', default=0, editable=False
+    )
+    excerpt = models.TextField('Отрывок', blank=True, editable=False)
+    has_more = models.BooleanField(
+        'Есть продолжение', default=False, editable=False
+    )
+    image_width = models.PositiveIntegerField(
+        'Ширина картинки', null=True, blank=True, editable=False
+    )
+    image_height = models.PositiveIntegerField(
+        'Высота картинки', null=True, blank=True, editable=False
+    )
+    image_color = models.CharField(
+        'Цвет картинки', max_length=7, blank=True, editable=False
+    )
+    image_preview = models.TextField(
+        'Превью картинки', blank=True, editable=False
+    )
 
     class Meta(CreatedModel.Meta):
         verbose_name = 'пост'
         verbose_name_plural = 'посты'
+        indexes = [
+            models.Index(
+                fields=('author', '-created', '-id'),
+                name='post_author_created_idx',
+            ),
+            models.Index(
+                fields=('group', '-created', '-id'),
+                name='post_group_created_idx',
+            ),
+        ]
 
     def __str__(self) -> str:
         return self.text[:15] + '...'
@@ -101,6 +152,12 @@ class Comment(CreatedModel):
     class Meta(CreatedModel.Meta):
         verbose_name = 'комментарий'
         verbose_name_plural = 'комментарии'
+        indexes = [
+            models.Index(
+                fields=('post', '-created', '-id'),
+                name='comment_post_created_idx',
+            )
+        ]
 
     def __str__(self) -> str:
         return self.text[:15] + '...'
@@ -123,3 +180,154 @@ class Follow(models.Model):
         constraints = [
             models.UniqueConstraint(fields=('user', 'author'), name='unique')
         ]
+        indexes = [
+            models.Index(
+                fields=('author', 'user'), name='follow_author_user_idx'
+            )
+        ]
+
+
+class Timeline(models.Model):
+    """
+    Materialized follow feed: posts of followed authors which are shown at
+    `user`'s follow page. Rows are made by fan-out on post creation and kept
+    up to date on following and unfollowing (see `posts.timeline`).
+    `created` is a copy of post creation time, so a timeline is read in
+    `(user, -created)` order by the index only.
+
+    `user` — ссылка на объект пользователя, чья это лента.
+    `post` — ссылка на пост автора, на которого он подписан.
+    `created` — дата публикации поста.
+    """
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='timeline'
+    )
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name='timeline_entries'
+    )
+    created = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'post'), name='unique_timeline_post'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=('user', '-created', '-post'), name='timeline_feed_idx'
+            )
+        ]
+
+
+class UserCounters(models.Model):
+    """
+    Denormalized amounts of user posts and follows, so pages do not run
+    `COUNT(*)` for them. Values are kept by `posts.counters`.
+
+    `user` — ссылка на объект пользователя.
+    `posts` — количество его постов.
+    `followers` — количество его подписчиков.
+    `following` — количество авторов, на которых он подписан.
+    """
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='counters',
+    )
+    posts = models.PositiveIntegerField('Количество постов', default=0)
+    followers = models.PositiveIntegerField('Подписчики', default=0)
+    following = models.PositiveIntegerField('Подписки', default=0)
+
+    class Meta:
+        verbose_name = 'счётчики пользователя'
+        verbose_name_plural = 'счётчики пользователей'
+
+
+class PostTerm(models.Model):
+    """
+    Inverted index of post texts for search without SQLite FTS5 (see
+    `posts.search`).
+
+    `term` — основа слова текста поста.
+    `post` — ссылка на пост.
+    `weight` — сколько раз слово встречается в тексте поста.
+    """
+
+    MAX_LENGTH = 64
+
+    term = models.CharField('Основа слова', max_length=MAX_LENGTH)
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name='terms'
+    )
+    weight = models.PositiveIntegerField('Вес', default=1)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('term', 'post'), name='unique_post_term'
+            )
+        ]
+
+
+class Tag(models.Model):
+    """
+    Hashtag of posts (`#слово` in post text, see `posts.tags`).
+
+    `name` — тег без решётки, в нижнем регистре.
+    `post_count` — количество постов с тегом, по нему выбираются
+    популярные теги.
+    """
+
+    MAX_LENGTH = 64
+
+    name = models.CharField('Тег', max_length=MAX_LENGTH, unique=True)
+    post_count = models.PositiveIntegerField(
+        'Количество постов', default=0, editable=False
+    )
+
+    class Meta:
+        verbose_name = 'тег'
+        verbose_name_plural = 'теги'
+        indexes = [
+            models.Index(
+                fields=('-post_count', 'name'), name='tag_post_count_idx'
+            )
+        ]
+
+    def __str__(self) -> str:
+        return f'#{self.name}'
+
+
+class PostTag(models.Model):
+    """
+    Tag of a post. `created` is a copy of post creation time, so a tag feed
+    is read in `(tag, -created)` order by the index only.
+
+    `tag` — ссылка на тег.
+    `post` — ссылка на пост с тегом.
+    `created` — дата публикации поста.
+    """
+
+    tag = models.ForeignKey(
+        Tag, on_delete=models.CASCADE, related_name='post_links'
+    )
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name='tag_links'
+    )
+    created = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('tag', 'post'), name='unique_post_tag'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=('tag', '-created', '-post'), name='post_tag_feed_idx'
+            )
+        ]
@@ -0,0 +1,234 @@
+import base64
+import binascii
+from datetime import datetime
+from typing import List, Optional, Tuple, Type
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIRequest
+from django.core.paginator import Page, Paginator
+from django.db.models import Max, Min, Q, QuerySet
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+Position = Tuple[datetime, int]
+
+MAX_PK = 2 ** 63 - 1
+"""Greatest integer the database takes (64-bit signed)."""
+
+
+def encode_cursor(created: datetime, pk: int, reverse: bool = False) -> str:
+    """Pack feed position into opaque url safe string."""
+    raw = f'{"-" if reverse else "+"}{created.isoformat()}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: Optional[str]) -> Tuple[Optional[Position], bool]:
+    """Unpack cursor made by `encode_cursor`. Return (position, reverse).
+    Broken or empty cursor points to the beginning of the feed.
+    """
+    if not cursor:
+        return None, False
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(cursor + padding).decode()
+        direction, raw = raw[0], raw[1:]
+        created, pk = raw.rsplit('|', 1)
+        created = parse_datetime(created)
+        pk = int(pk)
+        if created is None or direction not in '+-' or abs(pk) > MAX_PK:
+            raise ValueError
+        return (created, pk), direction == '-'
+    except (binascii.Error, UnicodeDecodeError, ValueError, IndexError):
+        return None, False
+
+
+def keyset_filter(
+    position: Position, reverse: bool = False, pk_field: str = 'pk'
+) -> Q:
+    """Condition for rows going after `position` in `(-created, -pk)` order
+    (or before it if `reverse`). `pk_field` is the field which keeps primary
+    key of post.
+    """
+    created, pk = position
+    after: str = 'gt' if reverse else 'lt'
+    return Q(**{f'created__{after}': created}) | Q(
+        **{'created': created, f'{pk_field}__{after}': pk}
+    )
+
+
+def keyset_queryset(
+    posts: QuerySet, position: Optional[Position], reverse: bool, limit: int
+) -> QuerySet:
+    """Query of `limit` posts next to `position`. Reverse slice is ordered by
+    `(created, pk)`, so its rows go from the nearest to `position`.
+    """
+    if position:
+        posts = posts.filter(keyset_filter(position, reverse))
+    if reverse:
+        posts = posts.order_by('created', 'pk')
+    return posts[:limit]
+
+
+def keyset_slice(
+    posts: QuerySet, position: Optional[Position], reverse: bool, limit: int
+) -> List:
+    """Load posts of `keyset_queryset`."""
+    return list(keyset_queryset(posts, position, reverse, limit))
+
+
+class CursorPaginator(Paginator):
+    """
+    Keyset paginator for feeds ordered by `(-created, -pk)`.
+
+    Instead of `LIMIT/OFFSET` every page is selected by condition on the
+    last seen `(created, pk)` pair, so the deep pages are as cheap as the
+    first one. Ordinary `get_page` is still available for `?page=` links.
+
+    Cursor pages are plain `Page` objects with extra attributes:
+        `is_cursor` -- always True.
+        `next_cursor` / `previous_cursor` -- cursors for neighbour pages or
+        None if there are no such pages.
+    """
+
+    ordering = ('-created', '-pk')
+
+    def __init__(self, object_list: QuerySet, *args, **kwargs) -> None:
+        super().__init__(object_list.order_by(*self.ordering), *args, **kwargs)
+
+    def fetch_queryset(
+        self, position: Optional[Position], reverse: bool, limit: int
+    ) -> QuerySet:
+        """Query of `limit` rows after `position` (before it if `reverse`)."""
+        return keyset_queryset(self.object_list, position, reverse, limit)
+
+    def fetch(
+        self, position: Optional[Position], reverse: bool, limit: int
+    ) -> List:
+        return list(self.fetch_queryset(position, reverse, limit))
+
+    def get_cursor_page(self, cursor: Optional[str]) -> Page:
+        position, reverse = decode_cursor(cursor)
+
+        # one extra row tells if there is anything beyond this page
+        object_list = self.fetch(position, reverse, self.per_page + 1)
+        has_more = len(object_list) > self.per_page
+        object_list = object_list[:self.per_page]
+        if reverse:
+            object_list.reverse()
+
+        page = self._get_page(object_list, 1, self)
+        page.is_cursor = True
+        page.next_cursor = page.previous_cursor = None
+        if object_list:
+            first, last = object_list[0], object_list[-1]
+            if has_more or reverse:
+                page.next_cursor = encode_cursor(last.created, last.pk)
+            if has_more if reverse else position:
+                page.previous_cursor = encode_cursor(
+                    first.created, first.pk, reverse=True
+                )
+        return page
+
+
+def feed_count_key(feed: str, pk: Optional[int] = None) -> str:
+    """Cache key for amount of posts at feed. Feeds are: `index`,
+    `group`, `author`, `tag` and `follow` (by follower user pk).
+    """
+    return f'feed_count:{feed}' if pk is None else f'feed_count:{feed}:{pk}'
+
+
+class YatubePaginator(CursorPaginator):
+    """
+    Feed paginator with cached posts amount and short page bar.
+
+    Parameters
+    ----------
+    count_key: `str` `optional`
+        Cache key made by `feed_count_key`. Value is kept up to date by
+        `posts.signals`, so `COUNT(*)` is called only on cache miss.
+    estimate: `bool` `optional`
+        Estimate amount of feeds longer than `FEED_COUNT_EXACT_LIMIT` by
+        primary keys range. It is right only for a feed of all posts, so
+        filtered feeds are always counted exactly.
+    """
+
+    def __init__(
+        self,
+        *args,
+        count_key: Optional[str] = None,
+        estimate: bool = False,
+        **kwargs,
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.count_key = count_key
+        self.estimate = estimate
+
+    @cached_property
+    def count(self) -> int:
+        if self.count_key is None:
+            return super().count
+        count: Optional[int] = cache.get(self.count_key)
+        if count is None:
+            count = self.calculate_count()
+            cache.set(self.count_key, count, settings.FEED_COUNT_CACHE_TIME)
+        return count
+
+    def count_queryset(self) -> QuerySet:
+        """Rows counted exactly (see `calculate_count`)."""
+        posts: QuerySet = self.object_list.order_by().values('pk')
+        if not self.estimate:
+            return posts
+        return posts[:settings.FEED_COUNT_EXACT_LIMIT + 1]
+
+    def calculate_count(self) -> int:
+        """Count posts exactly. With `estimate` count them only until
+        `FEED_COUNT_EXACT_LIMIT` and estimate by primary keys range for
+        longer feeds.
+        """
+        count: int = self.count_queryset().count()
+        if not self.estimate or count <= settings.FEED_COUNT_EXACT_LIMIT:
+            return count
+        posts: QuerySet = self.object_list.order_by()
+        bounds = posts.aggregate(first=Min('pk'), last=Max('pk'))
+        return max(count, bounds['last'] - bounds['first'] + 1)
+
+    def get_page_window(self, number: int) -> List[Optional[int]]:
+        """Page numbers around current one plus the first and the last pages.
+        None stands for skipped pages. For 100 pages and 10th current page:
+            [1, None, 8, 9, 10, 11, 12, None, 100]
+        """
+        side: int = settings.PAGINATOR_WINDOW
+        last: int = self.num_pages
+        window = list(
+            range(max(1, number - side), min(last, number + side) + 1)
+        )
+        if window[0] > 1:
+            window = [1] + ([None] if window[0] > 2 else []) + window
+        if window[-1] < last:
+            window += ([None] if window[-1] < last - 1 else []) + [last]
+        return window
+
+    def page(self, number: int) -> Page:
+        page: Page = super().page(number)
+        page.page_window = self.get_page_window(page.number)
+        return page
+
+
+def paginate(
+    request: WSGIRequest,
+    posts: QuerySet,
+    count_key: Optional[str] = None,
+    paginator_class: Type[YatubePaginator] = YatubePaginator,
+    **kwargs,
+) -> Page:
+    """Make a feed page for request. `?cursor=` is preferred, `?page=` is
+    kept for old links.
+    """
+    paginator = paginator_class(
+        posts, settings.POSTS_PER_PAGE, count_key=count_key, **kwargs
+    )
+    page_num: Optional[str] = request.GET.get('page')
+    if page_num is not None and 'cursor' not in request.GET:
+        return paginator.get_page(page_num)
+    return paginator.get_cursor_page(request.GET.get('cursor'))
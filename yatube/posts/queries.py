@@ -0,0 +1,119 @@
+"""Querysets of feeds and post pages shown by `posts.views`.
+
+They are kept apart from views, so `explain_feeds` command checks exactly
+the queries the pages run.
+"""
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import QuerySet
+
+from .cards import as_cards
+from .models import Comment, Follow, Group, Post, Tag
+
+User = get_user_model()
+
+
+class FeedQuery:
+    """
+    Declarative feed query: what every post of a feed page needs to be
+    rendered by `posts/includes/post.html`. Related rows are joined and
+    the other columns are deferred, so the card never queries by itself.
+    Feeds listed at `FEED_READ_MODELS` setting get `PostCard` read models
+    (see `posts.cards`) instead of model instances.
+
+    Parameters
+    ----------
+    related: `tuple` `optional`
+        Relations joined by `select_related`.
+    fields: `tuple` `optional`
+        Columns loaded by `only` (of post and of joined relations).
+    """
+
+    related: Tuple[str, ...] = ('author', 'group')
+    fields: Tuple[str, ...] = (
+        'excerpt',
+        'has_more',
+        'image',
+        'image_width',
+        'image_height',
+        'image_color',
+        'image_preview',
+        'created',
+        'edited',
+        'author__username',
+        'author__first_name',
+        'author__last_name',
+        'group__slug',
+    )
+
+    def __init__(
+        self,
+        related: Optional[Tuple[str, ...]] = None,
+        fields: Optional[Tuple[str, ...]] = None,
+    ) -> None:
+        if related is not None:
+            self.related = related
+        if fields is not None:
+            self.fields = fields
+
+    def instances(self, posts: QuerySet) -> QuerySet:
+        return posts.select_related(*self.related).only(
+            *self.related, *self.fields
+        )
+
+    def __call__(self, posts: QuerySet, feed: str) -> QuerySet:
+        if feed in settings.FEED_READ_MODELS:
+            return as_cards(posts)
+        return self.instances(posts)
+
+
+card = FeedQuery()
+"""Posts shown as cards at feed pages."""
+
+
+def index_posts() -> QuerySet:
+    return card(Post.objects.all(), 'index')
+
+
+def group_posts(group: Group) -> QuerySet:
+    return card(Post.objects.filter(group=group), 'group')
+
+
+def author_posts(author: User) -> QuerySet:
+    return card(Post.objects.filter(author=author), 'author')
+
+
+def tag_posts(tag: Tag) -> QuerySet:
+    """Posts with the tag (paged by `posts.tags.TagPaginator`)."""
+    return card(Post.objects.filter(tag_links__tag=tag), 'tag')
+
+
+def followed_authors(user: User) -> QuerySet:
+    return Follow.objects.filter(user=user).values('author_id')
+
+
+def follow_posts() -> QuerySet:
+    """Posts of follow feed, they are found by the paginator of the engine:
+    `TimelinePaginator` or `MergedPaginator`.
+    """
+    return card(Post.objects.all(), 'follow')
+
+
+def found_posts(pks: List[int]) -> List:
+    """Posts of search results page in the order of `pks`."""
+    posts = {
+        post.pk: post
+        for post in card(Post.objects.filter(pk__in=pks), 'search')
+    }
+    return [posts[pk] for pk in pks if pk in posts]
+
+
+def post_details() -> QuerySet:
+    """Post with everything shown at its page, loaded by one query."""
+    return Post.objects.select_related('author__counters', 'group')
+
+
+def post_comments(post_id: int) -> QuerySet:
+    return Comment.objects.select_related('author').filter(post_id=post_id)
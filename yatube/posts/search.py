@@ -0,0 +1,292 @@
+"""Full-text search over posts.
+
+Texts are split to words and every word is reduced to its stem (Russian
+words by the Snowball stemming rules, see `stem`), so "котов" finds
+"коты" and "котами". Stems of a post are kept at an inverted index, which
+is one of the backends:
+
+* `fts5` -- SQLite FTS5 virtual table `posts_search` (made by migration
+  when SQLite supports FTS5), results are ranked by BM25;
+* `terms` -- `PostTerm` table with a row for every stem of a post, results
+  are ranked by how often the words are found at the post.
+
+`SEARCH_BACKEND` setting chooses the backend, `auto` takes FTS5 when it is
+available. The index is kept up to date by `Post` signals; after switching
+the backend run `rebuild_search_index` command.
+"""
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, QuerySet, Sum
+
+from .counters import chunks
+from .models import Post, PostTerm
+
+FTS_TABLE = 'posts_search'
+
+WORD = re.compile(r'\w+')
+CYRILLIC = re.compile(r'[а-я]+')
+VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND = (
+    ('в', 'вши', 'вшись'),
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'),
+)
+ADJECTIVE = (
+    (),
+    (
+        'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+        'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+        'ая', 'яя', 'ою', 'ею',
+    ),
+)
+PARTICIPLE = (('ем', 'нн', 'вш', 'ющ', 'щ'), ('ивш', 'ывш', 'ующ'))
+REFLEXIVE = ((), ('ся', 'сь'))
+VERB = (
+    (
+        'ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но', 'ет',
+        'ют', 'ны', 'ть', 'ешь', 'нно',
+    ),
+    (
+        'ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей', 'уй',
+        'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят', 'ует', 'уют',
+        'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю',
+    ),
+)
+NOUN = (
+    (),
+    (
+        'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии',
+        'и', 'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам',
+        'ом', 'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия',
+        'ья', 'я',
+    ),
+)
+SUPERLATIVE = ((), ('ейше', 'ейш'))
+DERIVATIONAL = ('ость', 'ост')
+
+Suffixes = Tuple[Tuple[str, ...], Tuple[str, ...]]
+
+
+def strip_ending(rv: str, suffixes: Suffixes) -> Optional[str]:
+    """`rv` without the longest of suffixes, `None` if it has none of them.
+    Suffixes of the first group have to follow "а" or "я".
+    """
+    after_a, plain = suffixes
+    for suffix in sorted(after_a + plain, key=len, reverse=True):
+        if not rv.endswith(suffix):
+            continue
+        rest: str = rv[:-len(suffix)]
+        if suffix in plain or rest.endswith(('а', 'я')):
+            return rest
+    return None
+
+
+def strip_optional(rv: str, suffixes: Suffixes) -> str:
+    stripped: Optional[str] = strip_ending(rv, suffixes)
+    return rv if stripped is None else stripped
+
+
+def region_start(word: str, start: int = 0) -> int:
+    """Start of the region after the first non-vowel following a vowel."""
+    for index in range(start + 1, len(word)):
+        if word[index] not in VOWELS and word[index - 1] in VOWELS:
+            return index + 1
+    return len(word)
+
+
+def strip_inflection(rv: str) -> str:
+    """First step of stemming: gerund, adjective, verb or noun ending."""
+    stripped: Optional[str] = strip_ending(rv, PERFECTIVE_GERUND)
+    if stripped is not None:
+        return stripped
+    rv = strip_optional(rv, REFLEXIVE)
+    stripped = strip_ending(rv, ADJECTIVE)
+    if stripped is not None:
+        return strip_optional(stripped, PARTICIPLE)
+    stripped = strip_ending(rv, VERB)
+    if stripped is not None:
+        return stripped
+    return strip_optional(rv, NOUN)
+
+
+def stem(word: str) -> str:
+    """Snowball stem of a Russian word, other words are left as they are."""
+    if not CYRILLIC.fullmatch(word):
+        return word
+    vowel: Optional[re.Match] = re.search(f'[{VOWELS}]', word)
+    if vowel is None:
+        return word
+    head, rv = word[:vowel.end()], word[vowel.end():]
+    r2: int = region_start(word, region_start(word)) - vowel.end()
+
+    rv = strip_inflection(rv)
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    for suffix in DERIVATIONAL:
+        if rv.endswith(suffix) and len(rv) - len(suffix) >= r2:
+            rv = rv[:-len(suffix)]
+            break
+    rv = strip_optional(rv, SUPERLATIVE)
+    if rv.endswith('нн'):
+        rv = rv[:-1]
+    elif rv.endswith('ь'):
+        rv = rv[:-1]
+    return head + rv
+
+
+def terms(text: str) -> List[str]:
+    """Stems of every word of text (lowercased, "ё" is taken as "е")."""
+    words: List[str] = WORD.findall(text.lower().replace('ё', 'е'))
+    return [stem(word)[:PostTerm.MAX_LENGTH] for word in words]
+
+
+class Fts5Backend:
+    name = 'fts5'
+
+    def index(self, posts: Iterable[Tuple[int, str]]) -> None:
+        rows = [(pk, ' '.join(terms(text))) for pk, text in posts]
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                [(pk,) for pk, _ in rows],
+            )
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, body) VALUES (%s, %s)', rows
+            )
+
+    def remove(self, pks: Sequence[int]) -> None:
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                [(pk,) for pk in pks],
+            )
+
+    def clear(self) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+
+    def search(self, stems: Sequence[str], limit: int) -> List[int]:
+        match: str = ' '.join(f'"{term}"' for term in stems)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY rank, rowid DESC LIMIT %s',
+                [match, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def matching(self, posts: QuerySet, stems: Sequence[str]) -> QuerySet:
+        match: str = ' '.join(f'"{term}"' for term in stems)
+        quote = connection.ops.quote_name
+        pk: str = f'{quote(Post._meta.db_table)}.{quote(Post._meta.pk.column)}'
+        return posts.extra(
+            where=[
+                f'{pk} IN (SELECT rowid FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s)'
+            ],
+            params=[match],
+        )
+
+
+class TermsBackend:
+    name = 'terms'
+
+    def index(self, posts: Iterable[Tuple[int, str]]) -> None:
+        posts = list(posts)
+        self.remove([pk for pk, _ in posts])
+        PostTerm.objects.bulk_create(
+            [
+                PostTerm(post_id=pk, term=term, weight=weight)
+                for pk, text in posts
+                for term, weight in Counter(terms(text)).items()
+            ],
+            batch_size=500,
+        )
+
+    def remove(self, pks: Sequence[int]) -> None:
+        PostTerm.objects.filter(post_id__in=pks).delete()
+
+    def clear(self) -> None:
+        PostTerm.objects.all().delete()
+
+    def found(self, stems: Sequence[str]) -> QuerySet:
+        return (
+            PostTerm.objects.filter(term__in=stems)
+            .values('post_id')
+            .annotate(matched=Count('term'), weight=Sum('weight'))
+            .filter(matched=len(stems))
+        )
+
+    def search(self, stems: Sequence[str], limit: int) -> List[int]:
+        found: QuerySet = self.found(stems).order_by('-weight', '-post_id')
+        return list(found.values_list('post_id', flat=True)[:limit])
+
+    def matching(self, posts: QuerySet, stems: Sequence[str]) -> QuerySet:
+        return posts.filter(pk__in=self.found(stems).values('post_id'))
+
+
+BACKENDS: Dict[str, type] = {'fts5': Fts5Backend, 'terms': TermsBackend}
+
+
+@lru_cache(maxsize=None)
+def fts5_available() -> bool:
+    return (
+        connection.vendor == 'sqlite'
+        and FTS_TABLE in connection.introspection.table_names()
+    )
+
+
+def backend():
+    name: str = settings.SEARCH_BACKEND
+    if name == 'auto':
+        name = 'fts5' if fts5_available() else 'terms'
+    return BACKENDS[name]()
+
+
+def index_posts(posts: QuerySet) -> int:
+    """Put posts to the index (replacing their old entries)."""
+    rows: List[Tuple[int, str]] = list(posts.values_list('pk', 'text'))
+    backend().index(rows)
+    return len(rows)
+
+
+def index_post(post: Post) -> None:
+    backend().index([(post.pk, post.text)])
+
+
+def remove_posts(pks: Sequence[int]) -> None:
+    backend().remove(pks)
+
+
+def rebuild(chunk_size: int = 500) -> int:
+    """Make index of all posts from scratch."""
+    backend().clear()
+    amount = 0
+    for pks in chunks(Post.objects.all(), chunk_size):
+        amount += index_posts(Post.objects.filter(pk__in=pks))
+    return amount
+
+
+def ranked_ids(query: str, limit: Optional[int] = None) -> List[int]:
+    """Primary keys of posts which have all words of `query`, the most
+    relevant first.
+    """
+    stems: List[str] = list(dict.fromkeys(terms(query)))
+    if not stems:
+        return []
+    return backend().search(stems, limit or settings.SEARCH_RESULTS_LIMIT)
+
+
+def matching(posts: QuerySet, query: str) -> QuerySet:
+    """All of `posts` which have all words of `query` (not ranked and not
+    limited), filtered by a subquery against the index.
+    """
+    stems: List[str] = list(dict.fromkeys(terms(query)))
+    if not stems:
+        return posts.none()
+    return backend().matching(posts, stems)
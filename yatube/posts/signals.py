@@ -0,0 +1,294 @@
+from typing import Iterable, Optional, Tuple
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from . import (
+    counters, images, search, tags, thumbnails, timeline, uploads
+)
+from .excerpts import make_excerpt
+from .feed_cache import (
+    author_feed, follow_feed, group_feed, invalidate_feeds, post_feed,
+    tag_feed,
+)
+from .models import Comment, Follow, Group, Post, UserCounters
+from .paginator import feed_count_key
+
+User = get_user_model()
+
+DISPLAYED_USER_FIELDS = ('username', 'first_name', 'last_name')
+"""User fields shown at feed and post pages."""
+
+
+def shift_count(key: str, delta: int) -> None:
+    """Change cached counter. Missing counter is left to be recalculated."""
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        pass
+
+
+def shift_feed_counts(post: Post, delta: int, group_id: Optional[int]):
+    shift_count(feed_count_key('index'), delta)
+    shift_count(feed_count_key('author', post.author_id), delta)
+    if group_id:
+        shift_count(feed_count_key('group', group_id), delta)
+
+
+def forget_follow_counts(author_id: int) -> None:
+    followers = timeline.followers(author_id)
+    cache.delete_many([feed_count_key('follow', pk) for pk in followers])
+
+
+def invalidate_follow_feeds(author_id: int) -> None:
+    """Change follow feeds of author followers. Followers of celebrities
+    are not touched one by one: their posts change `celebrities` feed.
+    """
+    if timeline.is_fanout_author(author_id):
+        followers = timeline.followers(author_id)
+        invalidate_feeds(*(follow_feed(pk) for pk in followers))
+    else:
+        invalidate_feeds('celebrities')
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_group(sender, instance: Post, **kwargs):
+    """Keep group which post belonged to and its image before editing."""
+    previous: Optional[Tuple[Optional[int], str]] = (
+        Post.objects.filter(pk=instance.pk)
+        .values_list('group_id', 'image')
+        .first()
+        if instance.pk
+        else None
+    )
+    instance._previous_group_id, instance._previous_image = (
+        previous or (None, None)
+    )
+
+
+@receiver(pre_save, sender=Post)
+def fill_excerpt(sender, instance: Post, **kwargs):
+    """Feeds show excerpt of post, so it is made on every saving."""
+    instance.excerpt, instance.has_more = make_excerpt(instance.text)
+
+
+@receiver(pre_save, sender=Post)
+def describe_image(sender, instance: Post, **kwargs):
+    """Size and preview of an image are taken once. A new upload is only
+    stored as it is and described after it is normalized (see
+    `posts.uploads`).
+    """
+    image = instance.image
+    instance._image_uploaded = bool(image) and not image._committed
+    if instance._image_uploaded:
+        images.clear(instance)
+    else:
+        images.fill(instance)
+
+
+@receiver(post_save, sender=Post)
+def update_feed_counts_on_save(sender, instance: Post, created: bool, **kw):
+    if created:
+        shift_feed_counts(instance, 1, instance.group_id)
+        forget_follow_counts(instance.author_id)
+        timeline.fan_out(instance)
+        return
+
+    previous_group_id = getattr(instance, '_previous_group_id', None)
+    if previous_group_id != instance.group_id:
+        if previous_group_id:
+            shift_count(feed_count_key('group', previous_group_id), -1)
+        if instance.group_id:
+            shift_count(feed_count_key('group', instance.group_id), 1)
+
+
+@receiver(post_delete, sender=Post)
+def update_feed_counts_on_delete(sender, instance: Post, **kwargs):
+    shift_feed_counts(instance, -1, instance.group_id)
+    forget_follow_counts(instance.author_id)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def update_follow_count(sender, instance: Follow, **kwargs):
+    cache.delete(feed_count_key('follow', instance.user_id))
+    invalidate_feeds(follow_feed(instance.user_id))
+
+
+# timelines read followers counter, so it is shifted first
+@receiver(post_save, sender=Follow)
+def count_follow_on_save(sender, instance: Follow, created: bool, **kwargs):
+    if created:
+        counters.shift_user(instance.author_id, followers=1)
+        counters.shift_user(instance.user_id, following=1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_follow_on_delete(sender, instance: Follow, **kwargs):
+    counters.shift_user(instance.author_id, followers=-1)
+    counters.shift_user(instance.user_id, following=-1)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance: Follow, created: bool, **kwargs):
+    if created:
+        timeline.backfill(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_timeline(sender, instance: Follow, **kwargs):
+    timeline.prune(instance)
+
+
+def invalidate_post_feeds(post: Post, group_ids: Iterable[Optional[int]]):
+    slugs = Group.objects.filter(pk__in=set(group_ids) - {None}).values_list(
+        'slug', flat=True
+    )
+    invalidate_feeds(
+        'index',
+        post_feed(post.pk),
+        author_feed(post.author.get_username()),
+        *(group_feed(slug) for slug in slugs),
+    )
+
+
+def invalidate_all_post_feeds(post: Post) -> None:
+    """Drop every cached page which shows the post card."""
+    invalidate_post_feeds(post, [post.group_id])
+    invalidate_follow_feeds(post.author_id)
+    names = post.tag_links.values_list('tag__name', flat=True)
+    invalidate_feeds(*(tag_feed(name) for name in names))
+
+
+@receiver(post_save, sender=Post)
+def invalidate_feeds_on_post_save(sender, instance: Post, **kwargs):
+    previous_group_id = getattr(instance, '_previous_group_id', None)
+    invalidate_post_feeds(instance, [instance.group_id, previous_group_id])
+    invalidate_follow_feeds(instance.author_id)
+
+
+@receiver(post_delete, sender=Post)
+def invalidate_feeds_on_post_delete(sender, instance: Post, **kwargs):
+    invalidate_post_feeds(instance, [instance.group_id])
+    invalidate_follow_feeds(instance.author_id)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_feeds_on_group_change(sender, **kwargs):
+    invalidate_feeds('all')
+
+
+@receiver(pre_save, sender=User)
+def remember_user_names(sender, instance: User, update_fields=None, **kw):
+    """Keep names shown at pages before the user is saved."""
+    instance._previous_names = None
+    if instance.pk and not (
+        update_fields and set(DISPLAYED_USER_FIELDS).isdisjoint(update_fields)
+    ):
+        instance._previous_names = (
+            User.objects.filter(pk=instance.pk)
+            .values_list(*DISPLAYED_USER_FIELDS)
+            .first()
+        )
+
+
+@receiver(post_save, sender=User)
+def invalidate_feeds_on_user_change(sender, instance: User, **kwargs):
+    """Pages show only names of users, so nothing is invalidated when a new
+    user is created or other fields (`last_login`, password) are saved.
+    """
+    previous = getattr(instance, '_previous_names', None)
+    names = tuple(getattr(instance, name) for name in DISPLAYED_USER_FIELDS)
+    if previous is not None and previous != names:
+        invalidate_feeds('all')
+
+
+@receiver(post_delete, sender=User)
+def invalidate_feeds_on_user_delete(sender, **kwargs):
+    invalidate_feeds('all')
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_post_on_comment(sender, instance: Comment, **kwargs):
+    invalidate_feeds(post_feed(instance.post_id))
+
+
+@receiver(post_save, sender=User)
+def create_user_counters(sender, instance: User, created: bool, **kwargs):
+    if created:
+        UserCounters.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def count_post_on_save(sender, instance: Post, created: bool, **kwargs):
+    if created:
+        counters.shift_user(instance.author_id, posts=1)
+        counters.shift_group(instance.group_id, 1)
+        return
+
+    previous_group_id = getattr(instance, '_previous_group_id', None)
+    if previous_group_id != instance.group_id:
+        counters.shift_group(previous_group_id, -1)
+        counters.shift_group(instance.group_id, 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_post_on_delete(sender, instance: Post, **kwargs):
+    counters.shift_user(instance.author_id, posts=-1)
+    counters.shift_group(instance.group_id, -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment_on_save(sender, instance: Comment, created: bool, **kw):
+    if created:
+        counters.shift(
+            Post.objects.filter(pk=instance.post_id), comment_count=1
+        )
+
+
+@receiver(post_delete, sender=Comment)
+def count_comment_on_delete(sender, instance: Comment, **kwargs):
+    counters.shift(Post.objects.filter(pk=instance.post_id), comment_count=-1)
+
+
+@receiver(post_save, sender=Post)
+def index_post_on_save(sender, instance: Post, **kwargs):
+    search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def remove_post_from_index(sender, instance: Post, **kwargs):
+    search.remove_posts([instance.pk])
+
+
+@receiver(post_save, sender=Post)
+def sync_post_tags(sender, instance: Post, **kwargs):
+    tags.sync([instance])
+
+
+@receiver(pre_delete, sender=Post)
+def forget_post_tags(sender, instance: Post, **kwargs):
+    tags.forget(instance)
+
+
+@receiver(post_save, sender=Post)
+def schedule_image_processing(
+    sender, instance: Post, created: bool, **kwargs
+):
+    """Uploaded image is normalized at background, thumbnails are made of
+    the normalized one. Nothing is done if the image is not changed.
+    """
+    if not instance.image:
+        return
+    image, post_id = instance.image.name, instance.pk
+    if getattr(instance, '_image_uploaded', False):
+        transaction.on_commit(lambda: uploads.schedule(post_id, image))
+    elif created or image != getattr(instance, '_previous_image', None):
+        transaction.on_commit(lambda: thumbnails.schedule(image, post_id))
@@ -0,0 +1,149 @@
+"""Hashtags of posts.
+
+Tags (`#слово`) are parsed from post text on every save (see
+`posts.signals`) and kept as `PostTag` rows with a copy of post creation
+time, so a tag feed is paged by `post_tag_feed_idx` index. Amount of posts
+of every tag (`Tag.post_count`) is shifted as links are added and removed,
+so the top tags are read from `tag_post_count_idx` index instead of being
+counted again.
+"""
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q, QuerySet
+
+from . import counters
+from .feed_cache import invalidate_feeds, tag_feed
+from .models import Post, PostTag, Tag
+from .paginator import (
+    Position, YatubePaginator, feed_count_key, keyset_filter
+)
+
+TAG = re.compile(r'(?<![\w&#/])#(\w*[^\W\d_]\w*)')
+"""`#` followed by a word with at least one letter (not `C#`, `&#39;` or
+`page#anchor`)."""
+
+TOP_TAGS_FEED = 'top_tags'
+"""Feed of pages showing top tags, it is changed with any tag amount."""
+
+
+def extract(text: str) -> List[str]:
+    """Unique tags of text in order of appearance, lowercased."""
+    names = (name.lower()[:Tag.MAX_LENGTH] for name in TAG.findall(text))
+    return list(dict.fromkeys(names))
+
+
+def tag_ids(names: Iterable[str]) -> Dict[str, int]:
+    """Primary keys of tags by names, missing tags are created."""
+    names = set(names)
+    if not names:
+        return {}
+    Tag.objects.bulk_create(
+        [Tag(name=name) for name in names], ignore_conflicts=True
+    )
+    return dict(Tag.objects.filter(name__in=names).values_list('name', 'pk'))
+
+
+def changed(deltas: Dict[int, int], touched: Set[int]) -> None:
+    """Shift amounts of tag posts and drop cached pages of tag feeds."""
+    for tag_id, delta in deltas.items():
+        if delta:
+            counters.shift(Tag.objects.filter(pk=tag_id), post_count=delta)
+    if not touched:
+        return
+    names = Tag.objects.filter(pk__in=touched).values_list('name', flat=True)
+    feeds: List[str] = [tag_feed(name) for name in names]
+    if any(deltas.values()):
+        feeds.append(TOP_TAGS_FEED)
+        cache.delete_many(
+            [feed_count_key('tag', pk) for pk, delta in deltas.items()]
+        )
+    invalidate_feeds(*feeds)
+
+
+def sync(posts: Iterable[Post]) -> None:
+    """Make tag links of posts match their texts."""
+    posts = {post.pk: post for post in posts}
+    wanted: Dict[int, List[str]] = {
+        pk: extract(post.text) for pk, post in posts.items()
+    }
+    ids: Dict[str, int] = tag_ids(
+        name for names in wanted.values() for name in names
+    )
+    current: Set[Tuple[int, int]] = set(
+        PostTag.objects.filter(post_id__in=posts).values_list(
+            'post_id', 'tag_id'
+        )
+    )
+    new: Set[Tuple[int, int]] = {
+        (pk, ids[name]) for pk, names in wanted.items() for name in names
+    }
+
+    added = new - current
+    removed = current - new
+    PostTag.objects.bulk_create(
+        [
+            PostTag(post_id=pk, tag_id=tag_id, created=posts[pk].created)
+            for pk, tag_id in added
+        ],
+        ignore_conflicts=True,
+    )
+    if removed:
+        condition = Q()
+        for pk, tag_id in removed:
+            condition |= Q(post_id=pk, tag_id=tag_id)
+        PostTag.objects.filter(condition).delete()
+
+    deltas: Counter = Counter(tag_id for _, tag_id in added)
+    deltas.subtract(tag_id for _, tag_id in removed)
+    # cards of edited posts are shown at all their tag feeds
+    changed(deltas, {tag_id for _, tag_id in current | new})
+
+
+def forget(post: Post) -> None:
+    """Shift amounts of tags of the post which is being deleted."""
+    linked = list(post.tag_links.values_list('tag_id', flat=True))
+    changed({tag_id: -1 for tag_id in linked}, set(linked))
+
+
+def top_tags(limit: Optional[int] = None) -> QuerySet:
+    return Tag.objects.filter(post_count__gt=0).order_by(
+        '-post_count', 'name'
+    )[:limit or settings.TOP_TAGS_AMOUNT]
+
+
+class TagPaginator(YatubePaginator):
+    """
+    Tag feed paginator. A page of `PostTag` rows is found by keyset on
+    their copies of post position with `post_tag_feed_idx` index, and the
+    posts are loaded by primary keys of that page in the same query.
+
+    Parameters
+    ----------
+    tag: `Tag`
+        Tag of the feed.
+    """
+
+    def __init__(self, *args, tag: Tag, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.links: QuerySet = PostTag.objects.filter(tag=tag).order_by(
+            '-created', '-post_id'
+        )
+
+    def fetch_queryset(
+        self, position: Optional[Position], reverse: bool, limit: int
+    ) -> QuerySet:
+        links: QuerySet = self.links
+        posts: QuerySet = self.object_list
+        if position:
+            links = links.filter(keyset_filter(position, reverse, 'post_id'))
+        if reverse:
+            links = links.order_by('created', 'post_id')
+            posts = posts.order_by('created', 'pk')
+        return posts.filter(pk__in=links.values('post_id')[:limit])
+
+    def count_queryset(self) -> QuerySet:
+        return self.links.order_by().values('pk')
@@ -0,0 +1,17 @@
+from django import template
+
+from posts.models import Follow
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def is_following(context: template.Context, username: str) -> bool:
+    """Is current user following the author with given username.
+
+    {% is_following profile.username as following %}
+    """
+    user = context.get('user')
+    return bool(user and user.is_authenticated) and (
+        Follow.objects.filter(user=user, author__username=username).exists()
+    )
@@ -0,0 +1,23 @@
+from typing import List
+
+from django import template
+from django.utils.safestring import SafeString, mark_safe
+
+from posts.feed_cache import render_cards
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def post_cards(context: template.Context, posts) -> List[SafeString]:
+    """Rendered cards of feed posts. Cards are taken from cache by one
+    request, only missing ones are rendered.
+
+    {% post_cards page_obj as cards %}
+    """
+    cards = render_cards(
+        posts,
+        profile=bool(context.get('profile')),
+        group=bool(context.get('group')),
+    )
+    return [mark_safe(card) for card in cards]
@@ -0,0 +1,30 @@
+from typing import Any, Dict, Union
+
+from django import template
+
+from posts.thumbnails import (
+    Picture, Placeholder, Size, geometry, image_name, picture, thumbnail_size
+)
+
+register = template.Library()
+
+
+@register.inclusion_tag('posts/includes/picture.html')
+def post_picture(post, name: str, lazy: bool = True) -> Dict[str, Any]:
+    """`<picture>` of post image variants made at background, the preview
+    of the image (or a placeholder with `data-pending` attribute) is shown
+    while they are missing. Pages never make thumbnails themselves. The
+    image is loaded lazily unless it is the main one of the page.
+
+    {% post_picture post 'card' lazy=False %}
+    """
+    source: Size = (post.image_width, post.image_height)
+    found: Union[Picture, Placeholder] = picture(
+        image_name(post), name, source
+    ) or Placeholder(thumbnail_size(*geometry(name), source))
+    return {
+        'picture': found,
+        'color': post.image_color,
+        'preview': post.image_preview,
+        'lazy': lazy,
+    }
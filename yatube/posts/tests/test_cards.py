@@ -0,0 +1,73 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts import feed_cache
+from posts.cards import PostCard, as_cards
+from posts.models import Group, Post
+from posts.paginator import CursorPaginator
+
+User = get_user_model()
+
+
+class PostCardTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.author: User = User.objects.create_user(
+            username='post_author', first_name='Лев', last_name='Толстой'
+        )
+        self.group: Group = Group.objects.create(title='Группа', slug='group')
+        self.post: Post = Post.objects.create(
+            text='Пост в группе', author=self.author, group=self.group
+        )
+        self.lonely: Post = Post.objects.create(
+            text='Пост без группы', author=self.author
+        )
+        return super().setUp()
+
+    def test_cards_attributes(self):
+        cards = {card.pk: card for card in as_cards(Post.objects.all())}
+        card: PostCard = cards[self.post.pk]
+        self.assertEqual(card.excerpt, self.post.text)
+        self.assertEqual(card.created, self.post.created)
+        self.assertEqual(card.author.get_username(), 'post_author')
+        self.assertEqual(card.author.get_full_name(), 'Лев Толстой')
+        self.assertEqual(card.group.slug, 'group')
+        self.assertIsNone(cards[self.lonely.pk].group)
+        with self.assertRaises(AttributeError):
+            card.title = 'Нет такого поля'
+
+    def test_cards_render_as_posts(self):
+        posts = list(Post.objects.order_by('-created', '-pk'))
+        expected = feed_cache.render_cards(posts)
+        cache.clear()
+        cards = as_cards(Post.objects.order_by('-created', '-pk'))
+        self.assertEqual(feed_cache.render_cards(cards), expected)
+
+    def test_cursor_pages_of_cards(self):
+        paginator = CursorPaginator(as_cards(Post.objects.all()), 1)
+        first = paginator.get_cursor_page(None)
+        second = paginator.get_cursor_page(first.next_cursor)
+        self.assertEqual(
+            [first[0].pk, second[0].pk], [self.lonely.pk, self.post.pk]
+        )
+
+    @override_settings(FEED_READ_MODELS=('index',))
+    def test_feed_opts_in(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertIsInstance(response.context['page_obj'][0], PostCard)
+        self.assertContains(
+            response, reverse('posts:group_list', args=['group'])
+        )
+
+        response = self.client.get(reverse('posts:group_list', args=['group']))
+        self.assertIsInstance(response.context['page_obj'][0], Post)
+
+    def test_benchmark(self):
+        out = StringIO()
+        call_command('benchmark_cards', repeat=1, stdout=out)
+        self.assertIn('PostCard saves', out.getvalue())
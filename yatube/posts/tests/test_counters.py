@@ -0,0 +1,86 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.counters import reconcile
+from posts.models import Comment, Follow, Group, Post, UserCounters
+
+User = get_user_model()
+
+
+class CountersTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.author: User = User.objects.create_user(username='post_author')
+        self.user: User = User.objects.create_user(username='test_user')
+        self.group: Group = Group.objects.create(title='Группа', slug='group')
+        self.post: Post = Post.objects.create(
+            text='Тестовый пост', author=self.author, group=self.group
+        )
+        return super().setUp()
+
+    def counters(self, user: User) -> UserCounters:
+        return UserCounters.objects.get(user=user)
+
+    def test_posts_are_counted(self):
+        self.assertEqual(self.counters(self.author).posts, 1)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.post_count, 1)
+
+        other: Group = Group.objects.create(title='Другая', slug='other')
+        self.post.group = other
+        self.post.save()
+        other.refresh_from_db()
+        self.group.refresh_from_db()
+        self.assertEqual((self.group.post_count, other.post_count), (0, 1))
+
+        self.post.delete()
+        other.refresh_from_db()
+        self.assertEqual(other.post_count, 0)
+        self.assertEqual(self.counters(self.author).posts, 0)
+
+    def test_comments_and_follows_are_counted(self):
+        comment = Comment.objects.create(
+            post=self.post, author=self.user, text='Комментарий'
+        )
+        Follow.objects.create(user=self.user, author=self.author)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        self.assertEqual(self.counters(self.author).followers, 1)
+        self.assertEqual(self.counters(self.user).following, 1)
+
+        comment.delete()
+        Follow.objects.all().delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 0)
+        self.assertEqual(self.counters(self.author).followers, 0)
+        self.assertEqual(self.counters(self.user).following, 0)
+
+    def test_reconcile(self):
+        Post.objects.bulk_create(
+            [Post(text=f'Пост {i}', author=self.author) for i in range(5)]
+        )
+        UserCounters.objects.filter(user=self.user).delete()
+        Post.objects.filter(pk=self.post.pk).update(comment_count=7)
+
+        fixed = reconcile(chunk_size=2)
+        self.assertEqual(fixed['UserCounters.posts'], 1)
+        self.assertEqual(fixed['Post.comment_count'], 1)
+        self.assertEqual(self.counters(self.author).posts, 6)
+        self.assertEqual(self.counters(self.user).posts, 0)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 0)
+
+        call_command('reconcile_counters', stdout=StringIO())
+        self.assertEqual(reconcile()['UserCounters.posts'], 0)
+
+    def test_post_page_shows_counter(self):
+        UserCounters.objects.filter(user=self.author).update(posts=42)
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk])
+        )
+        self.assertContains(response, '<span >42</span>')
@@ -0,0 +1,76 @@
+import csv
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.exporter import rows
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ExportTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.author: User = User.objects.create_user(username='post_author')
+        self.staff: User = User.objects.create_user(
+            username='staff', is_staff=True
+        )
+        group: Group = Group.objects.create(title='Группа', slug='group')
+        for number in range(5):
+            Post.objects.create(
+                text=f'Пост {number}', author=self.author, group=group
+            )
+        Comment.objects.create(
+            post=Post.objects.first(), author=self.staff, text='Комментарий'
+        )
+        Follow.objects.create(user=self.staff, author=self.author)
+        return super().setUp()
+
+    def test_rows_are_read_by_chunks(self):
+        with self.assertNumQueries(3):
+            texts = [
+                text for _, text in rows(Post.objects.all(), ('pk', 'text'), 2)
+            ]
+        self.assertEqual(texts, [f'Пост {number}' for number in range(5)])
+
+    def test_command_exports_jsonl(self):
+        folder: str = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, folder)
+        output: str = os.path.join(folder, 'posts.jsonl.gz')
+        call_command(
+            'export_data', 'posts', gzip=True, output=output, stdout=StringIO()
+        )
+
+        with gzip.open(output, 'rt', encoding='utf-8') as file:
+            records = [json.loads(line) for line in file]
+        self.assertEqual(len(records), 5)
+        self.assertEqual(records[0]['author'], 'post_author')
+        self.assertEqual(records[0]['group'], 'group')
+        self.assertEqual(records[0]['text'], 'Пост 0')
+
+    def test_endpoint_streams_csv_to_staff_only(self):
+        url: str = reverse('posts:export', args=['follows'])
+        self.client.force_login(self.author)
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.client.force_login(self.staff)
+        response = self.client.get(url, {'format': 'csv'})
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        content: str = b''.join(response.streaming_content).decode()
+        self.assertEqual(
+            list(csv.reader(content.splitlines()))[1:],
+            [[str(Follow.objects.get().pk), 'staff', 'post_author']],
+        )
+        missing: str = reverse('posts:export', args=['users'])
+        self.assertEqual(self.client.get(missing).status_code, 404)
@@ -0,0 +1,252 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import feed_cache
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+
+class SingleFlightTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.rendered = []
+        return super().setUp()
+
+    def render(self, content: str = 'page'):
+        def render() -> HttpResponse:
+            self.rendered.append(content)
+            return HttpResponse(content)
+
+        return render
+
+    def test_hit_and_miss(self):
+        for _ in range(3):
+            response = feed_cache.single_flight('key', 'stale', self.render())
+            self.assertEqual(response.content, b'page')
+
+        self.assertEqual(self.rendered, ['page'])
+        self.assertEqual(
+            feed_cache.stats(),
+            {'hit': 2, 'miss': 1, 'stale': 0, 'lock_wait': 0},
+        )
+
+    def test_stale_page_is_served_while_locked(self):
+        feed_cache.single_flight('old_key', 'stale', self.render('old'))
+        cache.add('new_key:lock', 1)
+
+        response = feed_cache.single_flight(
+            'new_key', 'stale', self.render('new')
+        )
+        self.assertEqual(response.content, b'old')
+        self.assertEqual(self.rendered, ['old'])
+        self.assertEqual(feed_cache.stats()['stale'], 1)
+
+    @override_settings(FEED_CACHE_LOCK_WAIT=0.1, FEED_CACHE_LOCK_POLL=0.01)
+    def test_slow_lock_holder(self):
+        cache.add('key:lock', 1)
+
+        response = feed_cache.single_flight('key', 'stale', self.render())
+        self.assertEqual(response.content, b'page')
+        self.assertEqual(feed_cache.stats()['lock_wait'], 1)
+        self.assertIsNone(cache.get('key:lock'))
+
+    @override_settings(FEED_CACHE_TIME=-1)
+    def test_outdated_page_is_rendered_again(self):
+        feed_cache.single_flight('key', 'stale', self.render('old'))
+        response = feed_cache.single_flight('key', 'stale', self.render('new'))
+        self.assertEqual(response.content, b'new')
+
+
+class CardCacheTests(TestCase):
+    CARD = 'posts/includes/post.html'
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.user: User = User.objects.create_user(username='test_user')
+        self.group: Group = Group.objects.create(title='Группа', slug='group')
+        self.post: Post = Post.objects.create(
+            text='Тестовый пост', author=self.user, group=self.group
+        )
+        return super().setUp()
+
+    def test_cards_are_cached(self):
+        with self.assertTemplateUsed(self.CARD):
+            cards = feed_cache.render_cards([self.post])
+        self.assertIn('Тестовый пост', cards[0])
+        with self.assertTemplateNotUsed(self.CARD), self.assertNumQueries(0):
+            self.assertEqual(feed_cache.render_cards([self.post]), cards)
+
+    def test_flags_make_different_cards(self):
+        card = feed_cache.render_cards([self.post])[0]
+        group_card = feed_cache.render_cards([self.post], group=True)[0]
+        self.assertIn('все записи группы', card)
+        self.assertNotIn('все записи группы', group_card)
+
+    def test_cards_invalidation(self):
+        feed_cache.render_cards([self.post])
+
+        self.post.text = 'Отредактированный пост'
+        self.post.save()
+        self.assertIn(
+            'Отредактированный пост', feed_cache.render_cards([self.post])[0]
+        )
+
+        self.group.slug = 'new_slug'
+        self.group.save()
+        self.assertIn('new_slug', feed_cache.render_cards([self.post])[0])
+
+
+class DonutCacheTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.author: User = User.objects.create_user(username='post_author')
+        self.user: User = User.objects.create_user(username='test_user')
+        self.post: Post = Post.objects.create(
+            text='Тестовый пост', author=self.author
+        )
+        self.guest_client = Client()
+        self.user_client = Client()
+        self.user_client.force_login(self.user)
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        return super().setUp()
+
+    def test_profile_page_is_shared(self):
+        url = reverse('posts:profile', args=['post_author'])
+        response = self.author_client.get(url)
+        self.assertNotIn('Подписаться', response.content.decode())
+
+        with self.assertTemplateNotUsed('posts/profile.html'):
+            content = self.user_client.get(url).content.decode()
+        self.assertIn('test_user', content)
+        self.assertIn('Подписаться', content)
+
+        Follow.objects.create(user=self.user, author=self.author)
+        content = self.user_client.get(url).content.decode()
+        self.assertIn('Отписаться', content)
+
+    def test_only_shown_user_fields_drop_pages(self):
+        url = reverse('posts:index')
+        self.guest_client.get(url)
+
+        User.objects.create_user(username='new_user')
+        self.author.set_password('new_password')
+        self.author.save()
+        with self.assertTemplateNotUsed('posts/index.html'):
+            self.guest_client.get(url)
+
+        self.author.first_name = 'Лев'
+        self.author.save()
+        with self.assertTemplateUsed('posts/index.html'):
+            self.guest_client.get(url)
+
+    def test_post_detail_page_is_shared(self):
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        edit_url = reverse('posts:post_edit', args=[self.post.pk])
+        comment_url = reverse('posts:add_comment', args=[self.post.pk])
+
+        content = self.guest_client.get(url).content.decode()
+        self.assertNotIn(comment_url, content)
+
+        with self.assertTemplateNotUsed('posts/post_detail.html'):
+            content = self.user_client.get(url).content.decode()
+        self.assertIn(comment_url, content)
+        self.assertIn('csrfmiddlewaretoken', content)
+        self.assertNotIn(edit_url, content)
+
+        content = self.author_client.get(url).content.decode()
+        self.assertIn(edit_url, content)
+
+    def test_comment_drops_post_page(self):
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        self.guest_client.get(url)
+        self.user_client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'Новый комментарий'},
+        )
+        self.assertIn(
+            'Новый комментарий', self.guest_client.get(url).content.decode()
+        )
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.author: User = User.objects.create_user(username='post_author')
+        self.user: User = User.objects.create_user(username='test_user')
+        self.post: Post = Post.objects.create(
+            text='Тестовый пост', author=self.author
+        )
+        self.guest_client = Client()
+        self.user_client = Client()
+        self.user_client.force_login(self.user)
+        return super().setUp()
+
+    def revalidate(self, client: Client, url: str, response: HttpResponse):
+        return client.get(
+            url,
+            HTTP_IF_NONE_MATCH=response['ETag'],
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+        )
+
+    def test_not_modified_page_is_not_rendered(self):
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:profile', args=['post_author']),
+            reverse('posts:post_detail', args=[self.post.pk]),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertEqual(response.status_code, 200)
+                with self.assertNumQueries(0):
+                    response = self.revalidate(
+                        self.guest_client, url, response
+                    )
+                self.assertEqual(response.status_code, 304)
+
+    def test_changed_feed_is_sent_again(self):
+        url = reverse('posts:index')
+        response = self.guest_client.get(url)
+        Post.objects.create(text='Новый пост', author=self.author)
+        response = self.revalidate(self.guest_client, url, response)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Новый пост', response.content.decode())
+
+    def test_validators_depend_on_user(self):
+        url = reverse('posts:profile', args=['post_author'])
+        response = self.guest_client.get(url)
+        response = self.revalidate(self.user_client, url, response)
+        self.assertEqual(response.status_code, 200)
+
+        response = self.revalidate(self.user_client, url, response)
+        self.assertEqual(response.status_code, 304)
+        Follow.objects.create(user=self.user, author=self.author)
+        response = self.revalidate(self.user_client, url, response)
+        self.assertIn('Отписаться', response.content.decode())
+
+    def test_follow_page(self):
+        url = reverse('posts:follow_index')
+        Follow.objects.create(user=self.user, author=self.author)
+        response = self.user_client.get(url)
+        self.assertEqual(
+            self.revalidate(self.user_client, url, response).status_code, 304
+        )
+
+        Post.objects.create(text='Новый пост', author=self.author)
+        response = self.revalidate(self.user_client, url, response)
+        self.assertIn('Новый пост', response.content.decode())
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_follow_page_with_celebrity(self):
+        url = reverse('posts:follow_index')
+        Follow.objects.create(user=self.user, author=self.author)
+        response = self.user_client.get(url)
+
+        Post.objects.create(text='Новый пост', author=self.author)
+        response = self.revalidate(self.user_client, url, response)
+        self.assertIn('Новый пост', response.content.decode())
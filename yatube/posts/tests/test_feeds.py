@@ -0,0 +1,80 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class SyndicationFeedsTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.author: User = User.objects.create_user(username='post_author')
+        self.group: Group = Group.objects.create(
+            title='Группа', slug='group', description='Описание группы'
+        )
+        self.post: Post = Post.objects.create(
+            text='Тестовый пост', author=self.author, group=self.group
+        )
+        return super().setUp()
+
+    def test_feeds_show_posts(self):
+        urls = {
+            reverse('posts:index_rss'): 'application/rss+xml',
+            reverse('posts:index_atom'): 'application/atom+xml',
+            reverse('posts:group_rss', args=['group']): 'application/rss+xml',
+            reverse('posts:group_atom', args=['group']): (
+                'application/atom+xml'
+            ),
+            reverse('posts:profile_rss', args=['post_author']): (
+                'application/rss+xml'
+            ),
+            reverse('posts:profile_atom', args=['post_author']): (
+                'application/atom+xml'
+            ),
+        }
+        link: str = reverse('posts:post_detail', args=[self.post.pk])
+        for url, content_type in urls.items():
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertIn(content_type, response['Content-Type'])
+                self.assertContains(response, 'Тестовый пост')
+                self.assertContains(response, link)
+        missing: str = reverse('posts:group_rss', args=['missing'])
+        self.assertEqual(self.client.get(missing).status_code, 404)
+
+    def test_feeds_are_cached_and_validated(self):
+        url: str = reverse('posts:group_atom', args=['group'])
+        response = self.client.get(url)
+        etag: str = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+
+        Post.objects.filter(pk=self.post.pk).update(text='Изменённый пост')
+        with self.assertNumQueries(0):
+            self.assertNotContains(self.client.get(url), 'Изменённый')
+
+        self.post.refresh_from_db()
+        self.post.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Изменённый пост')
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_pages_link_to_feeds(self):
+        pages = {
+            reverse('posts:index'): reverse('posts:index_atom'),
+            reverse('posts:group_list', args=['group']): reverse(
+                'posts:group_rss', args=['group']
+            ),
+            reverse('posts:profile', args=['post_author']): reverse(
+                'posts:profile_atom', args=['post_author']
+            ),
+        }
+        for page, feed in pages.items():
+            with self.subTest(page=page):
+                self.assertContains(self.client.get(page), f'href="{feed}"')
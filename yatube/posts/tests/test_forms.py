@@ -3,17 +3,21 @@ import shutil
 import tempfile
 
 from http import HTTPStatus
+from io import StringIO
 
 
 from django.test import TestCase, Client, override_settings
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.core.management import call_command
 
 from posts.models import Group, Post
 from posts.urls import app_name
 from core.functools.utils import reverse_next
 from posts.models import Comment
+from posts.excerpts import make_excerpt
 from yatube.settings import BASE_DIR
 
 User = get_user_model()
@@ -265,3 +269,50 @@ class FormTests(TestCase):
             reverse_next('users:login', self.url_reverse['add_comment']),
         )
         self.assertFalse(Comment.objects.filter(text=comment_form).exists())
+
+
+@override_settings(POST_EXCERPT_LENGTH=20)
+class ExcerptTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.user: User = User.objects.create_user(username='test_user')
+        self.client.force_login(self.user)
+        return super().setUp()
+
+    def test_feeds_show_excerpt(self):
+        text = 'Очень длинный пост, который не влезает в ленту целиком'
+        self.client.post(reverse('posts:post_create'), {'text': text})
+        post: Post = Post.objects.get()
+        self.assertTrue(post.has_more)
+        self.assertEqual(post.excerpt, make_excerpt(text)[0])
+        self.assertLessEqual(len(post.excerpt), 20)
+
+        response = self.client.get(reverse('posts:index'))
+        first: Post = response.context['page_obj'][0]
+        self.assertIn('text', first.get_deferred_fields())
+        self.assertContains(response, post.excerpt)
+        self.assertNotContains(response, text)
+        self.assertContains(response, 'читать полностью')
+
+        response = self.client.get(
+            reverse('posts:post_detail', args=[post.pk])
+        )
+        self.assertContains(response, text)
+
+        self.client.post(
+            reverse('posts:post_edit', args=[post.pk]), {'text': 'Коротко'}
+        )
+        post.refresh_from_db()
+        self.assertEqual((post.excerpt, post.has_more), ('Коротко', False))
+
+    def test_backfill_command(self):
+        Post.objects.bulk_create(
+            [Post(text=f'Пост номер {i}', author=self.user) for i in range(5)]
+        )
+        out = StringIO()
+        call_command('backfill_excerpts', chunk_size=2, stdout=out)
+        self.assertIn('5 posts', out.getvalue())
+        self.assertFalse(Post.objects.filter(excerpt='').exists())
+
+        call_command('backfill_excerpts', stdout=out)
+        self.assertIn('0 posts', out.getvalue())
@@ -0,0 +1,195 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from posts.importer import PostImporter
+from posts.models import Follow, Group, Post, Timeline, UserCounters
+from posts.paginator import feed_count_key
+
+User = get_user_model()
+
+
+class ImportPostsTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.folder: str = tempfile.mkdtemp()
+        self.author: User = User.objects.create_user(username='post_author')
+        self.user: User = User.objects.create_user(username='test_user')
+        self.group: Group = Group.objects.create(title='Группа', slug='group')
+        Follow.objects.create(user=self.user, author=self.author)
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.folder, ignore_errors=True)
+        return super().tearDown()
+
+    def write(self, name: str, content: str) -> str:
+        path: str = os.path.join(self.folder, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        return path
+
+    def jsonl(self, records) -> str:
+        return self.write(
+            'posts.jsonl', '\n'.join(json.dumps(r) for r in records)
+        )
+
+    def import_posts(self, path: str, **options) -> str:
+        out = StringIO()
+        call_command('import_posts', path, stdout=out, stderr=out, **options)
+        return out.getvalue()
+
+    def test_jsonl_is_imported(self):
+        path: str = self.jsonl(
+            [
+                {
+                    'author': 'post_author',
+                    'group': 'group',
+                    'text': 'Старый пост',
+                    'created': '2015-05-01T10:00:00',
+                },
+                {'author': 'post_author', 'text': 'Новый пост'},
+                {'author': 'nobody', 'text': 'Пост без автора'},
+                {'author': 'post_author', 'group': 'missing', 'text': 'Пост'},
+            ]
+        )
+        output: str = self.import_posts(path, batch_size=3)
+
+        self.assertIn('2 posts imported', output)
+        self.assertIn("Record 3 is skipped: unknown author 'nobody'", output)
+        self.assertIn("Record 4 is skipped: unknown group 'missing'", output)
+        old: Post = Post.objects.get(text='Старый пост')
+        self.assertEqual(
+            old.created, timezone.make_aware(datetime(2015, 5, 1, 10))
+        )
+        self.assertEqual((old.group, old.excerpt), (self.group, old.text))
+        self.assertEqual(UserCounters.objects.get(user=self.author).posts, 2)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.post_count, 1)
+        self.assertEqual(Timeline.objects.filter(user=self.user).count(), 2)
+        self.assertFalse(os.path.exists(path + '.checkpoint'))
+
+    def test_csv_is_imported(self):
+        path: str = self.write(
+            'posts.csv',
+            'author,group,text,created,image\n'
+            'post_author,group,"Пост, с запятой",,\n'
+            'post_author,,Второй пост,2020-01-01 12:00,posts/lost.gif\n',
+        )
+        with mock.patch('posts.thumbnails.schedule') as schedule:
+            with self.assertLogs('posts.images', 'WARNING'):
+                self.import_posts(path)
+
+        self.assertTrue(
+            Post.objects.filter(text='Пост, с запятой', group=self.group)
+        )
+        second: Post = Post.objects.get(text='Второй пост')
+        self.assertEqual(second.image.name, 'posts/lost.gif')
+        self.assertIsNone(second.group)
+        schedule.assert_called_once_with('posts/lost.gif', second.pk)
+
+    def test_failed_import_is_resumed(self):
+        path: str = self.jsonl(
+            {'author': 'post_author', 'text': f'Пост {number}'}
+            for number in range(5)
+        )
+        with mock.patch.object(
+            PostImporter,
+            'count',
+            autospec=True,
+            side_effect=[None, RuntimeError('failure')],
+        ):
+            with self.assertRaises(RuntimeError):
+                self.import_posts(path, batch_size=2)
+        self.assertEqual(Post.objects.count(), 2)
+        with open(path + '.checkpoint') as file:
+            self.assertEqual(json.load(file)['position'], 2)
+
+        output: str = self.import_posts(path, batch_size=2)
+        self.assertIn('Resuming after 2 records.', output)
+        self.assertEqual(
+            sorted(Post.objects.values_list('text', flat=True)),
+            [f'Пост {number}' for number in range(5)],
+        )
+
+    def test_resumed_import_refreshes_authors_of_committed_batches(self):
+        another: User = User.objects.create_user(username='another_author')
+        follower: User = User.objects.create_user(username='follower')
+        Follow.objects.create(user=follower, author=another)
+        path: str = self.jsonl(
+            [
+                {'author': 'post_author', 'text': 'Пост 1'},
+                {'author': 'post_author', 'text': 'Пост 2'},
+                {'author': 'another_author', 'text': 'Пост 3'},
+                {'author': 'another_author', 'text': 'Пост 4'},
+            ]
+        )
+        author_key = feed_count_key('author', self.author.pk)
+        cache.set(author_key, 0)
+        with mock.patch(
+            'posts.importer.search.index_posts',
+            side_effect=[None, RuntimeError('failure')],
+        ):
+            with self.assertRaises(RuntimeError):
+                self.import_posts(path, batch_size=2)
+        # the committed batch is in timelines already
+        self.assertEqual(Timeline.objects.filter(user=self.user).count(), 2)
+        self.assertFalse(Timeline.objects.filter(user=follower).exists())
+
+        self.import_posts(path, batch_size=2)
+        self.assertEqual(Timeline.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(Timeline.objects.filter(user=follower).count(), 2)
+        self.assertIsNone(cache.get(author_key))
+
+    def test_only_imported_posts_are_fanned_out(self):
+        Post.objects.create(text='Пост', author=self.author)
+        kept: Timeline = Timeline.objects.get(user=self.user)
+        celebrity: User = User.objects.create_user(username='celebrity')
+        Follow.objects.create(user=self.user, author=celebrity)
+        UserCounters.objects.filter(user=celebrity).update(
+            followers=settings.TIMELINE_FANOUT_LIMIT + 1
+        )
+        path: str = self.jsonl(
+            [
+                {'author': 'post_author', 'text': 'Пост 1'},
+                {'author': 'celebrity', 'text': 'Пост 2'},
+            ]
+        )
+        self.import_posts(path)
+
+        self.assertTrue(Timeline.objects.filter(pk=kept.pk).exists())
+        self.assertEqual(
+            list(
+                Timeline.objects.filter(user=self.user)
+                .exclude(pk=kept.pk)
+                .values_list('post__text', flat=True)
+            ),
+            ['Пост 1'],
+        )
+
+    def test_posts_are_locked_before_last_key_is_read(self):
+        path: str = self.jsonl([{'author': 'post_author', 'text': 'Пост'}])
+        with CaptureQueriesContext(connection) as queries:
+            self.import_posts(path)
+        statements = [query['sql'] for query in queries]
+        last = next(
+            number
+            for number, sql in enumerate(statements)
+            if sql.startswith('SELECT MAX')
+        )
+        self.assertTrue(
+            statements[last - 1].startswith('UPDATE "posts_post"')
+        )
@@ -0,0 +1,149 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.paginator import Page
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.management.commands.explain_feeds import problems
+from posts.models import Post
+from posts.paginator import (
+    CursorPaginator, YatubePaginator, decode_cursor, encode_cursor,
+    feed_count_key
+)
+from yatube.settings import POSTS_PER_PAGE
+
+User = get_user_model()
+
+
+class CursorPaginatorTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.user: User = User.objects.create_user(username='test_user')
+        self.posts_amount = POSTS_PER_PAGE * 2 + 3
+        Post.objects.bulk_create(
+            [
+                Post(text=f'Пост {i}', author=self.user)
+                for i in range(self.posts_amount)
+            ]
+        )
+        self.expected = list(Post.objects.order_by('-created', '-pk'))
+        self.client = Client()
+        return super().setUp()
+
+    def test_cursor_encoding(self):
+        post = self.expected[0]
+        self.assertEqual(
+            decode_cursor(encode_cursor(post.created, post.pk, reverse=True)),
+            ((post.created, post.pk), True),
+        )
+        huge: str = encode_cursor(post.created, 10 ** 30)
+        for broken in (None, '', 'broken', '!!!', huge):
+            with self.subTest(cursor=broken):
+                self.assertEqual(decode_cursor(broken), (None, False))
+        response = self.client.get(reverse('posts:index'), {'cursor': huge})
+        self.assertEqual(response.status_code, 200)
+
+    def test_walk_forward_and_backward(self):
+        paginator = CursorPaginator(Post.objects.all(), POSTS_PER_PAGE)
+        pages = [paginator.get_cursor_page(None)]
+        while pages[-1].next_cursor:
+            pages.append(paginator.get_cursor_page(pages[-1].next_cursor))
+
+        self.assertEqual(len(pages), 3)
+        self.assertIsNone(pages[0].previous_cursor)
+        self.assertEqual(
+            [post for page in pages for post in page], self.expected
+        )
+
+        back = paginator.get_cursor_page(pages[-1].previous_cursor)
+        self.assertEqual(list(back), list(pages[1]))
+        back = paginator.get_cursor_page(back.previous_cursor)
+        self.assertEqual(list(back), list(pages[0]))
+        self.assertIsNone(back.previous_cursor)
+
+    def test_views_accept_cursor_and_page(self):
+        url = reverse('posts:profile', args=[self.user.get_username()])
+        first: Page = self.client.get(url).context['page_obj']
+        self.assertTrue(first.is_cursor)
+
+        second: Page = self.client.get(
+            url, {'cursor': first.next_cursor}
+        ).context['page_obj']
+        self.assertEqual(
+            list(second), self.expected[POSTS_PER_PAGE:POSTS_PER_PAGE * 2]
+        )
+
+        by_number: Page = self.client.get(url, {'page': 2}).context['page_obj']
+        self.assertEqual(list(by_number), list(second))
+
+
+class YatubePaginatorTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.user: User = User.objects.create_user(username='test_user')
+        Post.objects.bulk_create(
+            [Post(text=f'Пост {i}', author=self.user) for i in range(25)]
+        )
+        return super().setUp()
+
+    def test_count_is_cached_and_kept_up_to_date(self):
+        key = feed_count_key('author', self.user.pk)
+        posts = Post.objects.filter(author=self.user)
+
+        with self.assertNumQueries(1):
+            paginator = YatubePaginator(posts, 10, count_key=key)
+            self.assertEqual(paginator.count, 25)
+        with self.assertNumQueries(0):
+            paginator = YatubePaginator(posts, 10, count_key=key)
+            self.assertEqual(paginator.count, 25)
+
+        post = Post.objects.create(text='Новый пост', author=self.user)
+        self.assertEqual(cache.get(key), 26)
+        post.delete()
+        self.assertEqual(cache.get(key), 25)
+
+    @override_settings(FEED_COUNT_EXACT_LIMIT=10)
+    def test_long_feed_count_is_estimated(self):
+        paginator = YatubePaginator(Post.objects.all(), 10, estimate=True)
+        self.assertGreaterEqual(paginator.calculate_count(), 25)
+
+    @override_settings(FEED_COUNT_EXACT_LIMIT=10)
+    def test_filtered_feed_count_is_exact(self):
+        other: User = User.objects.create_user(username='other_user')
+        Post.objects.create(text='Чужой пост', author=other)
+        posts = Post.objects.filter(author=self.user)
+        paginator = YatubePaginator(posts, 10)
+        self.assertEqual(paginator.calculate_count(), 25)
+
+    @override_settings(PAGINATOR_WINDOW=1)
+    def test_page_window(self):
+        paginator = YatubePaginator(Post.objects.all(), 1)
+        data = {
+            1: [1, 2, None, 25],
+            3: [1, 2, 3, 4, None, 25],
+            10: [1, None, 9, 10, 11, None, 25],
+            25: [1, None, 24, 25],
+        }
+        for number, expected in data.items():
+            with self.subTest(number=number):
+                self.assertEqual(paginator.page(number).page_window, expected)
+
+
+class ExplainFeedsTests(TestCase):
+    def test_feed_queries_use_indexes(self):
+        out = StringIO()
+        call_command('explain_feeds', stdout=out)
+        self.assertIn('All feed queries use indexes.', out.getvalue())
+
+    def test_problems(self):
+        plan = ['SCAN posts_post', 'USE TEMP B-TREE FOR ORDER BY']
+        self.assertEqual(problems('group', plan), plan)
+        self.assertEqual(problems('follow next', plan), plan[:1])
+        scan = ['SCAN posts_post USING INDEX created']
+        self.assertEqual(problems('index', scan, limited=True), [])
+        self.assertEqual(problems('index count', scan), scan)
+        nested = ['LIST SUBQUERY 1', '  USE TEMP B-TREE FOR ORDER BY']
+        self.assertEqual(problems('follow', nested), [nested[1].strip()])
@@ -0,0 +1,94 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post, PostTerm
+from posts.search import matching, ranked_ids, stem, terms
+
+User = get_user_model()
+
+
+class StemTests(TestCase):
+    def test_russian_words_are_stemmed(self):
+        words = {
+            'коты': 'кот',
+            'котами': 'кот',
+            'красивая': 'красив',
+            'подписчиков': 'подписчик',
+            'фотографии': 'фотограф',
+        }
+        for word, expected in words.items():
+            with self.subTest(word=word):
+                self.assertEqual(stem(word), expected)
+
+    def test_text_is_normalized(self):
+        self.assertEqual(terms('Ёлки, Django 3!'), ['елк', 'django', '3'])
+
+
+class SearchMixin:
+    def setUp(self) -> None:
+        cache.clear()
+        self.author: User = User.objects.create_user(username='post_author')
+        self.cats: Post = Post.objects.create(
+            text='Коты и котята любят котов', author=self.author
+        )
+        self.cat: Post = Post.objects.create(
+            text='Кот спит на диване', author=self.author
+        )
+        self.dog: Post = Post.objects.create(
+            text='Собака гуляет', author=self.author
+        )
+        return super().setUp()
+
+    def test_posts_are_ranked(self):
+        self.assertEqual(ranked_ids('котами'), [self.cats.pk, self.cat.pk])
+        self.assertEqual(ranked_ids('котам на диване'), [self.cat.pk])
+        self.assertEqual(ranked_ids('  ,. '), [])
+
+    def test_index_follows_posts(self):
+        self.dog.text = 'Собака и кот гуляют'
+        self.dog.save()
+        self.assertIn(self.dog.pk, ranked_ids('кот'))
+        self.assertEqual(ranked_ids('гулять'), [self.dog.pk])
+
+        self.cat.delete()
+        self.assertNotIn(self.cat.pk, ranked_ids('кот'))
+
+    def test_search_page(self):
+        response = self.client.get(reverse('posts:search'), {'q': 'коты'})
+        self.assertEqual(
+            [post.pk for post in response.context['page_obj']],
+            [self.cats.pk, self.cat.pk],
+        )
+        self.assertContains(response, 'Кот спит на диване')
+        self.assertNotContains(response, 'Собака гуляет')
+
+    def test_admin_search(self):
+        admin: User = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'собаки'}
+        )
+        self.assertEqual(list(response.context['cl'].result_list), [self.dog])
+
+    @override_settings(SEARCH_RESULTS_LIMIT=1)
+    def test_admin_search_is_not_limited(self):
+        found = matching(Post.objects.all(), 'коты')
+        self.assertEqual(set(found), {self.cats, self.cat})
+        self.assertFalse(matching(Post.objects.all(), '  ,. ').exists())
+
+
+class Fts5SearchTests(SearchMixin, TestCase):
+    def test_fts5_is_used(self):
+        self.assertFalse(PostTerm.objects.exists())
+
+
+@override_settings(SEARCH_BACKEND='terms')
+class TermsSearchTests(SearchMixin, TestCase):
+    def test_terms_are_weighted(self):
+        self.assertEqual(
+            PostTerm.objects.get(post=self.cats, term='кот').weight, 2
+        )
@@ -0,0 +1,99 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.counters import reconcile
+from posts.models import Post, PostTag, Tag
+from posts.tags import extract, top_tags
+
+User = get_user_model()
+
+
+class TagsTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.author: User = User.objects.create_user(username='post_author')
+        self.post: Post = Post.objects.create(
+            text='Прогулка #Природа и #лето, #природа', author=self.author
+        )
+        return super().setUp()
+
+    def tag(self, name: str) -> Tag:
+        return Tag.objects.get(name=name)
+
+    def test_tags_are_extracted(self):
+        self.assertEqual(
+            extract('#Лето, #лето! C# page#top &#39; #2021 #год_2021'),
+            ['лето', 'год_2021'],
+        )
+
+    def test_links_follow_post_text(self):
+        link: PostTag = PostTag.objects.get(post=self.post, tag__name='лето')
+        self.assertEqual(link.created, self.post.created)
+        self.assertEqual(self.tag('природа').post_count, 1)
+
+        self.post.text = 'Только #лето и #море'
+        self.post.save()
+        self.assertEqual(
+            set(self.post.tag_links.values_list('tag__name', flat=True)),
+            {'лето', 'море'},
+        )
+        self.assertEqual(self.tag('природа').post_count, 0)
+        self.assertEqual(self.tag('лето').post_count, 1)
+
+        self.post.delete()
+        self.assertEqual(self.tag('лето').post_count, 0)
+        self.assertEqual(reconcile()['Tag.post_count'], 0)
+
+    def test_top_tags(self):
+        Post.objects.create(text='#лето', author=self.author)
+        self.assertEqual(
+            [tag.name for tag in top_tags()], ['лето', 'природа']
+        )
+        self.assertEqual([tag.name for tag in top_tags(1)], ['лето'])
+
+    @override_settings(POSTS_PER_PAGE=2)
+    def test_tag_feed_is_paged(self):
+        start = timezone.now()
+        for number in range(3):
+            post = Post.objects.create(
+                text=f'Пост {number} #лето', author=self.author
+            )
+            Post.objects.filter(pk=post.pk).update(
+                created=start + timedelta(minutes=number)
+            )
+            PostTag.objects.filter(post=post).update(
+                created=start + timedelta(minutes=number)
+            )
+        url: str = reverse('posts:tag_posts', args=['Лето'])
+
+        response = self.client.get(url)
+        self.assertContains(response, 'Пост 2')
+        self.assertContains(response, 'Пост 1')
+        page = response.context['page_obj']
+        self.assertEqual(page.paginator.count, 4)
+
+        response = self.client.get(url, {'cursor': page.next_cursor})
+        texts = [post.text for post in response.context['page_obj']]
+        self.assertEqual(texts, ['Пост 0 #лето', self.post.text])
+
+        previous = response.context['page_obj'].previous_cursor
+        response = self.client.get(url, {'cursor': previous})
+        texts = [post.text for post in response.context['page_obj']]
+        self.assertEqual(texts, ['Пост 2 #лето', 'Пост 1 #лето'])
+
+    def test_tag_feed_is_refreshed(self):
+        url: str = reverse('posts:tag_posts', args=['лето'])
+        self.assertContains(self.client.get(url), 'Прогулка')
+        Post.objects.create(text='Новый пост #лето', author=self.author)
+        self.assertContains(self.client.get(url), 'Новый пост')
+        self.assertEqual(
+            self.client.get(
+                reverse('posts:tag_posts', args=['missing'])
+            ).status_code,
+            404,
+        )
@@ -0,0 +1,351 @@
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO, StringIO
+from typing import List
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from sorl.thumbnail import default, get_thumbnail
+
+from core.views import serve_media
+from posts import images, thumbnails, uploads
+from posts.feed_cache import render_cards
+from posts.models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x01\x00'
+    b'\x01\x00\x00\x00\x00\x21\xf9\x04'
+    b'\x01\x0a\x00\x01\x00\x2c\x00\x00'
+    b'\x00\x00\x01\x00\x01\x00\x00\x02'
+    b'\x02\x4c\x01\x00\x3b'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ThumbnailsTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        default.kvstore.lru.clear()
+        self.author: User = User.objects.create_user(username='post_author')
+        self.post: Post = Post.objects.create(
+            text='Пост с картинкой',
+            author=self.author,
+            image=SimpleUploadedFile(
+                name='small.gif', content=SMALL_GIF, content_type='image/gif'
+            ),
+        )
+        # the upload is normalized after commit, which tests never get to
+        uploads.process(self.post.pk, self.post.image.name)
+        self.post.refresh_from_db()
+        return super().setUp()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        return super().tearDownClass()
+
+    def picture(self):
+        return thumbnails.picture(
+            self.post.image.name,
+            'card',
+            (self.post.image_width, self.post.image_height),
+        )
+
+    def test_placeholder_is_shown_until_thumbnail_is_made(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, f'src="{self.post.image_preview}"')
+        self.assertContains(response, 'data-pending')
+
+        thumbnails.generate(self.post.image.name)
+        thumbnails.refresh_pages(self.post.pk)
+        response = self.client.get(reverse('posts:index'))
+        picture = self.picture()
+        self.assertContains(response, f'src="{picture.url}"')
+        self.assertContains(response, f'srcset="{picture.srcset}"')
+        self.assertContains(response, 'loading="lazy"')
+        self.assertNotContains(response, 'data-pending')
+
+    def test_thumbnail_is_made_once(self):
+        self.assertIsNone(self.picture())
+        thumbnails.schedule(self.post.image.name)
+        picture = self.picture()
+        self.assertEqual((picture.width, picture.height), (960, 339))
+        self.assertEqual(
+            [item.split()[1] for item in picture.srcset.split(', ')],
+            ['480w', '960w', '1440w'],
+        )
+
+    def test_picture_is_shown_when_all_variants_are_made(self):
+        shown: List[bool] = []
+        get_thumbnail = thumbnails.get_thumbnail
+
+        def make(*args, **kwargs):
+            shown.append(self.picture() is not None)
+            return get_thumbnail(*args, **kwargs)
+
+        with mock.patch('posts.thumbnails.get_thumbnail', side_effect=make):
+            thumbnails.generate(self.post.image.name)
+        self.assertNotIn(True, shown)
+        self.assertIsNotNone(self.picture())
+
+    @mock.patch('posts.signals.transaction.on_commit', lambda func: func())
+    def test_only_changed_image_is_scheduled(self):
+        with mock.patch('posts.thumbnails.schedule') as schedule:
+            self.post.text = 'Новый текст'
+            self.post.save()
+            schedule.assert_not_called()
+
+            Post.objects.filter(pk=self.post.pk).update(image='posts/a.gif')
+            self.post.save()
+            schedule.assert_called_once_with(
+                self.post.image.name, self.post.pk
+            )
+
+    def test_kept_upload_is_scheduled(self):
+        post: Post = Post.objects.create(
+            text='Пост с битой картинкой',
+            author=self.author,
+            image=SimpleUploadedFile(
+                name='broken.gif', content=b'GIF', content_type='image/gif'
+            ),
+        )
+        with mock.patch('posts.thumbnails.schedule') as schedule:
+            with self.assertLogs('posts.uploads', 'ERROR'):
+                uploads.process(post.pk, post.image.name)
+        schedule.assert_called_once_with(post.image.name, post.pk)
+
+    def test_variants_are_immutable(self):
+        thumbnails.generate(self.post.image.name)
+        path: str = self.picture().url[len(settings.MEDIA_URL):]
+        response = serve_media(
+            RequestFactory().get(path), path, document_root=TEMP_MEDIA_ROOT
+        )
+        self.assertEqual(
+            response['Cache-Control'], settings.THUMBNAIL_CACHE_CONTROL
+        )
+
+    def test_picture_sources(self):
+        variant = thumbnails.Variant
+        picture = thumbnails.Picture(
+            '/a.jpg',
+            (960, 339),
+            [
+                (variant(480, 'WEBP', '480x170', {}), '/a.jpg'),
+                (variant(960, 'WEBP', '960x339', {}), '/a.jpg'),
+                (variant(960, 'JPEG', '960x339', {}), '/a.jpg'),
+            ],
+        )
+        self.assertEqual((picture.width, picture.height), (960, 339))
+        self.assertEqual(
+            picture.sources, [('image/webp', '/a.jpg 480w, /a.jpg 960w')]
+        )
+        self.assertEqual(picture.srcset, '/a.jpg 960w')
+
+    def test_picture_looks_up_one_record(self):
+        thumbnails.generate(self.post.image.name)
+        with mock.patch.object(
+            default.kvstore, 'get', wraps=default.kvstore.get
+        ) as get:
+            picture = self.picture()
+        self.assertEqual(get.call_count, 1)
+        for url in picture.srcset.split(', '):
+            path: str = url.split()[0][len(settings.MEDIA_URL):]
+            self.assertTrue(default.storage.exists(path))
+
+    def test_size_is_computed_as_thumbnails_are_made(self):
+        buffer = BytesIO()
+        Image.new('RGB', (400, 300)).save(buffer, 'JPEG')
+        source = ContentFile(buffer.getvalue(), name='posts/size.jpg')
+        name: str = default.storage.save(source.name, source)
+        for geometry_string, options in [
+            ('100x100', {}),
+            ('100x100', {'crop': 'center'}),
+            ('800x100', {'crop': 'center'}),
+            ('800x900', {}),
+            ('800x900', {'upscale': True}),
+        ]:
+            with self.subTest(geometry=geometry_string, options=options):
+                made = get_thumbnail(name, geometry_string, **options)
+                self.assertEqual(
+                    thumbnails.thumbnail_size(
+                        geometry_string, options, (400, 300)
+                    ),
+                    (made.width, made.height),
+                )
+
+    def test_records_of_page_are_loaded_at_once(self):
+        for number in range(2):
+            Post.objects.create(
+                text=f'Пост {number}',
+                author=self.author,
+                image=SimpleUploadedFile(
+                    name='small.gif',
+                    content=SMALL_GIF,
+                    content_type='image/gif',
+                ),
+            )
+        posts = list(Post.objects.select_related('author', 'group'))
+        for post in posts:
+            thumbnails.generate(post.image.name)
+        cache.clear()
+        default.kvstore.lru.clear()
+
+        with self.assertNumQueries(1):
+            cards = render_cards(posts)
+        self.assertNotIn('data-pending', ''.join(cards))
+
+        cache.clear()
+        with self.assertNumQueries(0):
+            render_cards(posts)
+
+    def test_missing_records_are_cached_briefly(self):
+        geometry, options = settings.POST_THUMBNAILS['card']
+
+        def thumbnail():
+            return thumbnails.cached_thumbnail(
+                self.post.image.name, geometry, options
+            )
+
+        self.assertIsNone(self.picture())
+        self.assertIsNone(thumbnail())
+        # made by a worker of another process, with a cache of its own
+        with mock.patch.object(default.kvstore.cache, 'set'):
+            thumbnails.generate(self.post.image.name)
+        default.kvstore.lru.clear()
+        self.assertIsNone(thumbnail())
+        self.assertIsNone(self.picture())
+
+        later: float = time.time() + settings.THUMBNAIL_MISS_TIMEOUT + 1
+        with mock.patch('time.time', return_value=later):
+            self.assertIsNotNone(thumbnail())
+            self.assertEqual(len(self.picture().srcset.split(', ')), 3)
+
+    def test_command_makes_all_thumbnails(self):
+        out = StringIO()
+        call_command('generate_thumbnails', workers=1, force=True, stdout=out)
+        self.assertIn('Thumbnails of 1 images', out.getvalue())
+        self.assertIsNotNone(self.picture())
+
+    def test_command_drops_cached_pages(self):
+        self.client.get(reverse('posts:index'))
+        thumbnails.generate(self.post.image.name)
+        call_command('generate_thumbnails', workers=1, stdout=StringIO())
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'data-pending')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class UploadTests(TestCase):
+    def setUp(self) -> None:
+        self.author: User = User.objects.create_user(username='post_author')
+        return super().setUp()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        return super().tearDownClass()
+
+    def create_post(self, image: Image.Image) -> Post:
+        buffer = BytesIO()
+        image.save(buffer, 'JPEG', exif=image.getexif())
+        post: Post = Post.objects.create(
+            text='Пост',
+            author=self.author,
+            image=SimpleUploadedFile(
+                'photo.jpg', buffer.getvalue(), content_type='image/jpeg'
+            ),
+        )
+        self.assertIsNone(post.image_width)
+        uploads.process(post.pk, post.image.name)
+        post.refresh_from_db()
+        return post
+
+    @override_settings(UPLOAD_MAX_EDGE=100)
+    def test_upload_is_normalized(self):
+        photo = Image.new('RGB', (400, 300), (255, 0, 0))
+        photo.getexif()[images.ORIENTATION] = 6
+        post: Post = self.create_post(photo)
+
+        self.assertNotEqual(post.image.name, 'posts/photo.jpg')
+        self.assertFalse(post.image.storage.exists('posts/photo.jpg'))
+        with Image.open(post.image) as image:
+            self.assertEqual(image.size, (75, 100))
+            self.assertTrue(image.info.get('progressive'))
+            self.assertFalse(image.getexif())
+
+        self.assertEqual((post.image_width, post.image_height), (75, 100))
+        self.assertTrue(post.image_color.startswith('#f'))
+        self.assertTrue(post.image_preview.startswith('data:image/jpeg'))
+
+        post.image = None
+        post.save()
+        self.assertIsNone(post.image_width)
+        self.assertEqual(post.image_preview, '')
+
+    def test_transparency_is_kept(self):
+        buffer = BytesIO()
+        Image.new('RGBA', (200, 100)).save(buffer, 'PNG')
+        data, extension = uploads.normalize(buffer.getvalue(), 100, 85)
+        self.assertEqual(extension, 'png')
+        with Image.open(BytesIO(data)) as image:
+            self.assertEqual((image.mode, image.size), ('RGBA', (100, 50)))
+
+    def test_png_metadata_is_dropped(self):
+        transparent = Image.new('RGBA', (200, 100))
+        exif = transparent.getexif()
+        exif[images.ORIENTATION] = 1
+        exif[0x010E] = 'Описание'
+        buffer = BytesIO()
+        transparent.save(buffer, 'PNG', exif=exif)
+        data, extension = uploads.normalize(buffer.getvalue(), 100, 85)
+        self.assertEqual(extension, 'png')
+        with Image.open(BytesIO(data)) as image:
+            self.assertNotIn('exif', image.info)
+            self.assertFalse(image.getexif())
+
+    @override_settings(UPLOAD_WORKERS=1)
+    def test_upload_is_normalized_by_worker_process(self):
+        self.addCleanup(setattr, uploads, '_processes', None)
+        self.assertIsNone(uploads._processes)
+        post: Post = self.create_post(Image.new('RGB', (40, 30)))
+        pool = uploads._processes
+        self.addCleanup(pool.shutdown)
+        self.assertEqual(pool._mp_context.get_start_method(), 'forkserver')
+        self.assertTrue(post.image.name.endswith('.jpg'))
+        self.assertEqual((post.image_width, post.image_height), (40, 30))
+
+        # a worker dies: the image is kept, the next one gets a new pool
+        with self.assertRaises(BrokenProcessPool):
+            pool.submit(os._exit, 1).result()
+        with self.assertLogs('posts.uploads', 'ERROR'):
+            kept: Post = self.create_post(Image.new('RGB', (40, 30)))
+        self.assertTrue(kept.image.name.startswith('posts/photo'))
+        self.assertIsNone(uploads._processes)
+        post = self.create_post(Image.new('RGB', (40, 30)))
+        self.addCleanup(uploads._processes.shutdown)
+        self.assertIsNot(uploads._processes, pool)
+        self.assertEqual((post.image_width, post.image_height), (40, 30))
+
+    def test_backfill(self):
+        post: Post = self.create_post(Image.new('RGB', (40, 30)))
+        Post.objects.filter(pk=post.pk).update(image_width=None)
+        out = StringIO()
+        call_command('backfill_images', stdout=out)
+        self.assertIn('Images of 1 posts', out.getvalue())
+        post.refresh_from_db()
+        self.assertEqual((post.image_width, post.image_height), (40, 30))
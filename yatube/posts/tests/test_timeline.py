@@ -0,0 +1,155 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Follow, Post, Timeline
+from posts.timeline import (
+    MergedPaginator, TimelinePaginator, timeline_posts
+)
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    def setUp(self) -> None:
+        self.user: User = User.objects.create_user(username='test_user')
+        self.author: User = User.objects.create_user(username='post_author')
+        self.old_post: Post = Post.objects.create(
+            text='Пост до подписки', author=self.author
+        )
+        return super().setUp()
+
+    def test_follow_backfills_and_post_fans_out(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        new_post = Post.objects.create(text='Новый пост', author=self.author)
+
+        self.assertEqual(
+            set(self.user.timeline.values_list('post_id', flat=True)),
+            {self.old_post.pk, new_post.pk},
+        )
+        self.assertEqual(
+            list(timeline_posts(self.user)), [new_post, self.old_post]
+        )
+
+    def test_unfollow_prunes_timeline(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        Follow.objects.filter(user=self.user, author=self.author).delete()
+
+        self.assertFalse(self.user.timeline.exists())
+        self.assertFalse(timeline_posts(self.user).exists())
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_celebrity_posts_merged_at_read_time(self):
+        another: User = User.objects.create_user(username='another_user')
+        Follow.objects.create(user=self.user, author=self.author)
+        Follow.objects.create(user=another, author=self.author)
+        new_post = Post.objects.create(text='Новый пост', author=self.author)
+
+        self.assertFalse(Timeline.objects.filter(post=new_post).exists())
+        self.assertIn(new_post, timeline_posts(self.user))
+        self.assertIn(new_post, timeline_posts(another))
+
+        with mock.patch(
+            'posts.timeline.transaction.on_commit', lambda func: func()
+        ):
+            Follow.objects.filter(user=another).delete()
+        self.assertTrue(
+            self.user.timeline.filter(post=new_post).exists(),
+            'Timeline should be filled when author is not celebrity anymore',
+        )
+
+    def test_rebuild_command(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        Timeline.objects.all().delete()
+
+        call_command(
+            'rebuild_timelines', user=['test_user'], stdout=StringIO()
+        )
+        self.assertEqual(list(timeline_posts(self.user)), [self.old_post])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_timeline_paginator_mixes_celebrity_posts(self):
+        celebrity: User = User.objects.create_user(username='celebrity')
+        another: User = User.objects.create_user(username='another_user')
+        for user in (self.user, another):
+            Follow.objects.create(user=user, author=celebrity)
+        Follow.objects.create(user=self.user, author=self.author)
+        for i in range(12):
+            Post.objects.create(
+                text=f'Пост {i}', author=(celebrity, self.author)[i % 2]
+            )
+        expected = list(
+            timeline_posts(self.user).order_by('-created', '-pk')
+        )
+        self.assertEqual(len(expected), 13)
+
+        paginator = TimelinePaginator(Post.objects.all(), 5, user=self.user)
+        pages = [paginator.get_cursor_page(None)]
+        while pages[-1].next_cursor:
+            cursor = pages[-1].next_cursor
+            pages.append(paginator.get_cursor_page(cursor))
+        self.assertEqual([p for page in pages for p in page], expected)
+
+        back = paginator.get_cursor_page(pages[-1].previous_cursor)
+        self.assertEqual(list(back), list(pages[-2]))
+
+
+class MergedPaginatorTests(TestCase):
+    def setUp(self) -> None:
+        self.user: User = User.objects.create_user(username='test_user')
+        self.authors = [
+            User.objects.create_user(username=f'author_{i}') for i in range(4)
+        ]
+        for author in self.authors:
+            Follow.objects.create(user=self.user, author=author)
+        not_followed = User.objects.create_user(username='not_followed')
+        Post.objects.bulk_create(
+            [
+                Post(text=f'Пост {i}', author=self.authors[i % 3])
+                for i in range(25)
+            ]
+            + [Post(text='Чужой пост', author=not_followed)]
+        )
+        self.expected = list(
+            Post.objects.filter(author__following__user=self.user).order_by(
+                '-created', '-pk'
+            )
+        )
+        self.paginator = MergedPaginator(
+            Post.objects.all(),
+            10,
+            authors=Follow.objects.filter(user=self.user).values('author_id'),
+        )
+        return super().setUp()
+
+    def test_cursor_pages(self):
+        pages = [self.paginator.get_cursor_page(None)]
+        while pages[-1].next_cursor:
+            cursor = pages[-1].next_cursor
+            pages.append(self.paginator.get_cursor_page(cursor))
+        self.assertEqual([p for page in pages for p in page], self.expected)
+
+        back = self.paginator.get_cursor_page(pages[-1].previous_cursor)
+        self.assertEqual(list(back), list(pages[-2]))
+
+    def test_number_pages(self):
+        self.assertEqual(self.paginator.count, 25)
+        self.assertEqual(list(self.paginator.page(3)), self.expected[20:])
+
+    def test_only_needed_streams_are_pulled(self):
+        # heads query plus one query per contributing author
+        with self.assertNumQueries(1 + 3):
+            self.paginator.fetch(None, False, 11)
+
+    @override_settings(FOLLOW_FEED_ENGINE='merge')
+    def test_follow_index_engine_setting(self):
+        client = Client()
+        client.force_login(self.user)
+        response = client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            list(response.context['page_obj']), self.expected[:10]
+        )
@@ -1,5 +1,6 @@
 import shutil
 import tempfile
+from typing import List
 
 
 from http import HTTPStatus
@@ -13,10 +14,14 @@ from django.urls import reverse
 from django.test.utils import ContextList
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.cache import cache
+from django.db import connection
 from django.db.models import QuerySet
+from django.test.utils import CaptureQueriesContext
 
 
-from posts.models import Group, Post, Follow
+from posts.excerpts import backfill
+from posts.models import Comment, Group, Post, Follow
+from posts.tests.utils import QueryCountMixin
 from posts.urls import app_name
 from core.functools.utils import lastloop
 from core.functools.utils import reverse_next
@@ -117,6 +122,8 @@ class ViewTests(TestCase):
             ]
         )
 
+        backfill(Post.objects.all())
+
         test_post: Post = (
             Post.objects.select_related('author', 'group')
             .filter(author=self.user_author, group=self.group)
@@ -343,25 +350,46 @@ class ViewTests(TestCase):
     def test_cache_applyes(self):
         """Test is requesting url for making a cache and expecting:
 
-        `1` - post is steal appear at the page even after deleting it.\n
-        `2` - post disappears from page after clearing a cache.
+        `1` - post text changed without signals (by queryset update) is steal
+        old at the page, because page is taken from cache.\n
+        `2` - post disappears from page right after deleting it, because
+        deletion drops cached pages of the feed.
         """
-        urls = ('index',)
+        urls = ('index', 'profile', 'group_list')
         for url in urls:
             url = self.url_reverse[url]
             with self.subTest(url=url):
+                cache.clear()
                 self.user_client.get(url)
-                deleted: Post = Post.objects.first()
-                Post.delete(deleted)
+                changed: Post = Post.objects.filter(
+                    author=self.user_author, group=self.group
+                ).first()
+                Post.objects.filter(pk=changed.pk).update(
+                    text='Новый текст', excerpt='Новый текст'
+                )
 
                 response: HttpResponse = self.user_client.get(url)
                 http_content: str = response.content.decode("utf-8")
-                self.assertIn(deleted.text, http_content)
+                self.assertIn(changed.text, http_content)
 
-                cache.clear()
+                Post.delete(changed)
                 response = self.user_client.get(url)
                 http_content = response.content.decode("utf-8")
-                self.assertNotIn(deleted.text, http_content)
+                self.assertNotIn(changed.text, http_content)
+
+    @override_settings(FEED_CACHE_WRITE_THROUGH=True)
+    def test_cache_write_through(self):
+        """New post is rendered into feeds cache right after its creation, so
+        the first anonymous reader gets the page without database queries.
+        """
+        form_data = {'text': 'Свежий пост', 'group': self.group.pk}
+        self.user_author_client.post(
+            self.url_reverse['post_create'], data=form_data
+        )
+        for url in ('index', 'profile', 'group_list'):
+            with self.subTest(url=url), self.assertNumQueries(0):
+                response = self.guest_client.get(self.url_reverse[url])
+                self.assertIn('Свежий пост', response.content.decode('utf-8'))
 
     def test_follow_and_unfollow_other_authors_by_user_client(self):
         """Test is trying follow/unfollow other authors by user client and
@@ -431,3 +459,91 @@ class ViewTests(TestCase):
             self.url_reverse['follow_index']
         ).context
         self.assertEqual(len(context['page_obj']), 0)
+
+
+@override_settings(COMMENTS_PER_PAGE=5)
+class PostDetailTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.user: User = User.objects.create_user(username='test_user')
+        self.group: Group = Group.objects.create(title='Группа', slug='group')
+        self.post: Post = Post.objects.create(
+            text='Тестовый пост', author=self.user, group=self.group
+        )
+        self.url = reverse('posts:post_detail', args=[self.post.pk])
+        return super().setUp()
+
+    def add_comments(self, amount: int) -> None:
+        start: int = Comment.objects.count()
+        for i in range(start, start + amount):
+            author = User.objects.create_user(username=f'commenter_{i}')
+            Comment.objects.create(
+                post=self.post, author=author, text=f'Комментарий {i}'
+            )
+
+    def count_queries(self) -> int:
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        return len(queries)
+
+    def test_query_count_does_not_depend_on_comments(self):
+        self.add_comments(2)
+        few: int = self.count_queries()
+        self.add_comments(30)
+        self.assertEqual(self.count_queries(), few)
+
+    def test_load_more_comments(self):
+        self.add_comments(12)
+        expected = list(
+            Comment.objects.filter(post=self.post).order_by('-created', '-pk')
+        )
+        response = self.client.get(self.url)
+        page: Page = response.context['comments']
+        self.assertContains(response, page.next_cursor)
+
+        shown: List[Comment] = list(page)
+        while page.next_cursor:
+            page = self.client.get(
+                reverse('posts:post_comments', args=[self.post.pk]),
+                {'cursor': page.next_cursor},
+            ).context['comments']
+            shown += page
+        self.assertEqual(shown, expected)
+
+
+class FeedQueriesTests(QueryCountMixin, TestCase):
+    def setUp(self) -> None:
+        self.user: User = User.objects.create_user(username='test_user')
+        self.author: User = User.objects.create_user(
+            username='post_author', first_name='Лев', last_name='Толстой'
+        )
+        self.group: Group = Group.objects.create(title='Группа', slug='group')
+        Follow.objects.create(user=self.user, author=self.author)
+        self.user_client = Client()
+        self.user_client.force_login(self.user)
+        self.add_posts(2)
+        return super().setUp()
+
+    def add_posts(self, amount: int) -> None:
+        for i in range(amount):
+            author = User.objects.create_user(username=f'author_{i}_{amount}')
+            group = Group.objects.create(title='', slug=f'group_{i}_{amount}')
+            Post.objects.create(text='Пост', author=author, group=group)
+            Post.objects.create(text='Пост', author=self.author, group=group)
+            Post.objects.create(text='Пост', author=author, group=self.group)
+
+    def test_feed_queries(self):
+        pages = {
+            reverse('posts:index'): (None, 1),
+            reverse('posts:group_list', args=['group']): (None, 2),
+            reverse('posts:profile', args=['post_author']): (None, 2),
+            reverse('posts:follow_index'): (self.user_client, 4),
+        }
+        for url, (client, num) in pages.items():
+            with self.subTest(url=url):
+                self.assertViewQueries(num, url, client)
+        self.add_posts(POSTS_PER_PAGE)
+        for url, (client, num) in pages.items():
+            with self.subTest(url=url, more_posts=True):
+                self.assertViewQueries(num, url, client)
@@ -0,0 +1,21 @@
+from typing import Optional
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import Client
+
+
+class QueryCountMixin:
+    """TestCase mixin which checks amount of database queries of a view.
+    Caches are cleared first, so the page is really rendered.
+    """
+
+    def assertViewQueries(
+        self, num: int, url: str, client: Optional[Client] = None, **params
+    ) -> HttpResponse:
+        cache.clear()
+        client = client or self.client
+        with self.assertNumQueries(num):
+            response: HttpResponse = client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response
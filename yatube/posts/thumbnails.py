@@ -0,0 +1,354 @@
+"""Thumbnails of post images made off the request path.
+
+Every thumbnail of `POST_THUMBNAILS` setting is made in variants: several
+widths (`POST_IMAGE_WIDTHS`, the ratio is kept) in every format of
+`POST_IMAGE_FORMATS` Pillow can write and in JPEG. Pages show them as
+`<picture>` with a source per format and `srcset` of widths, so a browser
+takes the best format it accepts and the width it needs. Names of variant
+files are made of source name and options, so their URLs never change and
+they are served as immutable (see `core.views.serve_media`).
+
+Pages never make thumbnails: `post_picture` tag (see
+`posts.templatetags.post_thumbnails`) only looks up the JPEG variant of the
+thumbnail's own geometry, which is made last, at sorl-thumbnail key value
+store (records of a whole feed page are loaded at once, see `prefetch`) and
+shows a placeholder while it is missing. URLs of the other variants are
+made of their names and sizes are computed from the size of the source
+image stored on the post, so the store is not asked for them. The
+variants are made by a background worker as soon as a post with an image
+is saved or imported, after that pages of the post are refreshed.
+Thumbnails of images saved before are made by `generate_thumbnails`
+command.
+"""
+import logging
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import lru_cache
+from typing import (
+    Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set,
+    Tuple
+)
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.templatetags.static import static
+from PIL import Image
+from sorl.thumbnail import default, delete, get_thumbnail
+from sorl.thumbnail.base import EXTENSIONS
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+
+from .feed_cache import invalidate_feeds
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+Geometry = Tuple[str, Dict[str, Any]]
+Size = Tuple[int, int]
+
+MIME_TYPES = {'AVIF': 'image/avif', 'WEBP': 'image/webp', 'JPEG': 'image/jpeg'}
+
+# sorl-thumbnail names files by extension of format, it does not know AVIF
+EXTENSIONS.setdefault('AVIF', 'avif')
+
+_executor: Optional[Executor] = None
+_pending: Set[str] = set()
+_lock = threading.Lock()
+
+
+class Placeholder:
+    """Stands for a thumbnail which is not made yet (`url`, `width` and
+    `height` as `Picture` has).
+    """
+
+    pending = True
+
+    def __init__(self, size: Size) -> None:
+        self.width, self.height = size
+        self.url = static(settings.THUMBNAIL_PLACEHOLDER)
+
+
+class Variant(NamedTuple):
+    width: int
+    format: str
+    geometry: str
+    options: Dict[str, Any]
+
+
+class Picture:
+    """
+    Made variants of a thumbnail for `<picture>` element.
+
+    Parameters
+    ----------
+    url: `str`
+        URL of JPEG thumbnail of `POST_THUMBNAILS` geometry (`src` of
+        `<img>`).
+    size: (`int`, `int`)
+        Width and height of that thumbnail.
+    urls: list of (`Variant`, `str`)
+        Variants of the thumbnail and their URLs.
+    """
+
+    pending = False
+
+    def __init__(
+        self, url: str, size: Size, urls: List[Tuple[Variant, str]]
+    ) -> None:
+        self.url = url
+        self.width, self.height = size
+        self.sizes = f'(max-width: {self.width}px) 100vw, {self.width}px'
+        srcsets: Dict[str, List[str]] = {}
+        for variant, variant_url in urls:
+            srcsets.setdefault(variant.format, []).append(
+                f'{variant_url} {variant.width}w'
+            )
+        self.srcset = ', '.join(srcsets.pop('JPEG', []))
+        self.sources: List[Tuple[str, str]] = [
+            (MIME_TYPES[image_format], ', '.join(srcset))
+            for image_format, srcset in srcsets.items()
+        ]
+
+
+def geometry(name: str) -> Geometry:
+    """Geometry string and options of `POST_THUMBNAILS` entry."""
+    geometry_string, options = settings.POST_THUMBNAILS[name]
+    return geometry_string, dict(options)
+
+
+def thumbnail_size(
+    geometry_string: str, options: Dict[str, Any], source: Optional[Size]
+) -> Size:
+    """Size of thumbnail of `WxH` geometry as sorl-thumbnail makes it of
+    the source image of given size (the geometry itself if it is unknown).
+    """
+    width, height = map(int, geometry_string.split('x'))
+    if not source or not all(source):
+        return width, height
+    source_width, source_height = source
+    crop: bool = bool(options.get('crop'))
+    factor: float = (max if crop else min)(
+        width / source_width, height / source_height
+    )
+    if not options.get('upscale', sorl_settings.THUMBNAIL_UPSCALE):
+        factor = min(factor, 1)
+    scaled: Size = (
+        max(round(source_width * factor), 1),
+        max(round(source_height * factor), 1),
+    )
+    if crop:
+        return min(scaled[0], width), min(scaled[1], height)
+    return scaled
+
+
+@lru_cache(maxsize=None)
+def image_formats() -> Tuple[str, ...]:
+    """Formats of `POST_IMAGE_FORMATS` which Pillow can write, and JPEG."""
+    Image.init()
+    formats = [f for f in settings.POST_IMAGE_FORMATS if f in Image.SAVE]
+    return (*formats, 'JPEG')
+
+
+def variants(name: str) -> List[Variant]:
+    """Variants of `POST_THUMBNAILS` entry by formats and widths."""
+    geometry_string, options = geometry(name)
+    width, height = map(int, geometry_string.split('x'))
+    widths: List[int] = sorted({*settings.POST_IMAGE_WIDTHS, width})
+    return [
+        Variant(
+            size,
+            image_format,
+            f'{size}x{round(size * height / width)}',
+            {**options, 'format': image_format},
+        )
+        for image_format in image_formats()
+        for size in widths
+    ]
+
+
+def thumbnail_name(source: ImageFile, geometry_string: str, **options) -> str:
+    """Name of thumbnail file as `ThumbnailBackend.get_thumbnail` makes
+    it (the same defaults are applied to options).
+    """
+    backend = default.backend
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    return backend._get_thumbnail_filename(source, geometry_string, options)
+
+
+def image_name(post) -> str:
+    """Name of post image (`PostCard` has it instead of a field file)."""
+    return getattr(post.image, 'name', post.image)
+
+
+def thumbnail_file(
+    image: str, geometry_string: str, options: Dict[str, Any]
+) -> ImageFile:
+    return ImageFile(
+        thumbnail_name(ImageFile(image), geometry_string, **options),
+        default.storage,
+    )
+
+
+def cached_thumbnail(
+    image: str, geometry_string: str, options: Dict[str, Any]
+) -> Optional[ImageFile]:
+    """Thumbnail from key value store, None if it is not made yet."""
+    return default.kvstore.get(
+        thumbnail_file(image, geometry_string, options)
+    )
+
+
+def prefetch(images: Iterable[str]) -> None:
+    """Load key value store records of thumbnails of the images at once
+    (if the store can do it, see `posts.kvstore`), so they are not looked
+    up one by one while a page is rendered.
+    """
+    load: Optional[Callable] = getattr(default.kvstore, 'prefetch', None)
+    if load is None:
+        return
+    load(
+        thumbnail_file(image, *geometry(name))
+        for image in images
+        for name in settings.POST_THUMBNAILS
+    )
+
+
+def picture(
+    image: str, name: str, source: Optional[Size] = None
+) -> Optional[Picture]:
+    """Variants of `POST_THUMBNAILS` entry of the image of `source` size,
+    None if they are not made yet. Only the JPEG one of the entry's own
+    geometry is looked up: it is made after all the others.
+    """
+    geometry_string, options = geometry(name)
+    fallback: Optional[ImageFile] = cached_thumbnail(
+        image, geometry_string, options
+    )
+    if fallback is None:
+        return None
+    return Picture(
+        fallback.url,
+        thumbnail_size(geometry_string, options, source),
+        [
+            (
+                variant,
+                thumbnail_file(image, variant.geometry, variant.options).url,
+            )
+            for variant in variants(name)
+        ],
+    )
+
+
+def generate(image: str) -> None:
+    """Make every variant of every thumbnail of `POST_THUMBNAILS`.
+
+    The JPEG one of its own geometry is made last: `picture` is shown as
+    soon as it is found, and a page cached before the other variants are
+    made would lack them.
+    """
+    for name in settings.POST_THUMBNAILS:
+        geometry_string, options = geometry(name)
+        for variant in variants(name):
+            if (variant.format, variant.geometry) != ('JPEG', geometry_string):
+                get_thumbnail(image, variant.geometry, **variant.options)
+        get_thumbnail(image, geometry_string, **options)
+
+
+def executor() -> Optional[Executor]:
+    global _executor
+    with _lock:
+        if _executor is None and settings.THUMBNAIL_WORKERS:
+            _executor = ThreadPoolExecutor(
+                settings.THUMBNAIL_WORKERS, thread_name_prefix='thumbnails'
+            )
+        return _executor
+
+
+def job(image: str) -> None:
+    try:
+        generate(image)
+    except Exception:
+        logger.exception('Thumbnails of %s are not made', image)
+    finally:
+        with _lock:
+            _pending.discard(image)
+
+
+def background_job(image: str, post_id: Optional[int]) -> None:
+    try:
+        job(image)
+        if post_id is not None:
+            refresh_pages(post_id)
+    finally:
+        close_old_connections()
+
+
+def schedule(image: str, post_id: Optional[int] = None) -> None:
+    """Make thumbnails of image at background, pages of the post are
+    refreshed after that. When `THUMBNAIL_WORKERS` is 0 they are made at
+    once. An image is queued only once at a time.
+    """
+    with _lock:
+        if image in _pending:
+            return
+        _pending.add(image)
+    pool: Optional[Executor] = executor()
+    if pool is None:
+        job(image)
+    else:
+        pool.submit(background_job, image, post_id)
+
+
+def refresh_pages(post_id: int) -> None:
+    """Drop cached pages which show placeholders instead of thumbnails."""
+    # signals import this module to schedule thumbnails
+    from .signals import invalidate_all_post_feeds
+
+    post: Optional[Post] = (
+        Post.objects.select_related('author').filter(pk=post_id).first()
+    )
+    if post is not None:
+        invalidate_all_post_feeds(post)
+
+
+def regenerate(workers: int, force: bool = False) -> Iterator[str]:
+    """Make thumbnails of all post images by a pool of `workers` threads
+    (in this one if `workers` is 1), yields names of done images. Old
+    thumbnails are deleted when `force`. Cached pages are dropped at the
+    end, they may show placeholders or thumbnails which are gone.
+    """
+    images: List[str] = list(
+        Post.objects.exclude(image='')
+        .order_by('image')
+        .values_list('image', flat=True)
+        .distinct()
+    )
+
+    def make(image: str) -> str:
+        if force:
+            delete(image, delete_file=False)
+        generate(image)
+        return image
+
+    def make_in_thread(image: str) -> str:
+        try:
+            return make(image)
+        finally:
+            close_old_connections()
+
+    try:
+        if workers <= 1:
+            yield from map(make, images)
+            return
+        with ThreadPoolExecutor(workers) as pool:
+            yield from pool.map(make_in_thread, images)
+    finally:
+        invalidate_feeds('all')
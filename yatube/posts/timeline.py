@@ -0,0 +1,308 @@
+"""Follow feed engines.
+
+Fan-out-on-write: every new post is copied into `Timeline` of each follower
+of its author. Authors with more than `TIMELINE_FANOUT_LIMIT` followers are
+not fanned out: their posts are merged into the feed at read time instead.
+`TimelinePaginator` reads a page of both in index order.
+
+Pull-model: `MergedPaginator` merges per-author post streams on the fly, so
+nothing is stored and only the rows needed for the page are loaded.
+"""
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+from datetime import datetime
+from itertools import islice
+from typing import Generator, Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.paginator import Page
+from django.db import close_old_connections, transaction
+from django.db.models import OuterRef, Q, QuerySet, Subquery
+from django.utils.functional import cached_property
+
+from core.functools.utils import kmerge
+from .models import Follow, Post, Timeline, UserCounters
+from .paginator import (
+    Position, YatubePaginator, keyset_filter, keyset_queryset, keyset_slice
+)
+
+User = get_user_model()
+
+_executor: Optional[Executor] = None
+_lock = threading.Lock()
+
+
+def followers(author_id: int) -> QuerySet:
+    return Follow.objects.filter(author_id=author_id).values_list(
+        'user_id', flat=True
+    )
+
+
+def followers_count(author_id: int) -> int:
+    """Amount of author followers kept by `posts.counters`."""
+    count: Optional[int] = (
+        UserCounters.objects.filter(user_id=author_id)
+        .values_list('followers', flat=True)
+        .first()
+    )
+    return count or 0
+
+
+def is_fanout_author(author_id: int) -> bool:
+    return followers_count(author_id) <= settings.TIMELINE_FANOUT_LIMIT
+
+
+def celebrity_ids(user: User) -> QuerySet:
+    """Authors followed by `user` who are too popular for fan-out."""
+    return Follow.objects.filter(
+        user=user,
+        author__counters__followers__gt=settings.TIMELINE_FANOUT_LIMIT,
+    ).values('author_id')
+
+
+def write(
+    user_ids: Iterable[int], posts: Iterable[Tuple[int, datetime]]
+) -> None:
+    """Put posts (primary key and creation time) into timelines."""
+    entries: List[Timeline] = [
+        Timeline(user_id=user_id, post_id=post_id, created=created)
+        for user_id in user_ids
+        for post_id, created in posts
+    ]
+    Timeline.objects.bulk_create(
+        entries,
+        batch_size=settings.TIMELINE_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def fan_out(post: Post) -> None:
+    """Put new post into timelines of all author followers."""
+    if is_fanout_author(post.author_id):
+        write(followers(post.author_id), [(post.pk, post.created)])
+
+
+def backfill(follow: Follow) -> None:
+    """Put all author posts into timeline of the new follower."""
+    if is_fanout_author(follow.author_id):
+        posts = Post.objects.filter(author_id=follow.author_id)
+        write([follow.user_id], posts.values_list('pk', 'created'))
+
+
+def executor() -> Optional[Executor]:
+    global _executor
+    with _lock:
+        if _executor is None and settings.TIMELINE_WORKERS:
+            _executor = ThreadPoolExecutor(
+                settings.TIMELINE_WORKERS, thread_name_prefix='timelines'
+            )
+        return _executor
+
+
+def refill(author_id: int) -> None:
+    """Fill timelines of all author followers with posts which were not
+    fanned out, and refresh their follow feeds.
+    """
+    # signals import this module to keep timelines
+    from .signals import invalidate_follow_feeds
+
+    for follow in Follow.objects.filter(author_id=author_id):
+        backfill(follow)
+    invalidate_follow_feeds(author_id)
+
+
+def background_refill(author_id: int) -> None:
+    try:
+        refill(author_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_refill(author_id: int) -> None:
+    """Refill timelines at background, at once when `TIMELINE_WORKERS`
+    is 0.
+    """
+    pool: Optional[Executor] = executor()
+    if pool is None:
+        refill(author_id)
+    else:
+        pool.submit(background_refill, author_id)
+
+
+def prune(follow: Follow) -> None:
+    """Remove author posts from timeline of the former follower. If author
+    is not a celebrity any more, timelines of the rest followers are filled
+    with posts which were not fanned out after the transaction is committed.
+    """
+    Timeline.objects.filter(
+        user_id=follow.user_id, post__author_id=follow.author_id
+    ).delete()
+    if followers_count(follow.author_id) == settings.TIMELINE_FANOUT_LIMIT:
+        author_id: int = follow.author_id
+        transaction.on_commit(lambda: schedule_refill(author_id))
+
+
+def timeline_filter(user: User) -> Q:
+    """Posts for `user`'s follow page: materialized ones and posts of
+    celebrities merged at read time.
+    """
+    return Q(
+        pk__in=Timeline.objects.filter(user=user).values('post_id')
+    ) | Q(author_id__in=celebrity_ids(user))
+
+
+def timeline_posts(user: User) -> QuerySet:
+    return Post.objects.filter(timeline_filter(user))
+
+
+def rebuild(users: QuerySet) -> int:
+    """Make timelines from scratch. Return amount of processed follows."""
+    Timeline.objects.filter(user__in=users).delete()
+    amount = 0
+    for follow in Follow.objects.filter(user__in=users):
+        backfill(follow)
+        amount += 1
+    return amount
+
+
+class MergedPaginator(YatubePaginator):
+    """
+    Follow feed paginator which k-way merges post streams of every followed
+    author (each one is an `(author, -created)` index scan) instead of
+    sorting union of them by database.
+
+    Parameters
+    ----------
+    authors: `QuerySet`
+        Primary keys of followed authors (`values('author_id')`).
+    """
+
+    def __init__(self, object_list: QuerySet, *args, authors, **kwargs):
+        super().__init__(
+            object_list.filter(author_id__in=authors), *args, **kwargs
+        )
+        self.posts: QuerySet = object_list.order_by(*self.ordering)
+        self.authors = authors
+
+    def stream(
+        self, author_id: int, position: Optional[Position], reverse: bool
+    ) -> Generator[Post, None, None]:
+        """Author posts next to `position`, loaded by chunks on demand."""
+        posts: QuerySet = self.posts.filter(author_id=author_id)
+        while True:
+            chunk = keyset_slice(posts, position, reverse, self.per_page + 1)
+            yield from chunk
+            if len(chunk) <= self.per_page:
+                return
+            position = (chunk[-1].created, chunk[-1].pk)
+
+    def heads(self, position: Optional[Position], reverse: bool) -> QuerySet:
+        """The newest (or the oldest for reverse) post time of every author
+        after `position` (None if there are no posts). It tells where the
+        author stream starts. Every head is a one row seek by
+        `post_author_created_idx`, not an aggregate over author posts.
+        """
+        posts: QuerySet = keyset_queryset(
+            Post.objects.filter(author_id=OuterRef('pk')).order_by(
+                *self.ordering
+            ),
+            position,
+            reverse,
+            1,
+        )
+        return (
+            User.objects.filter(pk__in=self.authors)
+            .order_by()
+            .annotate(head=Subquery(posts.values('created')))
+            .values('pk', 'head')
+        )
+
+    def merged(
+        self, position: Optional[Position] = None, reverse: bool = False
+    ) -> Iterator[Post]:
+        heads: QuerySet = self.heads(position, reverse)
+        # `pk` edge keeps heads before posts of the same time
+        edge = float('-inf') if reverse else float('inf')
+        return kmerge(
+            (
+                (
+                    (head['head'], edge),
+                    self.stream(head['pk'], position, reverse),
+                )
+                for head in heads
+                if head['head'] is not None
+            ),
+            key=lambda post: (post.created, post.pk),
+            reverse=not reverse,
+        )
+
+    def fetch(
+        self, position: Optional[Position], reverse: bool, limit: int
+    ) -> List[Post]:
+        return list(islice(self.merged(position, reverse), limit))
+
+    def page(self, number: int) -> Page:
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        object_list = list(
+            islice(self.merged(), bottom, bottom + self.per_page)
+        )
+        page: Page = self._get_page(object_list, number, self)
+        page.page_window = self.get_page_window(number)
+        return page
+
+
+class TimelinePaginator(YatubePaginator):
+    """
+    Follow feed paginator of the `timeline` engine. A page is found by
+    keyset slices read in index order: `Timeline` rows of the user by
+    `timeline_feed_idx` and posts of every followed celebrity by
+    `post_author_created_idx`. Posts are loaded by primary keys of the
+    slices in the same query, so only a few pages of rows are sorted.
+
+    Parameters
+    ----------
+    user: `User`
+        Owner of the feed.
+    """
+
+    def __init__(self, object_list: QuerySet, *args, user: User, **kwargs):
+        super().__init__(
+            object_list.filter(timeline_filter(user)), *args, **kwargs
+        )
+        self.posts: QuerySet = object_list.order_by(*self.ordering)
+        self.entries: QuerySet = Timeline.objects.filter(user=user).order_by(
+            '-created', '-post_id'
+        )
+        self.user = user
+
+    @cached_property
+    def celebrities(self) -> List[int]:
+        return list(
+            celebrity_ids(self.user).values_list('author_id', flat=True)
+        )
+
+    def fetch_queryset(
+        self, position: Optional[Position], reverse: bool, limit: int
+    ) -> QuerySet:
+        entries: QuerySet = self.entries
+        posts: QuerySet = self.posts
+        if position:
+            entries = entries.filter(
+                keyset_filter(position, reverse, 'post_id')
+            )
+        if reverse:
+            entries = entries.order_by('created', 'post_id')
+            posts = posts.order_by('created', 'pk')
+        found: Q = Q(pk__in=entries.values('post_id')[:limit])
+        for author_id in self.celebrities:
+            author_posts: QuerySet = Post.objects.filter(
+                author_id=author_id
+            ).order_by(*self.ordering)
+            found |= Q(
+                pk__in=keyset_queryset(
+                    author_posts, position, reverse, limit
+                ).values('pk')
+            )
+        return posts.filter(found)[:limit]
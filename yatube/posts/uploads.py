@@ -0,0 +1,157 @@
+"""Normalization of uploaded post images.
+
+A request only stores an uploaded image as it is. After the post is
+committed the image is re-encoded by a process of a pool (decoding of big
+photos is bound by CPU, so threads would wait for each other, see
+`posts.imaging`): EXIF orientation is applied, the longest edge is cut
+down to `UPLOAD_MAX_EDGE`, metadata is dropped and the image is saved as
+progressive JPEG (or PNG if it has transparency). Then the post is pointed
+at the new file, which makes `posts.signals` describe it and make its
+thumbnails, and the raw upload is deleted. Animated images are kept as
+they are.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import (
+    Executor, ProcessPoolExecutor, ThreadPoolExecutor
+)
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections
+
+from . import images, thumbnails
+from .imaging import normalize
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+UPDATE_FIELDS = ('image', *images.FIELDS, 'edited')
+"""Fields saved when the image is normalized, signals do the rest."""
+
+_processes: Optional[Executor] = None
+_threads: Optional[Executor] = None
+_lock = threading.Lock()
+
+
+def process_pool() -> Optional[Executor]:
+    """Processes normalizing images. They are started by a fork server,
+    a fork of this process would inherit its threads, locks and database
+    connections.
+    """
+    global _processes
+    with _lock:
+        if _processes is None and settings.UPLOAD_WORKERS:
+            _processes = ProcessPoolExecutor(
+                settings.UPLOAD_WORKERS,
+                mp_context=multiprocessing.get_context('forkserver'),
+            )
+        return _processes
+
+
+def drop_process_pool(pool: Executor) -> None:
+    """Forget the pool which is broken (a worker died), the next image
+    starts a new one.
+    """
+    global _processes
+    with _lock:
+        if _processes is pool:
+            _processes = None
+    pool.shutdown(wait=False)
+
+
+def thread_pool() -> Optional[Executor]:
+    """Threads waiting for the processes, they save results to storage
+    and database.
+    """
+    global _threads
+    with _lock:
+        if _threads is None and settings.UPLOAD_WORKERS:
+            _threads = ThreadPoolExecutor(
+                settings.UPLOAD_WORKERS, thread_name_prefix='uploads'
+            )
+        return _threads
+
+
+def uploaded_post(post_id: int, name: str) -> Optional[Post]:
+    """The post if its image was not changed since it was uploaded."""
+    post: Optional[Post] = Post.objects.filter(pk=post_id).first()
+    if post is None or post.image.name != name:
+        return None
+    return post
+
+
+def replace(post_id: int, name: str, content: bytes, extension: str) -> None:
+    """Point the post at the normalized image, delete the file which is not
+    used any more.
+    """
+    storage = Post.image.field.storage
+    stem: str = os.path.splitext(name)[0]
+    new_name: str = storage.save(f'{stem}.{extension}', ContentFile(content))
+    post: Optional[Post] = uploaded_post(post_id, name)
+    if post is None:
+        storage.delete(new_name)
+        return
+    post.image = new_name
+    post.save(update_fields=UPDATE_FIELDS)
+    storage.delete(name)
+
+
+def keep(post_id: int, name: str) -> None:
+    """Show the image as it was uploaded. Its name is not changed, so the
+    thumbnails are scheduled here rather than by `posts.signals`.
+    """
+    post: Optional[Post] = uploaded_post(post_id, name)
+    if post is not None:
+        post.save(update_fields=UPDATE_FIELDS)
+        thumbnails.schedule(name, post_id)
+
+
+def process(post_id: int, name: str) -> None:
+    """Normalize the uploaded image of the post. If it fails the image is
+    kept as it is.
+    """
+    pool: Optional[Executor] = None
+    try:
+        with Post.image.field.storage.open(name) as file:
+            data: bytes = file.read()
+        args = (data, settings.UPLOAD_MAX_EDGE, settings.UPLOAD_QUALITY)
+        pool = process_pool()
+        result: Optional[Tuple[bytes, str]] = (
+            pool.submit(normalize, *args).result()
+            if pool is not None
+            else normalize(*args)
+        )
+    except BrokenProcessPool:
+        logger.exception('Image %s is not normalized', name)
+        drop_process_pool(pool)
+        result = None
+    except Exception:
+        logger.exception('Image %s is not normalized', name)
+        result = None
+    if result is None:
+        keep(post_id, name)
+    else:
+        replace(post_id, name, *result)
+
+
+def background_process(post_id: int, name: str) -> None:
+    try:
+        process(post_id, name)
+    finally:
+        close_old_connections()
+
+
+def schedule(post_id: int, name: str) -> None:
+    """Normalize the uploaded image at background (at once when
+    `UPLOAD_WORKERS` is 0).
+    """
+    pool: Optional[Executor] = thread_pool()
+    if pool is None:
+        process(post_id, name)
+    else:
+        pool.submit(background_process, post_id, name)
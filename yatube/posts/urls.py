@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import feeds, views
 
 
 app_name = 'posts'
@@ -12,6 +12,11 @@ urlpatterns = [
     path(
         'posts/<int:post_id>/comment/', views.add_comment, name='add_comment'
     ),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.post_comments,
+        name='post_comments',
+    ),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path('profile/<str:username>/', views.profile, name='profile'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
@@ -25,4 +30,19 @@ urlpatterns = [
         views.profile_unfollow,
         name='profile_unfollow',
     ),
+    path('tag/<str:name>/', views.tag_posts, name='tag_posts'),
+    path('search/', views.search_posts, name='search'),
+    path('rss/', feeds.index_rss, name='index_rss'),
+    path('atom/', feeds.index_atom, name='index_atom'),
+    path('group/<slug:slug>/rss/', feeds.group_rss, name='group_rss'),
+    path('group/<slug:slug>/atom/', feeds.group_atom, name='group_atom'),
+    path(
+        'profile/<str:username>/rss/', feeds.author_rss, name='profile_rss'
+    ),
+    path(
+        'profile/<str:username>/atom/',
+        feeds.author_atom,
+        name='profile_atom',
+    ),
+    path('export/<str:table>/', views.export_table, name='export'),
 ]
@@ -1,60 +1,86 @@
 import os
 
 from django.db.models import QuerySet
-from django.http import HttpResponse
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import redirect, render, get_object_or_404
-from django.core.paginator import Paginator
 from django.contrib.auth import decorators, get_user_model
 from django.core.handlers.wsgi import WSGIRequest
-from django.views.decorators.cache import cache_page
+from django.core.paginator import Page, Paginator
+from django.conf import settings
+from django.urls import reverse
 
-from yatube import settings
+from . import exporter, feed_cache, queries, search, tags
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post
+from .models import Follow, Group, Post, Tag
+from .paginator import CursorPaginator, feed_count_key, paginate
+from .timeline import MergedPaginator, TimelinePaginator
 
 app_name = 'posts'
 User = get_user_model()
 
 
-@cache_page(settings.CACHE_TIME_DEFAULT, key_prefix='index_page')
+@feed_cache.feed_page(lambda: ['index'])
 def index(request: WSGIRequest) -> HttpResponse:
     template: str = os.path.join(app_name, 'index.html')
-    posts: QuerySet = Post.objects.select_related('group', 'author')
-    page_num: int = request.GET.get('page')
-    page_obj = Paginator(posts, settings.POSTS_PER_PAGE).get_page(page_num)
+    posts: QuerySet = queries.index_posts()
+    page_obj = paginate(
+        request, posts, feed_count_key('index'), estimate=True
+    )
 
     context = {'page_obj': page_obj}
     return render(request, template, context)
 
 
 @decorators.login_required
+@feed_cache.conditional_feed(lambda: ['celebrities'])
 def follow_index(request: WSGIRequest) -> HttpResponse:
     """View-function for page that shows posts by author which user following
-    for. Actions:
-
-    1- user.follower.all() -- обратимся ок всем записям в таблице Follow,
-    где наш user указан как follower (то есть тот, кто подписался на кого-либо)
-    2- user.follower.all().author -- получить из наших обьектов модели Follow
-    автора, то есть того, на кого наш user подписан.
-    3- пройдемся по всем выбранным обьектам модели Follow, и добавим f.author в
-    follower_author_list -- список, в котором хранятся все авторы на которых
-    подписан наш User.
-    4- Создадим запрос к модели Post, оставим авторов, которые входят в список
-    тех, на кого наш user подписан.
+    for. Posts are taken by one of engines (`FOLLOW_FEED_ENGINE` setting):
+
+    `timeline` -- user's materialized timeline (see `posts.timeline`) instead
+    of joining Follow table on every request.
+    `merge` -- lazy merge of followed authors posts, so database never sorts
+    the whole union of them.
     """
     template: str = os.path.join(app_name, 'follow.html')
-
-    posts: QuerySet = Post.objects.select_related('group', 'author').filter(
-        author__following__user=request.user
-    )
-
-    page_num: int = request.GET.get('page')
-    page_obj = Paginator(posts, settings.POSTS_PER_PAGE).get_page(page_num)
+    count_key: str = feed_count_key('follow', request.user.pk)
+
+    if settings.FOLLOW_FEED_ENGINE == 'merge':
+        page_obj = paginate(
+            request,
+            queries.follow_posts(),
+            count_key,
+            paginator_class=MergedPaginator,
+            authors=queries.followed_authors(request.user),
+        )
+    else:
+        page_obj = paginate(
+            request,
+            queries.follow_posts(),
+            count_key,
+            paginator_class=TimelinePaginator,
+            user=request.user,
+        )
 
     context = {'page_obj': page_obj}
     return render(request, template, context)
 
 
+def warm_feeds(post: Post) -> None:
+    """Render first pages of feeds with new post in advance."""
+    username: str = post.author.get_username()
+    feed_cache.warm(index, reverse('posts:index'))
+    feed_cache.warm(
+        profile, reverse('posts:profile', args=[username]), username=username
+    )
+    if post.group:
+        slug: str = post.group.slug
+        feed_cache.warm(
+            group_posts, reverse('posts:group_list', args=[slug]), slug=slug
+        )
+
+
 @decorators.login_required
 def post_create(request: WSGIRequest) -> HttpResponse:
     template = os.path.join(app_name, 'create_post.html')
@@ -64,6 +90,8 @@ def post_create(request: WSGIRequest) -> HttpResponse:
             post: Post = form.save(commit=False)
             post.author = request.user
             post.save()
+            if settings.FEED_CACHE_WRITE_THROUGH:
+                warm_feeds(post)
             return redirect(
                 'posts:profile', username=request.user.get_username()
             )
@@ -71,11 +99,32 @@ def post_create(request: WSGIRequest) -> HttpResponse:
     return render(request, template, context)
 
 
+@feed_cache.feed_page(feed_cache.post_feeds)
 def post_detail(request: WSGIRequest, post_id: int) -> HttpResponse:
     template = os.path.join(app_name, 'post_detail.html')
-    post: Post = get_object_or_404(Post, pk=post_id)
+    post: Post = get_object_or_404(queries.post_details(), pk=post_id)
     form = CommentForm(data=request.POST or None)
-    context = {'post': post, 'comments': post.comments.all(), 'form': form}
+    context = {
+        'post': post,
+        'comments': comments_page(request, post_id),
+        'form': form,
+    }
+    return render(request, template, context)
+
+
+def comments_page(request: WSGIRequest, post_id: int) -> Page:
+    paginator = CursorPaginator(
+        queries.post_comments(post_id), settings.COMMENTS_PER_PAGE
+    )
+    return paginator.get_cursor_page(request.GET.get('cursor'))
+
+
+@feed_cache.feed_page(lambda post_id: [feed_cache.post_feed(post_id)])
+def post_comments(request: WSGIRequest, post_id: int) -> HttpResponse:
+    """Next comments of the post ("load more comments" link)."""
+    template: str = os.path.join(app_name, 'comments.html')
+    post: Post = get_object_or_404(Post, pk=post_id)
+    context = {'post': post, 'comments': comments_page(request, post_id)}
     return render(request, template, context)
 
 
@@ -116,25 +165,20 @@ def post_edit(request: WSGIRequest, post_id: int) -> HttpResponse:
     return render(request, template, context)
 
 
+@feed_cache.feed_page(
+    lambda username: [feed_cache.author_feed(username)]
+)
 def profile(request: WSGIRequest, username: str) -> HttpResponse:
     template: str = os.path.join(app_name, 'profile.html')
-    author_profile: User = get_object_or_404(User, username=username)
-    page_num: int = request.GET.get('page')
-    posts = Post.objects.select_related('author').filter(author=author_profile)
-    page_obj = Paginator(posts, settings.POSTS_PER_PAGE).get_page(page_num)
-
-    following = (
-        request.user.is_authenticated
-        and Follow.objects.filter(
-            user=request.user, author=author_profile
-        ).exists()
+    author_profile: User = get_object_or_404(
+        User.objects.select_related('counters'), username=username
+    )
+    posts: QuerySet = queries.author_posts(author_profile)
+    page_obj = paginate(
+        request, posts, feed_count_key('author', author_profile.pk)
     )
 
-    context = {
-        'profile': author_profile,
-        'page_obj': page_obj,
-        'following': following,
-    }
+    context = {'profile': author_profile, 'page_obj': page_obj}
     return render(request, template, context)
 
 
@@ -156,7 +200,7 @@ def profile_unfollow(request: WSGIRequest, username: str) -> HttpResponse:
         user=request.user, author=author_profile
     ).delete()
 
-    if deleted[0] > 1 or deleted[1]['posts.Follow'] > 1:
+    if deleted[0] > 1 or deleted[1].get('posts.Follow', 0) > 1:
         raise RuntimeError(
             f'Follow model contains more then 1 equal instances. '
             f'Deleted objects: {deleted}. '
@@ -167,12 +211,66 @@ def profile_unfollow(request: WSGIRequest, username: str) -> HttpResponse:
     return redirect('posts:profile', username=username)
 
 
+@feed_cache.feed_page(lambda slug: [feed_cache.group_feed(slug)])
 def group_posts(request: WSGIRequest, slug: str):
     template = os.path.join(app_name, 'group_list.html')
     group = get_object_or_404(Group, slug=slug)
-    page_num: int = request.GET.get('page')
-    posts = Post.objects.select_related('group').filter(group=group)
-    page_obj = Paginator(posts, settings.POSTS_PER_PAGE).get_page(page_num)
+    posts: QuerySet = queries.group_posts(group)
+    page_obj = paginate(request, posts, feed_count_key('group', group.pk))
 
     context = {'group': group, 'page_obj': page_obj}
     return render(request, template, context)
+
+
+@feed_cache.feed_page(
+    lambda name: [feed_cache.tag_feed(name.lower()), tags.TOP_TAGS_FEED]
+)
+def tag_posts(request: WSGIRequest, name: str) -> HttpResponse:
+    template: str = os.path.join(app_name, 'tag.html')
+    tag: Tag = get_object_or_404(Tag, name=name.lower())
+    posts: QuerySet = queries.tag_posts(tag)
+    page_obj = paginate(
+        request,
+        posts,
+        feed_count_key('tag', tag.pk),
+        paginator_class=tags.TagPaginator,
+        tag=tag,
+    )
+    context = {
+        'tag': tag,
+        'page_obj': page_obj,
+        'top_tags': tags.top_tags(),
+    }
+    return render(request, template, context)
+
+
+def search_posts(request: WSGIRequest) -> HttpResponse:
+    """Posts with all words of `q`, the most relevant first."""
+    template: str = os.path.join(app_name, 'search.html')
+    query: str = request.GET.get('q', '').strip()
+    paginator = Paginator(search.ranked_ids(query), settings.POSTS_PER_PAGE)
+    page_obj: Page = paginator.get_page(request.GET.get('page'))
+    page_obj.object_list = queries.found_posts(page_obj.object_list)
+    context = {'query': query, 'page_obj': page_obj}
+    return render(request, template, context)
+
+
+@staff_member_required
+def export_table(request: WSGIRequest, table: str) -> StreamingHttpResponse:
+    """Download dump of a table (`?format=csv`, `?gzip=1`) streamed by
+    chunks.
+    """
+    format: str = request.GET.get('format', 'jsonl')
+    if table not in exporter.EXPORTS or format not in exporter.FORMATS:
+        raise Http404('Unknown table or format.')
+    compress: bool = request.GET.get('gzip') == '1'
+    content_type: str = exporter.CONTENT_TYPES[format]
+    if compress:
+        content_type = 'application/gzip'
+    response = StreamingHttpResponse(
+        exporter.export(table, format, compress), content_type=content_type
+    )
+    response['Content-Disposition'] = 'attachment; filename="{}"'.format(
+        exporter.filename(table, format, compress)
+    )
+    return response
@@ -46,6 +46,21 @@ CACHES = {
 
 CACHE_TIME_DEFAULT = 60 * 10 if not DEBUG else 20
 """Default duration for using saved cahes before updating it (in seconds)."""
+FEED_CACHE_TIME = 60 * 60 * 6
+"""Duration of keeping rendered feed pages (in seconds). Pages are dropped
+by signals when feed is changed, so it could be long."""
+FEED_CACHE_WRITE_THROUGH = False
+"""Render first pages of affected feeds right after post creation."""
+FEED_CACHE_STALE_TIME = 60 * 10
+"""How long outdated feed page may be served while fresh one is rendering by
+another request (in seconds)."""
+FEED_CACHE_LOCK_TIME = 10
+"""Lifetime of the lock taken for rendering a feed page (in seconds)."""
+FEED_CACHE_LOCK_WAIT = 2
+"""How long request waits for a page rendered by another request if there is
+no outdated page to serve (in seconds)."""
+FEED_CACHE_LOCK_POLL = 0.05
+"""Interval of checking cache while waiting for a page (in seconds)."""
 
 # Application definition
 INSTALLED_APPS = [
@@ -169,3 +184,73 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 # PRODUCTION SETTINGS
 POSTS_PER_PAGE = 10  # amount posts per page showed via views metodhs
+COMMENTS_PER_PAGE = 20
+"""Amount of comments shown at post page and at every "load more" page."""
+FEED_COUNT_CACHE_TIME = 60 * 60 * 24
+"""How long posts amount of a feed is kept at cache (in seconds). Counters
+are updated by signals, so it is only a safety net against drifting."""
+FEED_COUNT_EXACT_LIMIT = 10000
+"""Feeds longer than that are counted approximately."""
+PAGINATOR_WINDOW = 2
+"""Amount of page links shown at each side of the current page."""
+TIMELINE_FANOUT_LIMIT = 1000
+"""Posts of authors with more followers are not copied into followers
+timelines, but merged into follow feed at read time."""
+TIMELINE_BATCH_SIZE = 500
+"""Amount of timeline rows inserted by one query."""
+TIMELINE_WORKERS = 1 if not DEBUG else 0
+"""Threads refilling timelines of an author who is not a celebrity any more,
+0 -- refill them at once after the unfollow is committed."""
+FOLLOW_FEED_ENGINE = 'timeline'
+"""How follow feed is made: `timeline` -- from materialized timelines,
+`merge` -- by lazy merge of followed authors posts streams."""
+FEED_READ_MODELS = ()
+"""Feeds (`index`, `group`, `author`, `tag`, `follow`, `search`) which render
+post cards from lightweight `posts.cards.PostCard` read models instead of
+`Post` instances."""
+POST_EXCERPT_LENGTH = 500
+"""Amount of post text characters shown at feed pages."""
+SYNDICATION_ITEMS = 20
+"""Amount of latest posts at RSS and Atom feeds."""
+SEARCH_BACKEND = 'auto'
+"""Inverted index of post search: `fts5` (SQLite FTS5 table), `terms`
+(`PostTerm` table) or `auto` (FTS5 when it is available)."""
+SEARCH_RESULTS_LIMIT = 1000
+"""Amount of the most relevant posts which search results are paginated
+from."""
+TOP_TAGS_AMOUNT = 20
+"""Amount of the most popular tags shown at tag pages."""
+POST_THUMBNAILS = {
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
+}
+"""Thumbnails of post images shown by templates (`post_thumbnail` tag):
+name -> (geometry, sorl-thumbnail options). They are made in background."""
+THUMBNAIL_WORKERS = 2 if not DEBUG else 0
+"""Threads making thumbnails in background, 0 -- make them at once after
+the post is saved (while debugging, so tests do not race with workers)."""
+THUMBNAIL_PLACEHOLDER = 'img/placeholder.svg'
+"""Static image shown while a thumbnail is being made."""
+POST_IMAGE_WIDTHS = (480, 960, 1440)
+"""Widths of post image variants for `srcset`, the width of every
+`POST_THUMBNAILS` geometry (`WxH`) is added, height keeps its ratio."""
+POST_IMAGE_FORMATS = ('AVIF', 'WEBP')
+"""Formats of post image variants besides JPEG in order of preference,
+the ones Pillow can not write are skipped."""
+THUMBNAIL_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+"""`Cache-Control` of thumbnails: their URLs change with the content."""
+IMAGE_PREVIEW_SIZE = 16
+"""Size (of the longer side) of post image previews inlined into pages."""
+THUMBNAIL_KVSTORE = 'posts.kvstore.KVStore'
+"""sorl-thumbnail key value store with in-process LRU and batch lookups."""
+THUMBNAIL_LRU_SIZE = 10000
+"""Amount of thumbnail records kept in memory of every process."""
+THUMBNAIL_MISS_TIMEOUT = 10
+"""Seconds a missing thumbnail record is cached for: thumbnails are made by
+workers, maybe of another process with its own cache."""
+UPLOAD_MAX_EDGE = 2560
+"""Uploaded post images are cut down to this length of the longest edge."""
+UPLOAD_QUALITY = 85
+"""JPEG quality of normalized uploaded images."""
+UPLOAD_WORKERS = 2 if not DEBUG else 0
+"""Processes normalizing uploaded images, 0 -- normalize them at once after
+the post is saved (while debugging)."""
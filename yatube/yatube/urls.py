@@ -17,6 +17,7 @@ from django.contrib import admin
 from django.urls import include, path
 from django.conf.urls.static import static
 
+from core.views import serve_media
 from yatube import settings
 
 
@@ -34,5 +35,5 @@ urlpatterns = [
 
 if settings.DEBUG:
     urlpatterns += static(
-        settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
+        settings.MEDIA_URL, view=serve_media, document_root=settings.MEDIA_ROOT
     )